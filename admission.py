@@ -0,0 +1,100 @@
+"""
+Telemetri alımında giriş kontrolü / yük atma (load shedding).
+
+Sunucu zorlandığında (event loop gecikmesi ya da yazma kuyruklarının dolması)
+iş, önem sırasının tersine bırakılır:
+
+    seviye 0  normal
+    seviye 1  UI yayını atlanır   (fleet_update işaretlenmez; panel bir sonraki pakette güncellenir)
+    seviye 2  + DB kaydı atlanır  (canlı durum / HTTP cevabı sürer)
+    seviye 3  + istek reddedilir  (503 + Retry-After, gövde çözülmeden)
+
+Seviye, ``interval`` aralıkla ölçülen uyku gecikmesi (``lag_levels`` sn) ve
+``queue_fill()`` doluluk oranı (``fill_levels``, 0..1) eşiklerinden büyük
+olanıdır. Yükselme anında, düşme ise baskı ``hold_sec`` boyunca eşiğin altında
+kaldıktan sonra birer basamak olur (salınım olmasın).
+
+    adm = AdmissionController(socketio.sleep, lambda: q.qsize() / q.maxsize)
+    socketio.start_background_task(adm.run)
+    if adm.allow("db"): ...
+"""
+import logging
+import time
+
+log = logging.getLogger("iha.admission")
+
+# iş türü → atıldığı en düşük seviye
+SHED_LEVEL = {"ui": 1, "db": 2, "reply": 3}
+LEVEL_NAMES = ("normal", "ui", "db", "reply")
+
+
+def _level_for(value, thresholds):
+    level = 0
+    for i, limit in enumerate(thresholds, 1):
+        if value >= limit:
+            level = i
+    return level
+
+
+class AdmissionController:
+    def __init__(self, sleep, queue_fill, lag_levels=(0.05, 0.2, 0.5), fill_levels=(0.5, 0.8, 0.95),
+                 interval=0.1, hold_sec=2.0):
+        self.sleep = sleep
+        self.queue_fill = queue_fill
+        self.lag_levels = tuple(lag_levels)
+        self.fill_levels = tuple(fill_levels)
+        self.interval = float(interval)
+        self.hold_sec = float(hold_sec)
+
+        self.level = 0
+        self.lag = 0.0  # son gecikme (yavaş sönen tepe)
+        self.fill = 0.0
+        self._calm_since = None  # hedef seviye mevcut seviyenin altına ne zaman indi
+        self.shed = {kind: 0 for kind in SHED_LEVEL}
+        self.transitions = 0
+
+    def allow(self, kind):
+        """kind: "ui" | "db" | "reply". Atılacaksa sayacı artır ve False."""
+        if self.level >= SHED_LEVEL[kind]:
+            self.shed[kind] += 1
+            return False
+        return True
+
+    def observe(self, lag, fill, now=None):
+        """Yeni ölçümle seviyeyi güncelle (run() her interval'de çağırır)."""
+        now = time.monotonic() if now is None else now
+        self.lag = max(lag, self.lag * 0.8)
+        self.fill = fill
+        target = max(_level_for(self.lag, self.lag_levels), _level_for(fill, self.fill_levels))
+        if target > self.level:
+            self._set(target, "⚠️")
+        elif target < self.level:
+            if self._calm_since is None:
+                self._calm_since = now
+            elif now - self._calm_since >= self.hold_sec:
+                self._set(self.level - 1, "✅")
+        else:
+            self._calm_since = None
+
+    def _set(self, level, icon):
+        log.warning("%s yük atma seviyesi %s → %s (gecikme=%.0f ms, kuyruk=%%%.0f, atılan=%s)", icon,
+                    LEVEL_NAMES[self.level], LEVEL_NAMES[level], self.lag * 1000, self.fill * 100, self.shed)
+        self.level = level
+        self._calm_since = None
+        self.transitions += 1
+
+    def run(self):
+        while True:
+            t0 = time.monotonic()
+            self.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - t0 - self.interval)
+            try:
+                fill = float(self.queue_fill())
+            except Exception as e:
+                log.error("admission kuyruk okuma hatası: %s", e)
+                fill = 0.0
+            self.observe(lag, fill)
+
+    def status(self):
+        return {"level": self.level, "mode": LEVEL_NAMES[self.level], "lag_ms": round(self.lag * 1000, 1),
+                "queue_fill": round(self.fill, 3), "shed": dict(self.shed)}
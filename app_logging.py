@@ -0,0 +1,166 @@
+"""
+Sunucu logları: seviyeli, kuyruklu, örneklemeli.
+
+İstek içinde ``log.info("...%s", x)`` sadece kaydı kuyruğa atar; mesajın
+biçimlendirilmesi ve konsol / dosya yazımı arka plandaki ``QueueListener``
+thread'inde yapılır. Kuyruk doluysa kayıt düşürülür (istek beklemez).
+
+Olay bazlı örnekleme / hız sınırı: sık olaylar ``event_logger(log, ad)`` ile
+loglanır; karar LogRecord oluşturulmadan önce verilir (atlanan kayıt neredeyse
+bedava). ``sample={"telemetry_in": 100}`` → her 100 kayıttan 1'i,
+``rate={"lock_in": 20}`` → saniyede en fazla 20 kayıt. Tanımsız olaylar süzülmez.
+
+Çıktılar: konsol (okunabilir metin) + dönen (rotating) JSON-lines dosyası.
+Not: argümanlar geç biçimlendirilir; kuyruğa atılan dict'ler sonradan
+değiştirilmemeli.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+
+from utc_time import iso_from_ms
+
+LOGGER_NAME = "iha"
+
+
+class EventSampler:
+    """Olay başına örnekleme (1/N) ve saniyelik hız sınırı."""
+
+    def __init__(self, sample=None, rate=None):
+        self.sample = dict(sample or {})
+        self.rate = dict(rate or {})
+        self._seen = {}  # olay → sayaç
+        self._window = {}  # olay → [saniye, o saniyedeki kayıt]
+        self.suppressed = 0
+
+    def allow(self, ev):
+        """Kayıt yazılacaksa örnekleme oranı (1 = hepsi), atlanacaksa 0."""
+        every = self.sample.get(ev) or 1
+        if every > 1:
+            n = self._seen.get(ev, 0)
+            self._seen[ev] = n + 1
+            if n % every:
+                self.suppressed += 1
+                return 0
+        limit = self.rate.get(ev)
+        if limit:
+            sec = int(time.monotonic())
+            w = self._window.get(ev)
+            if w is None or w[0] != sec:
+                w = self._window[ev] = [sec, 0]
+            if w[1] >= limit:
+                self.suppressed += 1
+                return 0
+            w[1] += 1
+        return every
+
+
+_sampler = EventSampler()  # setup_logging ile yapılandırılır
+
+
+def event_logger(logger, event, level=logging.INFO):
+    """
+    Sık tekrarlanan olay için log fonksiyonu: fn(msg, *args). Seviye kapalıysa
+    ya da örnekleme/hız sınırı atlatıyorsa kayıt hiç oluşturulmaz.
+    """
+    def _log(msg, *args):
+        if not logger.isEnabledFor(level):
+            return
+        every = _sampler.allow(event)
+        if every:
+            logger.log(level, msg, *args, extra={"event": event, "sampled": every})
+    return _log
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Biçimlendirme yapmadan kuyruğa atar; kuyruk doluysa kaydı düşürür."""
+
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record  # biçimlendirme dinleyici thread'inde
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel, timeout=5)  # kuyruk doluysa boşalmasını bekle
+
+
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record):
+        d = {"ts": iso_from_ms(record.created * 1000), "level": record.levelname,
+             "logger": record.name, "msg": record.getMessage()}
+        ev = getattr(record, "event", None)
+        if ev is not None:
+            d["event"] = ev
+        if getattr(record, "sampled", 1) > 1:
+            d["sampled"] = record.sampled
+        if record.exc_info:
+            d["exc"] = self.formatException(record.exc_info)
+        return json.dumps(d, ensure_ascii=False, default=str)
+
+
+class LogSystem:
+    def __init__(self, listener, queue_handler, sampler):
+        self.listener = listener
+        self.queue_handler = queue_handler
+        self.sampler = sampler
+
+    def stop(self):
+        """Kuyrukta kalanları yaz ve thread'i durdur (atexit'te de çağrılır)."""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def stats(self):
+        return {"dropped": self.queue_handler.dropped, "suppressed": self.sampler.suppressed,
+                "queued": self.queue_handler.queue.qsize()}
+
+
+def setup_logging(level="INFO", log_file=None, max_bytes=10 * 1024 * 1024, backups=5, console=True,
+                  sample=None, rate=None, queue_max=10000):
+    """
+    "iha" logger'ını kur ve arka plan yazıcıyı başlat. log_file verilirse JSON-lines
+    (RotatingFileHandler, max_bytes / backups). LogSystem döner.
+    """
+    root = logging.getLogger(LOGGER_NAME)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    root.propagate = False
+    for h in list(root.handlers):
+        root.removeHandler(h)
+
+    outputs = []
+    if console:
+        ch = logging.StreamHandler(sys.stdout)
+        ch.setFormatter(logging.Formatter("%(message)s"))
+        outputs.append(ch)
+    if log_file:
+        os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
+        fh = logging.handlers.RotatingFileHandler(log_file, maxBytes=int(max_bytes), backupCount=int(backups),
+                                                  encoding="utf-8")
+        fh.setFormatter(JsonLinesFormatter())
+        outputs.append(fh)
+
+    _sampler.sample = dict(sample or {})
+    _sampler.rate = dict(rate or {})
+
+    qh = _DroppingQueueHandler(queue.Queue(maxsize=int(queue_max)))
+    root.addHandler(qh)
+    listener = _Listener(qh.queue, *outputs, respect_handler_level=True)
+    listener.start()
+    system = LogSystem(listener, qh, _sampler)
+    atexit.register(system.stop)
+    return system
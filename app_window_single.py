@@ -1,9 +1,10 @@
-import time, socket, subprocess, sys
+import time, socket, subprocess, sys, os, secrets, urllib.request
 import webview
 
 # Sunucunun gösterdiği panel adresi
 HOST_IP = socket.gethostbyname(socket.gethostname())  # kendi IP adresini otomatik bulur
 URL = f"http://{HOST_IP}:10001/dashboard"
+SHUTDOWN_TOKEN = secrets.token_hex(16)  # bu açılışa özel; sunucuya ortamla verilir (/api/kapat)
 
 def wait_port(host=HOST_IP, port=10001, timeout=20):
     start = time.time()
@@ -16,9 +17,25 @@ def wait_port(host=HOST_IP, port=10001, timeout=20):
             time.sleep(0.3)
     return False
 
+def stop_server(srv, timeout=5):
+    # debug=True iken asıl sunucu srv'nin alt sürecidir (werkzeug reloader).
+    # srv'ye doğrudan terminate gidince alt süreç de ölür ve DB yazma kuyruğunda
+    # bekleyen satırlar diske yazılamaz. Önce sunucudan kapanmasını iste: kuyruğu
+    # yazıp çıkar, reloader da onunla kapanır (her işletim sisteminde aynı yol).
+    try:
+        req = urllib.request.Request("http://127.0.0.1:10001/api/kapat", method="POST",
+                                     headers={"X-Kapat-Anahtari": SHUTDOWN_TOKEN})
+        urllib.request.urlopen(req, timeout=2).close()
+        srv.wait(timeout)
+    except (OSError, subprocess.TimeoutExpired):
+        pass
+    if srv.poll() is None:
+        srv.terminate()
+
 if __name__ == "__main__":
     # Aynı klasördeki fake_server.py'yi arka planda başlat
-    srv = subprocess.Popen([sys.executable, "fake_server.py"])
+    srv = subprocess.Popen([sys.executable, "fake_server.py"],
+                           env=dict(os.environ, IHA_SHUTDOWN_TOKEN=SHUTDOWN_TOKEN))
     try:
         wait_port()
         # Ubuntu 20.04 için Qt backend en sorunsuz
@@ -26,4 +43,4 @@ if __name__ == "__main__":
         webview.start(gui="qt")
     finally:
         # Pencere kapanınca sunucuyu da kapat
-        srv.terminate()
+        stop_server(srv)
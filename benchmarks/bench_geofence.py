@@ -0,0 +1,120 @@
+"""
+Geofence mikro-benchmark: eski yol (her pakette list_fences + json.loads +
+point_in_polygon) ile derlenmiş FenceEngine karşılaştırması.
+
+Çalıştırma (repo kökünden):
+    python benchmarks/bench_geofence.py --fences 50 --points 20000
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_server import point_in_polygon  # noqa: E402  (eski ray-cast)
+from geofence import FenceEngine  # noqa: E402
+from zone_engine import ZoneEngine  # noqa: E402
+
+CENTER = (41.51, 36.11)  # (lat, lon)
+
+
+def random_polygon(rng, n_vertices, radius_deg):
+    clat = CENTER[0] + rng.uniform(-0.2, 0.2)
+    clon = CENTER[1] + rng.uniform(-0.2, 0.2)
+    ring = []
+    for k in range(n_vertices):
+        a = 2 * math.pi * k / n_vertices
+        r = radius_deg * rng.uniform(0.6, 1.0)
+        ring.append([clon + r * math.cos(a), clat + r * math.sin(a)])
+    ring.append(ring[0])
+    return {"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [ring]}}
+
+
+def legacy_list_fences(db_path):
+    # fake_server.list_fences'in eski hali: her çağrıda bağlantı + sorgu + json.loads
+    con = sqlite3.connect(db_path)
+    rows = con.execute("SELECT id,name,kind,geojson,color,updated_at FROM fences ORDER BY id").fetchall()
+    con.close()
+    keys = ["id", "name", "kind", "geojson", "color", "updated_at"]
+    out = [dict(zip(keys, r)) for r in rows]
+    for r in out:
+        r["geojson"] = json.loads(r["geojson"])
+    return out
+
+
+def legacy_is_inside(db_path, lat, lon, fences=None):
+    for f in fences if fences is not None else legacy_list_fences(db_path):
+        outer = f["geojson"]["geometry"]["coordinates"][0]
+        poly = [[pt[1], pt[0]] for pt in outer]
+        if point_in_polygon(lat, lon, poly):
+            return True
+    return False
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--fences", type=int, default=50)
+    ap.add_argument("--vertices", type=int, default=24)
+    ap.add_argument("--points", type=int, default=20000)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    fences = [random_polygon(rng, args.vertices, 0.02) for _ in range(args.fences)]
+    points = [(CENTER[0] + rng.uniform(-0.3, 0.3), CENTER[1] + rng.uniform(-0.3, 0.3))
+              for _ in range(args.points)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        con = sqlite3.connect(db_path)
+        con.execute("CREATE TABLE fences (id INTEGER PRIMARY KEY, name TEXT, kind TEXT, geojson TEXT, "
+                    "color TEXT, updated_at TEXT)")
+        con.executemany("INSERT INTO fences(name,kind,geojson,color,updated_at) VALUES (?,?,?,?,?)",
+                        [("f", "polygon", json.dumps(gj), "#ef4444", "t") for gj in fences])
+        con.commit()
+        con.close()
+
+        items = legacy_list_fences(db_path)
+        engine = FenceEngine()
+        t0 = time.perf_counter()
+        engine.sync(items)
+        compile_ms = (time.perf_counter() - t0) * 1000
+
+        n_legacy = min(len(points), 2000)  # eski yol yavaş; alt küme ile ölç
+        t0 = time.perf_counter()
+        legacy = [legacy_is_inside(db_path, lat, lon) for lat, lon in points[:n_legacy]]
+        legacy_us = (time.perf_counter() - t0) / n_legacy * 1e6
+
+        t0 = time.perf_counter()
+        legacy_mem = [legacy_is_inside(db_path, lat, lon, items) for lat, lon in points]
+        legacy_mem_us = (time.perf_counter() - t0) / len(points) * 1e6
+
+        t0 = time.perf_counter()
+        zone = ZoneEngine(engine, None)  # sunucunun paket başına çağırdığı yol (is_inside_fences)
+        fast = [zone.inside_any_fence(lat, lon) for lat, lon in points]
+        engine_us = (time.perf_counter() - t0) / len(points) * 1e6
+
+    mismatches = sum(1 for a, b in zip(legacy_mem, fast) if a != b)
+    mismatches += sum(1 for a, b in zip(legacy, fast) if a != b)
+    print(json.dumps({
+        "fences": args.fences,
+        "vertices": args.vertices,
+        "points": len(points),
+        "inside_ratio": round(sum(fast) / len(fast), 4),
+        "compile_ms": round(compile_ms, 3),
+        "legacy_us_per_point": round(legacy_us, 2),
+        "legacy_cached_us_per_point": round(legacy_mem_us, 2),
+        "engine_us_per_point": round(engine_us, 2),
+        "speedup_vs_legacy": round(legacy_us / engine_us, 1),
+        "mismatches": mismatches,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
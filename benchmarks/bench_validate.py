@@ -0,0 +1,148 @@
+"""
+Telemetri doğrulama mikro-benchmark: eski yol (validate_telemetry ile bool,
+ardından telemetri()/save_telemetry_row içinde alanların yeniden float()/int()
+dönüşümü) ile tek geçişli TelemetryValidator karşılaştırması. Geçerli ve bozuk
+paket karışımı kullanılır; iki yolun kabul/ret kararlarının aynı olduğu da
+kontrol edilir. Her yol birkaç kez ölçülür, en iyi süre raporlanır.
+
+Çalıştırma (repo kökünden):
+    python benchmarks/bench_validate.py --packets 50000 --bad-ratio 0.2
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_server import LOCK_FIELDS, REQUIRED_FIELDS, telemetry_validator  # noqa: E402
+
+
+def legacy_validate(t):
+    # fake_server.validate_telemetry'nin eski hali
+    try:
+        for f in REQUIRED_FIELDS:
+            if f not in t: return False
+        if int(t["iha_kilitlenme"]) == 1:
+            for f in LOCK_FIELDS:
+                if f not in t: return False
+        if not (-90 <= float(t["iha_enlem"]) <= 90): return False
+        if not (-180 <= float(t["iha_boylam"]) <= 180): return False
+        if not (0 <= float(t["iha_irtifa"]) <= 10000): return False
+        if not (-90 <= float(t["iha_dikilme"]) <= 90): return False
+        if not (0 <= float(t["iha_yonelme"]) <= 360): return False
+        if not (-90 <= float(t["iha_yatis"]) <= 90): return False
+        if not (0 <= float(t["iha_hiz"]) <= 200): return False
+        if not (0 <= int(t["iha_batarya"]) <= 100): return False
+        if int(t["iha_otonom"]) not in (0, 1): return False
+        if int(t["iha_kilitlenme"]) not in (0, 1): return False
+        gps = t["gps_saati"]
+        for k in ("saat", "dakika", "saniye", "milisaniye"):
+            if k not in gps: return False
+        if not (0 <= int(gps["saat"]) < 24): return False
+        if not (0 <= int(gps["dakika"]) < 60): return False
+        if not (0 <= int(gps["saniye"]) < 60): return False
+        if not (0 <= int(gps["milisaniye"]) < 1000): return False
+        return True
+    except Exception:
+        return False
+
+
+def legacy_pipeline(t):
+    # eski telemetri(): doğrulama + takım/geofence/HSS/DB için tekrar dönüşümler
+    if not legacy_validate(t):
+        return None
+    takim = int(t["takim_numarasi"])
+    lat, lon = float(t.get("iha_enlem")), float(t.get("iha_boylam"))  # geofence
+    lat, lon = float(t.get("iha_enlem")), float(t.get("iha_boylam"))  # HSS
+    row = (takim, float(t.get("iha_enlem", 0.0)), float(t.get("iha_boylam", 0.0)),
+           float(t.get("iha_irtifa", 0.0)), float(t.get("iha_hiz", 0.0)), int(t.get("iha_batarya", 0)))
+    return row
+
+
+def good_packet(rng):
+    return {
+        "takim_numarasi": rng.randint(1, 60),
+        "iha_enlem": rng.uniform(41.4, 41.6),
+        "iha_boylam": rng.uniform(36.0, 36.2),
+        "iha_irtifa": rng.uniform(50, 150),
+        "iha_dikilme": rng.uniform(-10, 10),
+        "iha_yonelme": rng.uniform(0, 360),
+        "iha_yatis": rng.uniform(-20, 20),
+        "iha_hiz": rng.uniform(15, 35),
+        "iha_batarya": rng.randint(20, 100),
+        "iha_otonom": 1,
+        "iha_kilitlenme": 0,
+        "gps_saati": {"saat": rng.randint(0, 23), "dakika": rng.randint(0, 59),
+                      "saniye": rng.randint(0, 59), "milisaniye": rng.randint(0, 999)},
+    }
+
+
+def corrupt(rng, p):
+    kind = rng.randrange(5)
+    if kind == 0:
+        p.pop(rng.choice(REQUIRED_FIELDS))
+    elif kind == 1:
+        p["iha_enlem"] = 123.0
+    elif kind == 2:
+        p["iha_hiz"] = "hızlı"
+    elif kind == 3:
+        p["iha_kilitlenme"] = 1  # hedef_* alanları yok
+    else:
+        p["gps_saati"]["milisaniye"] = 1000
+    return p
+
+
+def bench(fn, packets, repeat=3):
+    # sonuçlar ölçüm sırasında tutulmaz (biriken dict'ler GC maliyetini ölçüme katar)
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for p in packets:
+            fn(p)
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best / len(packets) * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--packets", type=int, default=50000)
+    ap.add_argument("--bad-ratio", type=float, default=0.2)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    packets = []
+    for _ in range(args.packets):
+        p = good_packet(rng)
+        packets.append(corrupt(rng, p) if rng.random() < args.bad_ratio else p)
+
+    legacy_us = bench(legacy_validate, packets)
+    pipeline_us = bench(legacy_pipeline, packets)
+    fast_us = bench(telemetry_validator.validate, packets)
+
+    legacy = [legacy_validate(p) for p in packets]
+    fast = [telemetry_validator.validate(p) for p in packets]
+
+    reasons = {}
+    for _, err in fast:
+        if err:
+            reasons[err] = reasons.get(err, 0) + 1
+    mismatches = sum(1 for a, (_, err) in zip(legacy, fast) if a != (err is None))
+    print(json.dumps({
+        "packets": len(packets),
+        "rejected": sum(reasons.values()),
+        "legacy_validate_us_per_packet": round(legacy_us, 3),
+        "legacy_with_coercion_us_per_packet": round(pipeline_us, 3),
+        "validator_us_per_packet": round(fast_us, 3),
+        "speedup_vs_legacy_with_coercion": round(pipeline_us / fast_us, 2),
+        "mismatches": mismatches,
+        "reasons": dict(sorted(reasons.items())),
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""
+Telemetri alım yolu için uçtan uca yük testi.
+
+N sentetik takım /api/giris ile giriş yapar ve /api/telemetri_gonder'e
+validate_telemetry'den geçen paketleri (varsayılan 2 Hz) gönderir
+(--kanal socketio / socketio-bin: aynı paketler /ucak kalıcı kanalından JSON
+ya da ikili çerçeve olarak, cevap ack ile). Aynı anda
+M adet Socket.IO panel istemcisi bağlanıp yayınları dinler.
+
+Rapor (JSON):
+  - HTTP istek gecikmesi p50/p95/p99 (ms)
+  - yayın gecikmeleri: paket gönderimi → panel alımı (gps_saati ile işaretlenir)
+    ve sunucu yayını → panel alımı (sunucusaati ile)
+  - ret sayıları: "3" (hız limiti), 204 (şema), diğer kodlar
+  - test süresince DB'ye yazılan telemetri satırı
+
+Sunucu ile aynı makinede çalıştırılması önerilir (saat farkı gecikmeye girmesin).
+
+Gerekenler (sadece bu araç için):
+    pip install requests "python-socketio[client]"
+
+Örnek:
+    python fake_server.py &
+    python benchmarks/loadtest.py --teams 20 --dashboards 3 --duration 30 --out lt_20.json
+    python benchmarks/loadtest.py --teams 20 --kanal socketio-bin --out lt_20_bin.json
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sqlite3
+import subprocess
+import threading
+import time
+from datetime import datetime, timezone
+
+import sys
+
+import requests
+import socketio
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import telemetry_frame  # noqa: E402
+DEFAULT_DB = os.path.join(ROOT, "iha_logs.db")
+CENTER = (41.51238882, 36.11935778)  # (lat, lon)
+
+
+def percentiles(values):
+    if not values:
+        return {"n": 0, "p50": None, "p95": None, "p99": None, "max": None, "mean": None}
+    v = sorted(values)
+
+    def pick(q):
+        return round(v[min(len(v) - 1, int(math.ceil(q * len(v))) - 1)], 3)
+
+    return {"n": len(v), "p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99),
+            "max": round(v[-1], 3), "mean": round(sum(v) / len(v), 3)}
+
+
+def utc_dict(ts):
+    d = datetime.fromtimestamp(ts, timezone.utc)
+    return {"saat": d.hour, "dakika": d.minute, "saniye": d.second, "milisaniye": d.microsecond // 1000}
+
+
+def ms_of_day(saat, dakika, saniye, milisaniye):
+    return ((int(saat) * 60 + int(dakika)) * 60 + int(saniye)) * 1000 + int(milisaniye)
+
+
+def recv_latency_ms(gps, now):
+    """gps_saati (gün içi UTC ms) ile şimdiki an arasındaki fark; gece yarısı dönüşü düzeltilir."""
+    d = datetime.fromtimestamp(now, timezone.utc)
+    now_ms = ms_of_day(d.hour, d.minute, d.second, d.microsecond // 1000) + (d.microsecond % 1000) / 1000.0
+    diff = now_ms - ms_of_day(gps["saat"], gps["dakika"], gps["saniye"], gps["milisaniye"])
+    if diff < -43200000:
+        diff += 86400000
+    return diff
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.req_ms = []
+        self.codes = {}
+        self.rate_limited = 0
+        self.no_content = 0
+        self.errors = 0
+        self.sent = 0
+        self.e2e_ms = []
+        self.emit_ms = []
+        self.events = {}
+
+    def add_code(self, key):
+        self.codes[key] = self.codes.get(key, 0) + 1
+
+
+def make_packet(team, state, rng, now):
+    # basit rastgele yürüyüş; tüm alanlar validate_telemetry aralıklarında
+    state["lat"] += rng.uniform(-0.0002, 0.0002)
+    state["lon"] += rng.uniform(-0.0002, 0.0002)
+    state["yaw"] = (state["yaw"] + rng.uniform(-5, 5)) % 360
+    return {
+        "takim_numarasi": team,
+        "iha_enlem": round(state["lat"], 7),
+        "iha_boylam": round(state["lon"], 7),
+        "iha_irtifa": round(rng.uniform(50, 150), 2),
+        "iha_dikilme": round(rng.uniform(-10, 10), 2),
+        "iha_yonelme": round(state["yaw"], 2),
+        "iha_yatis": round(rng.uniform(-20, 20), 2),
+        "iha_hiz": round(rng.uniform(15, 35), 2),
+        "iha_batarya": rng.randint(20, 100),
+        "iha_otonom": 1,
+        "iha_kilitlenme": 0,
+        "gps_saati": utc_dict(now),  # gönderim anı: panel tarafında uçtan uca gecikme için
+    }
+
+
+def http_sender(args, sess):
+    def send(pkt):
+        resp = sess.post(args.url + "/api/telemetri_gonder", json=pkt, timeout=10)
+        return resp.status_code, resp.text
+    return send
+
+
+def channel_sender(args, token):
+    """/ucak kalıcı kanalı: bir kez bağlan, her paket ack'li tek olay."""
+    sio = socketio.Client(reconnection=False)
+    sio.connect(args.url, namespaces=["/ucak"], auth={"token": token}, transports=["websocket"])
+    binary = args.kanal == "socketio-bin"
+
+    def send(pkt):
+        status, body = sio.call("telemetri", telemetry_frame.encode(pkt) if binary else pkt,
+                                namespace="/ucak", timeout=10)
+        return status, body
+    send.close = sio.disconnect
+    return send
+
+
+def team_worker(args, team, user, stats, stop_at, t0):
+    rng = random.Random(team)
+    sess = requests.Session()
+    r = sess.post(args.url + "/api/giris", json={"kadi": user["kadi"], "sifre": user["sifre"]}, timeout=10)
+    r.raise_for_status()
+    token = r.json()["token"]
+    sess.headers["Authorization"] = "Bearer " + token
+    send = http_sender(args, sess) if args.kanal == "http" else channel_sender(args, token)
+
+    state = {"lat": CENTER[0] + rng.uniform(-0.01, 0.01), "lon": CENTER[1] + rng.uniform(-0.01, 0.01),
+             "yaw": rng.uniform(0, 360)}
+    period = 1.0 / args.hz
+    nxt = t0 + rng.uniform(0, period)  # takımların fazları dağılsın
+    while True:
+        now = time.time()
+        if now >= stop_at:
+            break
+        if nxt > now:
+            time.sleep(nxt - now)
+        nxt += period
+        pkt = make_packet(team, state, rng, time.time())
+        t_send = time.perf_counter()
+        try:
+            status, body = send(pkt)
+            dt = (time.perf_counter() - t_send) * 1000
+            with stats.lock:
+                stats.sent += 1
+                stats.req_ms.append(dt)
+                if status == 400 and body.strip() == "3":
+                    stats.rate_limited += 1
+                    stats.add_code("400:3")
+                elif status == 204:
+                    stats.no_content += 1
+                    stats.add_code("204")
+                else:
+                    stats.add_code(str(status))
+        except Exception:
+            with stats.lock:
+                stats.errors += 1
+    if hasattr(send, "close"):
+        send.close()
+
+
+def dashboard_client(args, stats, ready):
+    sio = socketio.Client(reconnection=False)
+
+    def count(name):
+        with stats.lock:
+            stats.events[name] = stats.events.get(name, 0) + 1
+
+    @sio.on("fleet_update")
+    def on_update(data):
+        now = time.time()
+        count("fleet_update")
+        if data.get("full"):
+            return  # bağlanınca gelen anlık görüntü; gecikme ölçümüne katma
+        with stats.lock:
+            for team in data.get("teams") or []:
+                stats.events["fleet_update_teams"] = stats.events.get("fleet_update_teams", 0) + 1
+                gps = team.get("gps_saati")
+                if isinstance(gps, dict):
+                    stats.e2e_ms.append(recv_latency_ms(gps, now))
+            srv = data.get("sunucusaati")
+            if isinstance(srv, dict):
+                stats.emit_ms.append(recv_latency_ms(srv, now))
+
+    for name in ("geofence_violation", "geofence_ok", "hss_inside", "hss_ok"):
+        sio.on(name, (lambda n: lambda _d: count(n))(name))
+
+    sio.connect(args.url, transports=[args.transport])
+    ready.set()
+    return sio
+
+
+def db_rows(db_path):
+    if not db_path or not os.path.exists(db_path):
+        return None
+    con = sqlite3.connect(db_path, timeout=10)
+    try:
+        return con.execute("SELECT COUNT(*) FROM telemetry").fetchone()[0]
+    finally:
+        con.close()
+
+
+def git_rev():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--url", default="http://127.0.0.1:10001")
+    ap.add_argument("--teams", type=int, default=10, help="sentetik takım sayısı (N)")
+    ap.add_argument("--dashboards", type=int, default=2, help="Socket.IO panel istemcisi sayısı (M)")
+    ap.add_argument("--hz", type=float, default=2.0, help="takım başına gönderim frekansı")
+    ap.add_argument("--duration", type=float, default=20.0, help="saniye")
+    ap.add_argument("--team-base", type=int, default=100, help="ilk sentetik takım numarası")
+    ap.add_argument("--kadi", default="deneme")
+    ap.add_argument("--sifre", default="deneme")
+    ap.add_argument("--transport", default="polling", choices=["polling", "websocket"])
+    ap.add_argument("--kanal", default="http", choices=["http", "socketio", "socketio-bin"],
+                    help="telemetri gönderim yolu (socketio*: /ucak kalıcı kanalı)")
+    ap.add_argument("--db", default=DEFAULT_DB, help="yazılan satırları saymak için DB yolu")
+    ap.add_argument("--settle", type=float, default=1.0, help="bitişte DB yazıcısını bekleme (sn)")
+    ap.add_argument("--out", help="JSON raporu bu dosyaya da yaz")
+    args = ap.parse_args()
+
+    stats = Stats()
+    rows_before = db_rows(args.db)
+
+    clients = []
+    for _ in range(args.dashboards):
+        ready = threading.Event()
+        clients.append(dashboard_client(args, stats, ready))
+        ready.wait(10)
+
+    user = {"kadi": args.kadi, "sifre": args.sifre}
+    t0 = time.time()
+    stop_at = t0 + args.duration
+    workers = [threading.Thread(target=team_worker, args=(args, args.team_base + i, user, stats, stop_at, t0),
+                                daemon=True) for i in range(args.teams)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.time() - t0
+
+    time.sleep(args.settle)
+    for c in clients:
+        try:
+            c.disconnect()
+        except Exception:
+            pass
+    rows_after = db_rows(args.db)
+
+    accepted = stats.codes.get("200", 0)
+    report = {
+        "utc": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "git_rev": git_rev(),
+        "config": {"url": args.url, "teams": args.teams, "dashboards": args.dashboards, "hz": args.hz,
+                   "duration_s": args.duration, "transport": args.transport, "kanal": args.kanal},
+        "elapsed_s": round(elapsed, 3),
+        "requests": {
+            "sent": stats.sent,
+            "accepted": accepted,
+            "accepted_per_s": round(accepted / elapsed, 2) if elapsed else None,
+            "rate_limited_3": stats.rate_limited,
+            "no_content_204": stats.no_content,
+            "transport_errors": stats.errors,
+            "by_code": dict(sorted(stats.codes.items())),
+        },
+        "request_latency_ms": percentiles(stats.req_ms),
+        "send_to_dashboard_ms": percentiles(stats.e2e_ms),
+        "emit_to_receive_ms": percentiles(stats.emit_ms),
+        "dashboard_events": dict(sorted(stats.events.items())),
+        "db_rows_written": (rows_after - rows_before) if None not in (rows_before, rows_after) else None,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
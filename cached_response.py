@@ -0,0 +1,54 @@
+"""
+Okunması çok, değişmesi seyrek endpoint'ler için önceden serileştirilmiş cevap.
+
+Gövde bir veri sürümüne (ör. ``hss_store.version``) bağlı tutulur; sürüm
+değişmedikçe her istekte aynı bayt dizisi döner, JSON yeniden üretilmez.
+ETag gövdenin özetidir (sürüm sayacı değil): aynı içeriği üreten worker'lar
+aynı ETag'i verir, istemci hangi worker'a düşerse düşsün 304 alabilir.
+
+    hss_body = CachedBody(lambda version: json.dumps({...}))
+    body, etag = hss_body.get(hss_store.version)
+    return conditional(app.response_class, request, body, etag)
+"""
+import hashlib
+
+# Veri yalnız yönetici düzenlemesinde değişir; istemci her seferinde sorar, çoğu 304 olur
+DEFAULT_CACHE_CONTROL = "no-cache"
+
+
+def etag_of(data):
+    return '"%s"' % hashlib.blake2b(data, digest_size=12).hexdigest()
+
+
+class CachedBody:
+    """build(key) → str|bytes; ``get(key)`` key değişince yeniden kurar."""
+
+    def __init__(self, build):
+        self.build = build
+        self._entry = (object(), b"", "")  # (key, gövde, etag) — tek atamayla değişir
+        self.builds = 0
+
+    def get(self, key):
+        entry = self._entry
+        if entry[0] != key:
+            body = self.build(key)
+            if isinstance(body, str):
+                body = body.encode("utf-8")
+            entry = self._entry = (key, body, etag_of(body))
+            self.builds += 1
+        return entry[1], entry[2]
+
+
+def conditional(response_class, request, body, etag, cache_control=DEFAULT_CACHE_CONTROL,
+                mimetype="application/json", weak=False, headers=None):
+    """If-None-Match eşleşirse gövdesiz 304, değilse 200 + ETag / Cache-Control.
+
+    ``weak=True``: ETag ``W/"..."`` gönderilir — gövdenin ETag'in kapsamadığı,
+    istekten isteğe değişen bir kısmı varsa (bayt bayt aynılık iddia edilmez).
+    ``headers``: iki cevapta da gönderilecek ek başlıklar (ör. 304'te de gereken değerler).
+    """
+    headers = dict(headers or (), ETag="W/" + etag if weak else etag)
+    headers["Cache-Control"] = cache_control
+    if request.if_none_match.contains_weak(etag.strip('"')):
+        return response_class(status=304, headers=headers)
+    return response_class(body, status=200, mimetype=mimetype, headers=headers)
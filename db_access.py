@@ -0,0 +1,125 @@
+"""
+SQLite erişim katmanı: uzun ömürlü bağlantılar (okuma havuzu + tek yazıcı).
+
+- Okuma bağlantıları bir havuzda tutulur; havuz boşsa geçici bağlantı açılır
+  (eventlet hub'ı bir bağlantı beklerken asla kilitlenmez).
+- Tüm yazmalar tek bir yazıcı bağlantısından, kilit altında yapılır.
+- Uzun sorgular (geçmiş sorguları) ``query_offhub`` ile eventlet'in thread
+  havuzunda (tpool) çalışır; canlı telemetri bu sırada beklemez.
+- Her bağlantının statement cache'i var; SQL metinleri sabit tutulduğu sürece
+  derlenmiş (prepared) statement yeniden kullanılır.
+"""
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+try:
+    from eventlet import tpool
+except ImportError:  # eventlet yoksa (ör. CLI araçları) doğrudan çağır
+    tpool = None
+
+# Dayanıklılık modları:
+#   normal → WAL + synchronous=NORMAL (elektrik kesintisinde son birkaç commit kaybolabilir, DB bozulmaz)
+#   full   → WAL + synchronous=FULL   (her commit diske fsync)
+DURABILITY_PRAGMAS = {
+    "normal": ("PRAGMA journal_mode=WAL", "PRAGMA synchronous=NORMAL"),
+    "full": ("PRAGMA journal_mode=WAL", "PRAGMA synchronous=FULL"),
+}
+
+_STATEMENT_CACHE = 256  # bağlantı başına saklanan derlenmiş statement sayısı
+
+
+class Database:
+    def __init__(self, db_path, read_pool_size=4, durability="normal", mmap_mb=256, cache_mb=32):
+        if durability not in DURABILITY_PRAGMAS:
+            raise ValueError(f"bilinmeyen durability modu: {durability}")
+        self.db_path = db_path
+        self.durability = durability
+        self.mmap_bytes = int(mmap_mb) * 1024 * 1024
+        self.cache_kib = int(cache_mb) * 1024
+        self._pool = queue.LifoQueue(maxsize=int(read_pool_size))
+        self._write_lock = threading.RLock()
+        self._wcon = None
+
+    # ---- bağlantılar ----
+    def _connect(self, readonly):
+        con = sqlite3.connect(self.db_path, timeout=10.0, check_same_thread=False,
+                              cached_statements=_STATEMENT_CACHE)
+        con.execute("PRAGMA busy_timeout=10000")
+        con.execute(f"PRAGMA mmap_size={self.mmap_bytes}")
+        con.execute(f"PRAGMA cache_size=-{self.cache_kib}")  # negatif → KiB
+        con.execute("PRAGMA temp_store=MEMORY")
+        if readonly:
+            con.execute("PRAGMA query_only=1")
+        else:
+            for p in DURABILITY_PRAGMAS[self.durability]:
+                con.execute(p)
+        return con
+
+    @contextmanager
+    def reader(self):
+        try:
+            con = self._pool.get_nowait()
+        except queue.Empty:
+            con = self._connect(readonly=True)
+        try:
+            yield con
+        finally:
+            try:
+                self._pool.put_nowait(con)
+            except queue.Full:
+                con.close()
+
+    @contextmanager
+    def writer(self):
+        """Tek yazıcı bağlantısı; blok sonunda commit, hata olursa rollback."""
+        with self._write_lock:
+            if self._wcon is None:
+                self._wcon = self._connect(readonly=False)
+            with self._wcon:
+                yield self._wcon
+
+    # ---- okuma ----
+    def query(self, sql, args=(), as_dict=False):
+        with self.reader() as con:
+            cur = con.execute(sql, args)
+            rows = cur.fetchall()
+            if as_dict:
+                keys = [d[0] for d in cur.description]
+                return [dict(zip(keys, r)) for r in rows]
+            return rows
+
+    def query_offhub(self, sql, args=(), as_dict=False):
+        """Uzun sorgular için: eventlet altında thread havuzunda çalıştır."""
+        if tpool is None:
+            return self.query(sql, args, as_dict)
+        return tpool.execute(self.query, sql, args, as_dict)
+
+    def run_offhub(self, fn, *args, **kwargs):
+        """Sorgu + sonrası işleme (json.loads vb.) birlikte hub dışında çalışsın."""
+        if tpool is None:
+            return fn(*args, **kwargs)
+        return tpool.execute(fn, *args, **kwargs)
+
+    # ---- yazma ----
+    def execute(self, sql, args=()):
+        """Tek yazma komutu; (lastrowid, rowcount) döner."""
+        with self.writer() as con:
+            cur = con.execute(sql, args)
+            return cur.lastrowid, cur.rowcount
+
+    def executemany(self, sql, seq):
+        with self.writer() as con:
+            con.executemany(sql, seq)
+
+    def close(self):
+        with self._write_lock:
+            if self._wcon is not None:
+                self._wcon.close()
+                self._wcon = None
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
@@ -0,0 +1,54 @@
+"""
+Uzun aralıklı telemetri geçmişi için seyreltme (downsampling).
+
+- ``lttb_indices``: Largest-Triangle-Three-Buckets. Noktalar eşit kovalara
+  bölünür, her kovadan bir önceki seçilen nokta ve sonraki kovanın ortalaması
+  ile en büyük üçgeni kuran nokta seçilir; ilk ve son nokta hep korunur.
+  Zaman serisinde (x=ts, y=alan) tepe/çukurlar, izde (x=boylam, y=enlem)
+  dönüşler kaybolmaz.
+- ``bucket_ms_for``: zaman kovası genişliği; kova başına min/ort/maks
+  SQL ``GROUP BY`` ile hesaplanır (fake_server.query_telemetry_downsampled).
+"""
+import math
+
+import numpy as np
+
+
+def lttb_indices(x, y, n_out):
+    """x, y: eşit uzunlukta dizi (sıralı). n_out noktaya indirgenmiş indeksler (artan)."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    n_out = max(3, int(n_out))
+    if n <= n_out:
+        return np.arange(n)
+
+    # ilk ve son nokta hariç n_out-2 kova: [edges[i], edges[i+1])
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo = hi
+        nhi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[nlo:nhi].mean()
+        avg_y = y[nlo:nhi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        out[i + 1] = a
+    return out
+
+
+def track_xy(lat, lon):
+    """İz için düzlem koordinatları: boylam enleme göre ölçeklenir (LTTB alanları metreye orantılı)."""
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    k = math.cos(math.radians(float(np.nanmean(lat)))) if len(lat) else 1.0
+    return lon * k, lat
+
+
+def bucket_ms_for(t_min, t_max, max_points):
+    """[t_min, t_max] aralığını en fazla max_points kovaya bölen genişlik (ms, en az 1)."""
+    span = max(0, int(t_max) - int(t_min)) + 1
+    return max(1, -(-span // max(1, int(max_points))))
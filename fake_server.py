@@ -1,18 +1,56 @@
-from flask import Flask, request, jsonify, make_response
+from flask import Flask, request, jsonify, make_response, stream_with_context
 from datetime import datetime, timezone
 import time, math, random
 from flask import request
 from flask_cors import CORS
 from flask_socketio import SocketIO
-from flask import send_file
 from flask import send_from_directory
 import os
 import secrets
 
-app = Flask(__name__)
+app = Flask(__name__, static_folder=None)  # static/ bellekten sunulur (static_files, static_assets.py)
 
 CORS(app, supports_credentials=True)
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode="eventlet")  # dev için *; prod’da domain kısıtla
+
+# --- Çok worker'lı çalışma (serve_workers.py ortam değişkenleriyle ayarlar; yoksa tek süreç) ---
+# IHA_SIO_MQ: Socket.IO mesaj kuyruğu (redis://.. | amqp://.. | sqlite:<dosya> yerel karşılık)
+from sio_queue import make_client_manager
+
+SIO_MESSAGE_QUEUE = os.environ.get("IHA_SIO_MQ")
+SIO_TRANSPORTS = os.environ.get("IHA_SIO_TRANSPORTS")  # panele zorlanan taşıma (ör. "websocket")
+WORKER_ID = os.environ.get("IHA_WORKER_ID")  # None → tek süreç (debug reloader ile)
+
+_sio_options = {}
+if SIO_MESSAGE_QUEUE:
+    _sio_manager = make_client_manager(SIO_MESSAGE_QUEUE)
+    if _sio_manager is not None:
+        _sio_options["client_manager"] = _sio_manager
+    else:
+        _sio_options["message_queue"] = SIO_MESSAGE_QUEUE
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode="eventlet",
+                    **_sio_options)  # dev için *; prod’da domain kısıtla
+
+# --- Loglar: seviyeli, kuyruklu (yazım arka plan thread'inde), olay bazlı örnekleme ---
+# (DB yazıcıdan önce kurulur: atexit ters sırada çalıştığı için yazıcının kapanış logu da yazılır)
+import logging
+from app_logging import setup_logging, event_logger
+
+LOG_LEVEL = os.environ.get("IHA_LOG_LEVEL", "INFO")
+LOG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs",
+                        "iha_server.jsonl" if WORKER_ID is None else "iha_server.w%s.jsonl" % WORKER_ID)  # JSON-lines
+LOG_MAX_MB = 10  # dosya bu boyuta gelince döner
+LOG_BACKUPS = 5
+LOG_SAMPLE = {"telemetry_in": 100, "telemetry_db": 100}  # olay → her N kayıttan 1'i
+LOG_RATE = {"lock_in": 20, "lock_reject": 20, "kamikaze_in": 20}  # olay → saniyede en fazla
+
+log_system = setup_logging(LOG_LEVEL, LOG_FILE, max_bytes=LOG_MAX_MB * 1024 * 1024, backups=LOG_BACKUPS,
+                           sample=LOG_SAMPLE, rate=LOG_RATE)
+log = logging.getLogger("iha.server")
+log_telemetry_in = event_logger(log, "telemetry_in")
+log_telemetry_db = event_logger(log, "telemetry_db", logging.DEBUG)
+log_lock_in = event_logger(log, "lock_in")
+log_lock_reject = event_logger(log, "lock_reject", logging.WARNING)
+log_kamikaze_in = event_logger(log, "kamikaze_in")
 
 # Basit kimlik & oturum
 VALID_USERS = [
@@ -21,27 +59,51 @@ VALID_USERS = [
     {"kadi": "deneme", "sifre": "deneme", "takim": 1}
 ]
 
-ISSUED_TOKENS = {}  # token → team
+ROSTER_TEAMS = frozenset(u["takim"] for u in VALID_USERS)
+LABEL_MAX_TEAMS = 64  # metrik / ret istatistiğinde kadro dışı en fazla bu kadar ayrı takım etiketi
+
+# --- Canlı durum: token'lar, hız sınırı, HSS bayrakları, filo görüntüsü ---
+# IHA_STATE: "memory" (tek süreç) | "sqlite:<dosya>" (aynı makinedeki worker'lar ortak)
+from state_backend import open_state
+
+STATE_BACKEND = os.environ.get("IHA_STATE", "memory")
+state = open_state(STATE_BACKEND)
+
+# In-memory en son telemetri kayıtları: {takim_numarasi: TeamState} (alımda bir kez normalize edilir)
+from team_state import TeamState, json_list
 
-# In-memory en son telemetri kayıtları: {takim_numarasi: {"telemetry": t, "ts": time.time()}}
 _latest_telemetry = {}
 
 # (Opsiyonel) kaç saniyeden eski telemetry'i düşman listesinden çıkarmak istersin
 _TELEMETRY_STALE_SEC = 5.0  # örn. 5 saniye; gerçek testte network koşullarına göre arttırabilirsin
 TEAM_NO = None
 
-# HSS'ler uçağa gönderilsin mi?
+# HSS'ler uçağa gönderilsin mi? (başlangıç değeri; canlı değer state'te, bkz. hss_send_enabled())
 HSS_SEND_ENABLED = True
 
-# HSS sisteminin aktif/pasif durumu (UI'den kontrol edilebilir)
+# HSS sisteminin aktif/pasif durumu (UI'den kontrol edilebilir; canlı değer: hss_system_active())
 HSS_SYSTEM_ACTIVE = False  # Başlangıçta KAPALI
 
+
+def hss_send_enabled():
+    return state.get_flag("hss_send_enabled", HSS_SEND_ENABLED)
+
+
+def hss_system_active():
+    return state.get_flag("hss_system_active", HSS_SYSTEM_ACTIVE)
+
 TOKEN = "fake_token_123"
 SESSION_COOKIE = "sessionid"
 
-# 2 Hz limiti (takım bazlı)
-_last_telemetry_ts = {}
-_RATE_PERIOD = 0.5  # saniye → 2 Hz
+# Takım başına token bucket (state'te): ortalama 2 Hz, ağ titremesi için kısa burst
+TELEMETRY_RATE_HZ = 2.0
+TELEMETRY_BURST = float(os.environ.get("IHA_TELEMETRY_BURST", 2))  # art arda kabul edilebilecek en fazla paket
+
+# Toplu alım (/api/telemetri_toplu): bağlantı kopunca biriken paketler; hız sınırına tabi değil
+TELEMETRY_BATCH_MAX = 5000  # istek başına en fazla paket
+TELEMETRY_BATCH_MAX_AGE_SEC = 3600  # gps_saati bundan eskiyse paket reddedilir
+TELEMETRY_BATCH_RECENT_SEC = 30  # kuyruğa atılan (takım, ts_ms) bu kadar süre state'te de tutulur
+TELEMETRY_BATCH_RECENT_MAX = 100000
 
 # --- HSS pencere kontrolü ---
 _HSS_EMPTY1_SEC = 10  # ilk 10 saniye boş
@@ -53,49 +115,127 @@ import os, sqlite3, json
 
 DB_PATH = os.path.join(os.path.dirname(__file__), "iha_logs.db")
 
+# --- DB erişim katmanı (okuma havuzu + tek yazıcı) ---
+from db_access import Database
+
+DB_READ_POOL = 4  # kalıcı okuma bağlantısı sayısı
+DB_MMAP_MB = 256  # PRAGMA mmap_size
+DB_CACHE_MB = 32  # PRAGMA cache_size (bağlantı başına)
+DB_DURABILITY = os.environ.get("IHA_DB_DURABILITY", "normal")  # "normal" (WAL+NORMAL) | "full" (WAL+FULL)
+
+db = Database(DB_PATH, read_pool_size=DB_READ_POOL, durability=DB_DURABILITY,
+              mmap_mb=DB_MMAP_MB, cache_mb=DB_CACHE_MB)
+
+# --- Zaman damgaları: epoch ms + tek biçim ISO (YYYY-MM-DDTHH:MM:SS.mmmZ) ---
+from utc_time import TS_MS_FROM_ISO_SQL, now_ms, iso_from_ms, now_iso, parse_ts_ms, ms_from_clock
+from history_stream import HistoryStreamer, QueryRejected, keyset_clause, next_cursor, KEYSET_ORDER
+from downsample import lttb_indices, track_xy, bucket_ms_for
+from replay import ReplayManager
+from packet_store import convert_rows, split_telemetry, split_lock
+
+# --- Arka plan DB yazıcı (group commit) ---
+from telemetry_writer import TelemetryWriter
+import atexit
+
+DB_WRITE_BATCH_ROWS = 200  # bu kadar satır birikince commit
+DB_WRITE_FLUSH_MS = 250  # ya da en geç bu kadar milisaniyede bir commit
+DB_WRITE_QUEUE_MAX = 20000  # kuyruk dolarsa satır düşürülür (istek bloklanmaz)
+
+db_writer = TelemetryWriter(db, batch_rows=DB_WRITE_BATCH_ROWS, flush_ms=DB_WRITE_FLUSH_MS,
+                            queue_max=DB_WRITE_QUEUE_MAX)
+atexit.register(db.close)
+atexit.register(db_writer.stop)  # kapanışta kuyrukta kalanları yaz (atexit ters sırada çalışır)
+
+# --- HSS bellek içi tablo (DB sadece kalıcılık için) ---
+from hss_store import HssStore
+
+hss_store = HssStore(db)
+
+# --- Derlenmiş geofence motoru (fence değişince yeniden eşitlenir) ---
+from geofence import FenceEngine
+
+fence_engine = FenceEngine()
+
+# --- Vektörize bölge motoru (tüm filo × tüm fence/HSS tek geçişte) ---
+from zone_engine import ZoneEngine
+
+zone_engine = ZoneEngine(fence_engine, hss_store)
+ZONE_SWEEP_SEC = 1.0  # tüm filo bölge taraması periyodu (saniye)
+_fleet_zones = {}  # takım → {"fences": [id...], "hss": [id...]} (son tarama sonucu)
+
+# --- Takım başına bölge durum makinesi (sadece giriş/çıkışta olay) ---
+from zone_state import ZoneStateMachine
+
+ZONE_DEBOUNCE = 2  # durum değişimi için arka arkaya kaç paket gerekli (GPS titremesi; 1 = kapalı)
+zone_states = ZoneStateMachine(debounce=ZONE_DEBOUNCE, store=state)  # worker'lar arasında ortak (IHA_STATE)
+
 
 def init_db():
-    con = sqlite3.connect(DB_PATH)
-    cur = con.cursor()
+    with db.writer() as con:
+        cur = con.cursor()
+        _create_schema(cur)
+        _migrate_schema(cur)
+    log.info("✅ DB hazır: %s", DB_PATH)
+
+
+def _create_schema(cur):
     cur.execute("""
     CREATE TABLE IF NOT EXISTS telemetry (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         ts_utc TEXT NOT NULL,
+        ts_ms INTEGER,                 -- epoch ms (UTC); sorgular bunu kullanır
         takim INTEGER NOT NULL,
         enlem REAL,
         boylam REAL,
         irtifa REAL,
         hiz REAL,
         batarya INTEGER,
-        raw_json TEXT
+        dikilme REAL,                  -- sık okunan paket alanları (packet_store)
+        yonelme REAL,
+        yatis REAL,
+        otonom INTEGER,
+        kilitlenme INTEGER,
+        hedef_merkez_X INTEGER,
+        hedef_merkez_Y INTEGER,
+        hedef_genislik INTEGER,
+        hedef_yukseklik INTEGER,
+        gps_saat INTEGER,
+        gps_dakika INTEGER,
+        gps_saniye INTEGER,
+        gps_milisaniye INTEGER,
+        raw_z BLOB,                    -- kolonlara girmeyen alanlar (sıkıştırılmış; çoğunlukla NULL)
+        toplu INTEGER                  -- 1: /api/telemetri_toplu ile geldi (ts_ms = gps_saati); canlıda NULL
     );
     """)
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_telemetry_takim_ts ON telemetry(takim, ts_utc);")
 
     cur.execute("""
     CREATE TABLE IF NOT EXISTS locks (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         ts_utc TEXT NOT NULL,
+        ts_ms INTEGER,
         kaynak_takim INTEGER,
         kilitlenen_takim INTEGER,
         otonom_kilitlenme INTEGER NOT NULL,
         kilit_bitis_gps TEXT,
-        extra_json TEXT
+        hedef_merkez_X INTEGER,
+        hedef_merkez_Y INTEGER,
+        hedef_genislik INTEGER,
+        hedef_yukseklik INTEGER,
+        extra_z BLOB                   -- kolonlara girmeyen alanlar (sıkıştırılmış; çoğunlukla NULL)
     );
     """)
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_locks_ts ON locks(ts_utc);")
 
     cur.execute("""
         CREATE TABLE IF NOT EXISTS kamikaze (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             ts_utc TEXT NOT NULL,              -- ISO8601 UTC (server zamanı)
+            ts_ms INTEGER,                     -- aynı an, epoch ms
             kaynak_takim INTEGER,              -- gönderende varsa
             qr_metni TEXT NOT NULL,
             baslangic_gps TEXT NOT NULL,       -- JSON string
             bitis_gps TEXT NOT NULL,           -- JSON string
             extra_json TEXT                    -- ham paket / ek alanlar
         )""")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_kamikaze_ts ON kamikaze(ts_utc)")
 
     cur.execute("""
     CREATE TABLE IF NOT EXISTS fences (
@@ -122,20 +262,57 @@ def init_db():
     """)
     cur.execute("CREATE INDEX IF NOT EXISTS idx_hss_active ON hss(active);")
 
-    con.commit()
-    con.close()
-    print("✅ DB hazır:", DB_PATH)
 
-
-def now_iso():
-    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+SCHEMA_VERSION = 4  # PRAGMA user_version
+
+
+def _migrate_schema(cur):
+    """Eski DB'leri güncelle (PRAGMA user_version ile bir kez çalışır)."""
+    ver = cur.execute("PRAGMA user_version").fetchone()[0]
+    if ver < 1:
+        # 1: olay tablolarına ts_ms (epoch ms) — ts_utc metninden doldur, ts_utc indekslerini kaldır
+        for table in ("telemetry", "locks", "kamikaze"):
+            cols = {r[1] for r in cur.execute(f"PRAGMA table_info({table})")}
+            if "ts_ms" not in cols:
+                cur.execute(f"ALTER TABLE {table} ADD COLUMN ts_ms INTEGER")
+            cur.execute(f"UPDATE {table} SET ts_ms = {TS_MS_FROM_ISO_SQL} WHERE ts_ms IS NULL")
+        for idx in ("idx_telemetry_takim_ts", "idx_locks_ts", "idx_kamikaze_ts"):
+            cur.execute(f"DROP INDEX IF EXISTS {idx}")
+    if ver < 2:
+        # 2: telemetri indekslerine id eklendi (sayfalama sırası (ts_ms, id) indeksten gelsin)
+        for idx in ("idx_telemetry_takim_tsms", "idx_telemetry_tsms"):
+            cur.execute(f"DROP INDEX IF EXISTS {idx}")
+    if ver < 3:
+        # 3: raw_json / extra_json → tipli kolonlar + sıkıştırılmış kalan (büyük DB'ler için önceden:
+        #    python packet_store.py --db iha_logs.db; VACUUM + kazanç raporu)
+        stats = convert_rows(cur)
+        if stats["telemetry"] or stats["locks"]:
+            log.info("🗜️ ham paketler dönüştürüldü: %s", stats)
+    if ver < 4:
+        # 4: toplu alım satırlarını işaretleyen kolon (eski satırlar canlı sayılır: NULL)
+        cols = {r[1] for r in cur.execute("PRAGMA table_info(telemetry)")}
+        if "toplu" not in cols:
+            cur.execute("ALTER TABLE telemetry ADD COLUMN toplu INTEGER")
+    if ver < SCHEMA_VERSION:
+        cur.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    # Toplu yeniden gönderim aynı paketi iki kez yazamasın (yazıcı INSERT OR IGNORE kullanır).
+    # Yalnız toplu satırlar: canlı satırlar sunucu saatiyle anahtarlanır, aynı ms'de iki paket geçerlidir.
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_telemetry_toplu_takim_tsms "
+                "ON telemetry(takim, ts_ms) WHERE toplu = 1")
+    # Kapsayan (covering) indeksler: geçmiş sorguları tabloya dönmeden indeksten cevaplanır
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_telemetry_takim_tsms_id "
+                "ON telemetry(takim, ts_ms, id, enlem, boylam, irtifa, hiz, batarya)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_telemetry_tsms_id "
+                "ON telemetry(ts_ms, id, takim, enlem, boylam, irtifa, hiz, batarya)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_locks_kaynak_tsms ON locks(kaynak_takim, ts_ms)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_locks_tsms ON locks(ts_ms)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_kamikaze_kaynak_tsms ON kamikaze(kaynak_takim, ts_ms)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_kamikaze_tsms ON kamikaze(ts_ms)")
 
 
 def list_fences():
-    con = sqlite3.connect(DB_PATH);
-    cur = con.cursor()
-    rows = cur.execute("SELECT id,name,kind,geojson,color,updated_at FROM fences ORDER BY id").fetchall()
-    con.close()
+    rows = db.query("SELECT id,name,kind,geojson,color,updated_at FROM fences ORDER BY id")
     keys = ["id", "name", "kind", "geojson", "color", "updated_at"]
     out = [dict(zip(keys, r)) for r in rows]
     for r in out:
@@ -146,13 +323,21 @@ def list_fences():
     return out
 
 
+_fence_items = []  # son reload_fences() listesi (GET /api/fences bundan serileştirilir)
+
+
+def reload_fences():
+    """Fence tablosu değişince (ve açılışta) motoru eşitle; güncel listeyi döndür."""
+    global _fence_items
+    items = list_fences()
+    fence_engine.sync(items)
+    _fence_items = items
+    return items
+
+
 def list_hss():
-    con = sqlite3.connect(DB_PATH);
-    cur = con.cursor()
-    rows = cur.execute("SELECT id,name,lat,lon,radius,active,updated_at FROM hss WHERE active=1 ORDER BY id").fetchall()
-    con.close()
-    keys = ["id", "name", "lat", "lon", "radius", "active", "updated_at"]
-    return [dict(zip(keys, r)) for r in rows]
+    # Bellekteki tablodan (DB'ye gitmez); dönen listeyi değiştirmeyin
+    return hss_store.items()
 
 
 def distance_m(lat1, lon1, lat2, lon2):
@@ -168,98 +353,75 @@ def distance_m(lat1, lon1, lat2, lon2):
 
 
 def is_inside_hss(lat, lon):
-    """Aktif HSS'lerden herhangi birinin içinde mi?"""
+    """Aktif HSS'lerden herhangi birinin içinde mi? (zone_engine, yerel ENU yarıçap testi)"""
     try:
-        for it in list_hss():
-            h_lat = float(it["lat"])
-            h_lon = float(it["lon"])
-            r = float(it["radius"])
-            d = distance_m(lat, lon, h_lat, h_lon)
-            if d <= r:
-                return True
+        return zone_engine.inside_any_hss(lat, lon)
     except Exception as e:
-        print("⚠️ is_inside_hss hata:", e)
+        log.warning("⚠️ is_inside_hss hata: %s", e)
     return False
 
 
 def insert_hss(name, lat, lon, radius):
-    con = sqlite3.connect(DB_PATH);
-    cur = con.cursor()
-    cur.execute("INSERT INTO hss(name,lat,lon,radius,active,updated_at) VALUES (?,?,?,?,1,?)",
-                (name, float(lat), float(lon), float(radius), now_iso()))
-    con.commit();
-    _id = cur.lastrowid;
-    con.close()
-    return _id
+    hid = hss_store.insert(name, float(lat), float(lon), float(radius), now_iso())
+    state.bump("hss")  # diğer worker'lar yeniden yüklesin
+    return hid
 
 
 def update_hss(hid, **fields):
     if not fields: return
-    sets, args = [], []
-    for k in ("name", "lat", "lon", "radius", "active"):
-        if k in fields: sets.append(f"{k}=?"); args.append(fields[k])
-    sets.append("updated_at=?");
-    args.append(now_iso())
-    args.append(int(hid))
-    con = sqlite3.connect(DB_PATH);
-    cur = con.cursor()
-    cur.execute(f"UPDATE hss SET {', '.join(sets)} WHERE id=?", args)
-    con.commit();
-    con.close()
+    hss_store.update(hid, fields, now_iso())
+    state.bump("hss")
 
 
 def delete_hss(hid):
-    con = sqlite3.connect(DB_PATH);
-    cur = con.cursor()
-    cur.execute("DELETE FROM hss WHERE id=?", (int(hid),))
-    con.commit();
-    con.close()
+    hss_store.delete(hid)
+    state.bump("hss")
 
 
 def save_kamikaze_row(payload: dict):
-    """/api/kamikaze_bilgisi gelen paketi kalıcı kaydet"""
-    import json, datetime
-    ts_utc = datetime.datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+    """/api/kamikaze_bilgisi gelen paketi kalıcı kaydet (arka plan yazıcı kuyruğuna)"""
+    import json
+    ts_ms = now_ms()
 
     kaynak = payload.get("kaynak_takim")  # yoksa None kalır
     qr = payload.get("qrMetni")
     kb = payload.get("kamikazeBaslangicZamani", {})
     ke = payload.get("kamikazeBitisZamani", {})
 
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO kamikaze (ts_utc, kaynak_takim, qr_metni, baslangic_gps, bitis_gps, extra_json)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (ts_utc, kaynak, qr, json.dumps(kb), json.dumps(ke), json.dumps(payload)))
-    conn.commit()
-    conn.close()
+    db_writer.submit("kamikaze", (iso_from_ms(ts_ms), ts_ms, kaynak, qr, json.dumps(kb), json.dumps(ke),
+                                  json.dumps(payload)))
 
 
-def query_kamikaze_history(kaynak=None, start=None, end=None, limit=1000):
-    """UI tarih filtresi için socket’ten sorgulanır"""
-    import json
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
+def query_kamikaze_history(kaynak=None, start=None, end=None, limit=1000, cursor=None):
+    """UI tarih filtresi için socket’ten sorgulanır (sorgu + JSON çözme hub dışında)"""
+    return db.run_offhub(_query_kamikaze_history, kaynak, start, end, limit, cursor)
 
-    sql = "SELECT ts_utc, kaynak_takim, qr_metni, baslangic_gps, bitis_gps FROM kamikaze WHERE 1=1"
+
+def _query_kamikaze_history(kaynak, start, end, limit, cursor=None):
+    import json
+    sql = "SELECT id, ts_ms, kaynak_takim, qr_metni, baslangic_gps, bitis_gps FROM kamikaze WHERE 1=1"
     args = []
     if kaynak not in (None, "", "null"):
         sql += " AND kaynak_takim = ?"
         args.append(int(kaynak))
-    if start:
-        sql += " AND ts_utc >= ?";
-        args.append(start)
-    if end:
-        sql += " AND ts_utc <= ?";
-        args.append(end)
-    sql += " ORDER BY ts_utc DESC LIMIT ?"
-    args.append(int(limit))
-
-    rows = [dict(r) for r in cur.execute(sql, args).fetchall()]
+    start_ms, end_ms = parse_ts_ms(start), parse_ts_ms(end, end=True)
+    if start_ms is not None:
+        sql += " AND ts_ms >= ?";
+        args.append(start_ms)
+    if end_ms is not None:
+        sql += " AND ts_ms <= ?";
+        args.append(end_ms)
+    ks_sql, ks_args = keyset_clause(cursor)
+    sql += ks_sql + KEYSET_ORDER
+    args += ks_args
+    if limit:
+        sql += " LIMIT ?"
+        args.append(int(limit))
+
+    rows = db.query(sql, args, as_dict=True)
     # JSON alanları dict’e çevir
     for r in rows:
+        r["ts_utc"] = iso_from_ms(r["ts_ms"])
         try:
             r["baslangic_gps"] = json.loads(r["baslangic_gps"]) if r["baslangic_gps"] else None
         except:
@@ -268,43 +430,146 @@ def query_kamikaze_history(kaynak=None, start=None, end=None, limit=1000):
             r["bitis_gps"] = json.loads(r["bitis_gps"]) if r["bitis_gps"] else None
         except:
             pass
-    conn.close()
     return rows
 
 
-def query_telemetry_history(takim=None, start_iso=None, end_iso=None, limit=1000):
-    """
-    telemetry tablosundan filtreli veri çeker.
-    start_iso / end_iso -> 'YYYY-MM-DDTHH:MM:SSZ' gibi ISO (UTC)
-    """
-    q = "SELECT ts_utc, takim, enlem, boylam, irtifa, hiz, batarya FROM telemetry WHERE 1=1"
+def _telemetry_where(takim, start_iso, end_iso):
+    q = " WHERE 1=1"
     params = []
     if takim is not None and str(takim).strip() != "":
         q += " AND takim = ?"
         params.append(int(takim))
-    if start_iso:
-        q += " AND ts_utc >= ?"
-        params.append(start_iso)
-    if end_iso:
-        q += " AND ts_utc <= ?"
-        params.append(end_iso)
-    q += " ORDER BY ts_utc DESC"
+    start_ms, end_ms = parse_ts_ms(start_iso), parse_ts_ms(end_iso, end=True)
+    if start_ms is not None:
+        q += " AND ts_ms >= ?"
+        params.append(start_ms)
+    if end_ms is not None:
+        q += " AND ts_ms <= ?"
+        params.append(end_ms)
+    return q, params
+
+
+def query_telemetry_history(takim=None, start_iso=None, end_iso=None, limit=1000, cursor=None):
+    """
+    telemetry tablosundan filtreli veri çeker.
+    start_iso / end_iso -> 'YYYY-MM-DDTHH:MM:SSZ' gibi ISO (UTC) ya da epoch ms
+    Filtre ts_ms üzerinde; sorgu kapsayan indeksten (takim, ts_ms, id, ...) cevaplanır.
+    cursor: önceki sayfanın next_cursor'ı ('<ts_ms>:<id>'), (ts_ms, id) azalan keyset sayfalama.
+    """
+    where, params = _telemetry_where(takim, start_iso, end_iso)
+    q = "SELECT id, ts_ms, takim, enlem, boylam, irtifa, hiz, batarya FROM telemetry" + where
+    ks_sql, ks_args = keyset_clause(cursor)
+    q += ks_sql + KEYSET_ORDER
+    params += ks_args
     if limit:
         q += f" LIMIT {int(limit)}"
 
-    con = sqlite3.connect(DB_PATH)
-    cur = con.cursor()
-    rows = cur.execute(q, params).fetchall()
-    con.close()
+    rows = db.query_offhub(q, params)
 
-    # dict listeye çevir
-    keys = ["ts_utc", "takim", "enlem", "boylam", "irtifa", "hiz", "batarya"]
-    return [dict(zip(keys, r)) for r in rows]
+    # dict listeye çevir (ts_utc ts_ms'ten üretilir; tabloya dönmeye gerek yok)
+    keys = ["id", "ts_ms", "takim", "enlem", "boylam", "irtifa", "hiz", "batarya"]
+    out = []
+    for r in rows:
+        d = dict(zip(keys, r))
+        d["ts_utc"] = iso_from_ms(r[1])
+        out.append(d)
+    return out
 
 
-def query_locks_history(kaynak=None, kilitlenen=None, start_iso=None, end_iso=None, limit=1000):
-    import sqlite3, json
-    q = """SELECT ts_utc, kaynak_takim, kilitlenen_takim, otonom_kilitlenme, kilit_bitis_gps, extra_json
+def query_telemetry_downsampled(takim=None, start_iso=None, end_iso=None, max_points=2000, mode="lttb",
+                                resolution=None, field=None, cap=5000):
+    """
+    Uzun aralık için seyreltilmiş telemetri (hesap hub dışında). Takım başına ayrı yapılır;
+    takım verilmezse max_points takımlar arasında paylaştırılır.
+      mode="lttb":   ham satırlardan LTTB ile seçilmiş gerçek noktalar.
+                     field=None → iz şekli (enlem/boylam), "irtifa"/"hiz"/"batarya" → o alanın zaman serisi.
+      mode="bucket": zaman kovası başına ortalama + <alan>_min/<alan>_max (irtifa, hız, batarya), n = satır sayısı.
+                     resolution (sn) verilmezse aralık max_points kovaya bölünür.
+    Dönüş: (satırlar (ts_ms azalan), bilgi dict'i)
+    """
+    return db.run_offhub(_query_telemetry_downsampled, takim, start_iso, end_iso, max_points, mode,
+                         resolution, field, cap)
+
+
+_DS_FIELDS = ("irtifa", "hiz", "batarya")
+
+
+def _query_telemetry_downsampled(takim, start_iso, end_iso, max_points, mode, resolution, field, cap):
+    import numpy as np
+    max_points = max(3, min(int(max_points or 2000), int(cap)))
+    where, params = _telemetry_where(takim, start_iso, end_iso)
+    t_min, t_max, n_teams = db.query("SELECT MIN(ts_ms), MAX(ts_ms), COUNT(DISTINCT takim) FROM telemetry" + where,
+                                     params)[0]
+    info = {"mode": mode, "source_rows": 0, "points": 0}
+    if t_min is None:
+        return [], info
+    per_team = max(3, max_points // max(1, n_teams))
+
+    if mode == "bucket":
+        bucket = int(float(resolution) * 1000) if resolution else bucket_ms_for(t_min, t_max, per_team)
+        bucket = max(1, bucket)
+        aggs = ", ".join(f"MIN({f}), AVG({f}), MAX({f})" for f in _DS_FIELDS)
+        # kovalar aralığın başına hizalı (t_min); kova zamanı = kova başlangıcı
+        rows = db.query(f"SELECT takim, (ts_ms - {int(t_min)}) / {bucket} AS b, COUNT(*), AVG(enlem), AVG(boylam), "
+                        f"{aggs} FROM telemetry{where} GROUP BY takim, b ORDER BY b DESC, takim LIMIT ?",
+                        params + [max_points + 1])
+        truncated = len(rows) > max_points  # en eski kovalar sınır nedeniyle kesildi
+        out = []
+        for r in rows[:max_points]:
+            ts = t_min + r[1] * bucket
+            d = {"ts_ms": ts, "ts_utc": iso_from_ms(ts), "takim": r[0], "n": r[2], "enlem": r[3], "boylam": r[4]}
+            for i, f in enumerate(_DS_FIELDS):
+                d[f + "_min"], d[f], d[f + "_max"] = r[5 + 3 * i: 8 + 3 * i]
+            out.append(d)
+        info.update(source_rows=sum(d["n"] for d in out), points=len(out), bucket_ms=bucket, truncated=truncated)
+        return out, info
+
+    rows = db.query("SELECT takim, ts_ms, enlem, boylam, irtifa, hiz, batarya FROM telemetry" + where +
+                    " ORDER BY takim, ts_ms", params)
+    info["source_rows"] = len(rows)
+    if not rows:
+        return [], info
+    arr = np.array(rows, dtype=np.float64)  # NULL → nan
+    keys = ("takim", "ts_ms", "enlem", "boylam", "irtifa", "hiz", "batarya")
+    ycol = keys.index(field) if field in _DS_FIELDS else None
+    out = []
+    for team in np.unique(arr[:, 0]):
+        a = arr[arr[:, 0] == team]
+        if ycol is None:
+            a = a[~np.isnan(a[:, 2]) & ~np.isnan(a[:, 3])]
+            x, y = track_xy(a[:, 2], a[:, 3])
+        else:
+            a = a[~np.isnan(a[:, ycol])]
+            x, y = a[:, 1], a[:, ycol]
+        for i in lttb_indices(x, y, per_team):
+            row = _ds_row(keys, a[i])
+            out.append(row)
+    out.sort(key=lambda d: d["ts_ms"], reverse=True)
+    info["points"] = len(out)
+    return out, info
+
+
+def _ds_row(keys, values):
+    d = {}
+    for k, v in zip(keys, values.tolist()):
+        d[k] = None if v != v else v
+    d["takim"] = int(d["takim"])
+    d["ts_ms"] = int(d["ts_ms"])
+    if d["batarya"] is not None:
+        d["batarya"] = int(d["batarya"])
+    d["ts_utc"] = iso_from_ms(d["ts_ms"])
+    return d
+
+
+def query_locks_history(kaynak=None, kilitlenen=None, start_iso=None, end_iso=None, limit=1000, cursor=None):
+    # sorgu + JSON çözme hub dışında çalışsın
+    return db.run_offhub(_query_locks_history, kaynak, kilitlenen, start_iso, end_iso, limit, cursor)
+
+
+def _query_locks_history(kaynak, kilitlenen, start_iso, end_iso, limit, cursor=None):
+    import json
+    q = """SELECT id, ts_ms, kaynak_takim, kilitlenen_takim, otonom_kilitlenme, kilit_bitis_gps,
+                  hedef_merkez_X, hedef_merkez_Y, hedef_genislik, hedef_yukseklik
            FROM locks WHERE 1=1"""
     params = []
     if kaynak not in (None, "", "null", "None"):
@@ -313,102 +578,101 @@ def query_locks_history(kaynak=None, kilitlenen=None, start_iso=None, end_iso=No
     if kilitlenen not in (None, "", "null", "None"):
         q += " AND kilitlenen_takim = ?";
         params.append(int(kilitlenen))
-    if start_iso:
-        q += " AND ts_utc >= ?";
-        params.append(start_iso)
-    if end_iso:
-        q += " AND ts_utc <= ?";
-        params.append(end_iso)
-    q += " ORDER BY ts_utc DESC"
+    start_ms, end_ms = parse_ts_ms(start_iso), parse_ts_ms(end_iso, end=True)
+    if start_ms is not None:
+        q += " AND ts_ms >= ?";
+        params.append(start_ms)
+    if end_ms is not None:
+        q += " AND ts_ms <= ?";
+        params.append(end_ms)
+    ks_sql, ks_args = keyset_clause(cursor)
+    q += ks_sql + KEYSET_ORDER
+    params += ks_args
     if limit:
         q += f" LIMIT {int(limit)}"
 
-    con = sqlite3.connect(DB_PATH)
-    cur = con.cursor()
-    rows = cur.execute(q, params).fetchall()
-    con.close()
+    rows = db.query(q, params)
 
-    keys = ["ts_utc", "kaynak_takim", "kilitlenen_takim", "otonom_kilitlenme", "kilit_bitis_gps", "extra_json"]
+    keys = ["id", "ts_ms", "kaynak_takim", "kilitlenen_takim", "otonom_kilitlenme", "kilit_bitis_gps",
+            "hedef_merkez_X", "hedef_merkez_Y", "hedef_genislik", "hedef_yukseklik"]
     out = [dict(zip(keys, r)) for r in rows]
 
     for r in out:
+        r["ts_utc"] = iso_from_ms(r["ts_ms"])
         # kilit_bitis_gps string ise dict yap
         try:
             if isinstance(r["kilit_bitis_gps"], str) and r["kilit_bitis_gps"].strip():
                 r["kilit_bitis_gps"] = json.loads(r["kilit_bitis_gps"])
         except:
             pass
-
-        # extra_json’dan LOCK_FIELDS alanlarını çıkar
-        r["hedef_merkez_X"] = r["hedef_merkez_Y"] = r["hedef_genislik"] = r["hedef_yukseklik"] = None
-        try:
-            ej = r.get("extra_json")
-            if isinstance(ej, str) and ej.strip():
-                ej = json.loads(ej)
-            if isinstance(ej, dict):
-                r["hedef_merkez_X"] = ej.get("hedef_merkez_X")
-                r["hedef_merkez_Y"] = ej.get("hedef_merkez_Y")
-                r["hedef_genislik"] = ej.get("hedef_genislik")
-                r["hedef_yukseklik"] = ej.get("hedef_yukseklik")
-        except:
-            pass
-
-        # artık istemiyoruz
-        r.pop("extra_json", None)
     return out
 
 
-def utc_now():
-    from datetime import datetime, timezone
-    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+def save_telemetry_row(takim, t, v=None):
+    """v: doğrulayıcının tipli değerleri (verilirse alanlar yeniden dönüştürülmez)."""
+    if v is None:
+        v = {"iha_enlem": float(t.get("iha_enlem", 0.0)),
+             "iha_boylam": float(t.get("iha_boylam", 0.0)),
+             "iha_irtifa": float(t.get("iha_irtifa", 0.0)),
+             "iha_hiz": float(t.get("iha_hiz", 0.0)),
+             "iha_batarya": int(t.get("iha_batarya", 0))}
+    db_writer.submit("telemetry", telemetry_row(takim, t, v, now_ms()))
+    log_telemetry_db("📝 telemetry→DB takım=%s", takim)
 
 
-def save_telemetry_row(takim, t):
-    con = sqlite3.connect(DB_PATH)
-    cur = con.cursor()
-    cur.execute("""
-        INSERT INTO telemetry (ts_utc, takim, enlem, boylam, irtifa, hiz, batarya, raw_json)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        utc_now(), int(takim),
-        float(t.get("iha_enlem", 0.0)),
-        float(t.get("iha_boylam", 0.0)),
-        float(t.get("iha_irtifa", 0.0)),
-        float(t.get("iha_hiz", 0.0)),
-        int(t.get("iha_batarya", 0)),
-        json.dumps(t, ensure_ascii=False)
-    ))
-    con.commit()
-    con.close()
-    print("📝 telemetry→DB takım=", takim)
+def telemetry_row(takim, t, v, ts_ms):
+    """telemetry tablosu satırı (v: doğrulayıcının tipli değerleri)."""
+    # paketin kolonlara girmeyen kısmı split_telemetry'de sıkıştırılır (çoğunlukla hiç kalmaz)
+    base = (int(takim), v["iha_enlem"], v["iha_boylam"], v["iha_irtifa"], v["iha_hiz"], v["iha_batarya"])
+    return (iso_from_ms(ts_ms), ts_ms) + base + split_telemetry(t, base)
 
 
 def save_lock_row(payload: dict):
-    con = sqlite3.connect(DB_PATH)
-    cur = con.cursor()
-    cur.execute("""
-        INSERT INTO locks (ts_utc, kaynak_takim, kilitlenen_takim, otonom_kilitlenme, kilit_bitis_gps, extra_json)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (
-        utc_now(),
-        payload.get("kaynak_takim"),
-        payload.get("kilitlenen_takim"),
-        int(payload.get("otonom_kilitlenme", 0)),
-        json.dumps(payload.get("kilitlenmeBitisZamani", {}), ensure_ascii=False),
-        json.dumps(payload, ensure_ascii=False)
-    ))
-    con.commit()
-    con.close()
+    ts_ms = now_ms()
+    base = (payload.get("kaynak_takim"), payload.get("kilitlenen_takim"), int(payload.get("otonom_kilitlenme", 0)))
+    gps_json = json.dumps(payload.get("kilitlenmeBitisZamani", {}), ensure_ascii=False)
+    db_writer.submit("locks", (iso_from_ms(ts_ms), ts_ms) + base + (gps_json,) + split_lock(payload, base, gps_json))
+
+
+# --- Panel kabuğu ve static/: açılışta sıkıştırılıp bellekte tutulur, özetli adresler immutable ---
+from static_assets import AssetStore
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+assets = AssetStore(os.path.join(HERE, "static"))
 
 
 @app.route('/static/<path:path>')
 def static_files(path):
-    return send_from_directory('static', path)
+    asset, cache_control = assets.lookup(path)
+    if asset is None:
+        return send_from_directory('static', path)
+    return assets.serve(app.response_class, request, asset, cache_control)
+
+
+_dashboard_page = None
+_dashboard_mtime = None
+
+
+def dashboard_page():
+    """ui.html: static adresleri özetli, sıkıştırılmış (debug modda dosya değişince yeniden kurulur)."""
+    global _dashboard_page, _dashboard_mtime
+    path = os.path.join(HERE, "ui.html")
+    if _dashboard_page is not None and not app.debug:
+        return _dashboard_page
+    mtime = os.path.getmtime(path)
+    if _dashboard_page is None or mtime != _dashboard_mtime:
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        if SIO_TRANSPORTS:
+            # çok worker'da long-polling istekleri farklı worker'lara düşebilir → tek bağlantılı taşıma
+            html = html.replace('transports: ["polling"]', "transports: " + json.dumps(SIO_TRANSPORTS.split(",")))
+        _dashboard_page, _dashboard_mtime = assets.page("ui.html", html), mtime
+    return _dashboard_page
 
 
 @app.route("/dashboard")
 def dashboard():
-    return send_file("ui.html")
+    return assets.serve(app.response_class, request, dashboard_page())
 
 
 def server_now_dict():
@@ -429,7 +693,7 @@ def ok_auth():
         return True
 
     # Gerçek login tokenı
-    if tok in ISSUED_TOKENS:
+    if state.token_team(tok) is not None:
         return True
 
     return False
@@ -465,9 +729,9 @@ def giris():
 
     # rastgele token üret
     token = secrets.token_hex(16)
-    ISSUED_TOKENS[token] = user["takim"]
+    state.issue_token(token, user["takim"])
 
-    print(f"🔐 Login OK: {kadi} → team {user['takim']} | token={token}")
+    log.info("🔐 Login OK: %s → team %s | token=%s", kadi, user['takim'], token)
 
     return jsonify({
         "takim_numarasi": user["takim"],
@@ -489,58 +753,208 @@ REQUIRED_FIELDS = [
 LOCK_FIELDS = ["hedef_merkez_X", "hedef_merkez_Y", "hedef_genislik", "hedef_yukseklik"]
 
 
+# Aralık tablosu: alan → (dönüştürücü, alt, üst, üst_açık_mı); None → sınırsız
+TELEMETRY_RANGES = {
+    "takim_numarasi": (int, None, None, False),
+    "iha_enlem": (float, -90, 90, False),
+    "iha_boylam": (float, -180, 180, False),
+    "iha_irtifa": (float, 0, 10000, False),
+    "iha_dikilme": (float, -90, 90, False),
+    "iha_yonelme": (float, 0, 360, False),
+    "iha_yatis": (float, -90, 90, False),
+    "iha_hiz": (float, 0, 200, False),
+    "iha_batarya": (int, 0, 100, False),
+    "iha_otonom": (int, 0, 1, False),
+    "iha_kilitlenme": (int, 0, 1, False),
+}
+GPS_RANGES = {
+    "saat": (int, 0, 24, True),
+    "dakika": (int, 0, 60, True),
+    "saniye": (int, 0, 60, True),
+    "milisaniye": (int, 0, 1000, True),
+}
+
+from telemetry_schema import TelemetryValidator
+
+telemetry_validator = TelemetryValidator(REQUIRED_FIELDS, LOCK_FIELDS, TELEMETRY_RANGES, GPS_RANGES,
+                                         known_teams=ROSTER_TEAMS, max_teams=LABEL_MAX_TEAMS)
+
+
 def validate_telemetry(t):
-    try:
-        for f in REQUIRED_FIELDS:
-            if f not in t: return False
-        if int(t["iha_kilitlenme"]) == 1:
-            for f in LOCK_FIELDS:
-                if f not in t: return False
-
-        # Aralık kontrolleri (makul sınırlar)
-        if not (-90 <= float(t["iha_enlem"]) <= 90): return False
-        if not (-180 <= float(t["iha_boylam"]) <= 180): return False
-        if not (0 <= float(t["iha_irtifa"]) <= 10000): return False
-        if not (-90 <= float(t["iha_dikilme"]) <= 90): return False
-        if not (0 <= float(t["iha_yonelme"]) <= 360): return False
-        if not (-90 <= float(t["iha_yatis"]) <= 90): return False
-        if not (0 <= float(t["iha_hiz"]) <= 200): return False
-        if not (0 <= int(t["iha_batarya"]) <= 100): return False
-        if int(t["iha_otonom"]) not in (0, 1): return False
-        if int(t["iha_kilitlenme"]) not in (0, 1): return False
-
-        gps = t["gps_saati"]
-        for k in ("saat", "dakika", "saniye", "milisaniye"):
-            if k not in gps: return False
-        if not (0 <= int(gps["saat"]) < 24): return False
-        if not (0 <= int(gps["dakika"]) < 60): return False
-        if not (0 <= int(gps["saniye"]) < 60): return False
-        if not (0 <= int(gps["milisaniye"]) < 1000): return False
-        return True
-    except Exception:
-        return False
+    """Geriye uyumluluk: sadece geçti/kaldı (neden için telemetry_validator.validate)."""
+    return telemetry_validator.validate(t)[1] is None
 
 
 _enemy_angle = 0.0
 
 
+def remote_fleet():
+    """Paylaşımlı durumda başka worker'ın aldığı (yerelden yeni) takım kayıtları: takım → (ts, konum_json)."""
+    if not state.shared:
+        return {}
+    out = {}
+    for tnum, (ts, konum_json) in state.fleet().items():
+        st = _latest_telemetry.get(tnum)
+        if st is None or st.ts < ts:
+            out[tnum] = (ts, konum_json)
+    return out
+
+
+def live_teams():
+    """Bayat olmayan takım numaraları"""
+    now_ts = time.time()
+    teams = [tnum for tnum, st in list(_latest_telemetry.items())
+             if not st.is_stale(now_ts, _TELEMETRY_STALE_SEC)]
+    for tnum, (ts, _) in remote_fleet().items():
+        if now_ts - ts <= _TELEMETRY_STALE_SEC and tnum not in teams:
+            teams.append(tnum)
+    return teams
+
+
+def _fleet_entry(tnum):
+    remote = remote_fleet().get(tnum)
+    if remote is not None:
+        return json.loads(remote[1])
+    st = _latest_telemetry.get(tnum)
+    return st.konum if st is not None else None
+
+
+# --- Takım başına son N örnek (iz / "son 5 dakika" sorguları DB'ye gitmeden) ---
+from track_buffer import TrackStore, COLUMNS as TRACK_COLUMNS
+
+TRACK_CAPACITY = 1800  # takım başına örnek (2 Hz'de 15 dk)
+TRACK_MAX_TEAMS = 64  # en fazla takım; bellek ≈ 2 * TRACK_CAPACITY * 9 * 8 B * takım
+track_store = TrackStore(capacity=TRACK_CAPACITY, max_teams=TRACK_MAX_TEAMS)
+
+
+def recent_tracks(takim=None, seconds=300, max_points=None):
+    """takım (None → hepsi) → kolon sözlüğü; pencere sunucu saatine göre son ``seconds`` sn."""
+    now = now_ms()
+    store = _tracks_from_db(takim, seconds, now) if state.shared else track_store
+    teams = [int(takim)] if takim not in (None, "") else store.teams()
+    out = {}
+    for t in teams:
+        snap = store.snapshot(t, seconds, now, max_points)
+        if snap is not None:
+            out[str(t)] = snap
+    return out
+
+
+def _tracks_from_db(takim, seconds, now):
+    """
+    Çok worker'da halka yalnız bu worker'a düşen paketleri tutar; iz ortak DB'den
+    aynı biçimde (geçici TrackStore) kurulur. Yazıcı gecikmesi kadar (DB_WRITE_FLUSH_MS) geriden gelir.
+    """
+    sql = ("SELECT takim, ts_ms, enlem, boylam, irtifa, hiz, batarya, dikilme, yonelme, yatis "
+           "FROM telemetry WHERE ts_ms >= ?")
+    args = [now - int(float(seconds) * 1000)]
+    if takim not in (None, ""):
+        sql += " AND takim = ?"
+        args.append(int(takim))
+    store = TrackStore(capacity=TRACK_CAPACITY, max_teams=TRACK_MAX_TEAMS)
+    for row in db.query_offhub(sql + " ORDER BY takim, ts_ms, id", args):
+        store.append(*row)
+    return store
+
+
+# --- Sabit hızlı filo yayını (paket başına telemetry_update yerine) ---
+from fleet_broadcast import FleetBroadcaster
+
+FLEET_BROADCAST_HZ = 5.0  # panellere saniyede kaç fleet_update gitsin
+fleet_broadcaster = FleetBroadcaster(socketio, _fleet_entry, live_teams, server_now_dict,
+                                     rate_hz=FLEET_BROADCAST_HZ,
+                                     on_tick=lambda sec: FLEET_TICK_SECONDS.observe(sec))
+
+# --- Giriş kontrolü: aşırı yükte önce UI yayını, sonra DB kaydı, en son HTTP cevabı atılır ---
+from admission import AdmissionController
+
+ADMISSION_LAG_SEC = (0.05, 0.2, 0.5)  # event loop gecikmesi → seviye 1 / 2 / 3
+ADMISSION_QUEUE_FILL = (0.5, 0.8, 0.95)  # DB yazıcı kuyruğu doluluğu → seviye 1 / 2 / 3
+ADMISSION_HOLD_SEC = 2.0  # seviye düşmeden önce baskının eşik altında kalacağı süre
+
+admission = AdmissionController(socketio.sleep, lambda: db_writer.qsize() / DB_WRITE_QUEUE_MAX,
+                                lag_levels=ADMISSION_LAG_SEC, fill_levels=ADMISSION_QUEUE_FILL,
+                                hold_sec=ADMISSION_HOLD_SEC)
+
+# --- İzleme: /metrics (Prometheus metin biçimi) ---
+from metrics import REGISTRY, StageTimer, CONTENT_TYPE as METRICS_CONTENT_TYPE
+
+_socket_clients = set()  # bağlı Socket.IO sid'leri
+
+_label_teams = set()
+
+
+def team_label(tk):
+    """Metrik etiketi: takım numarası paketten gelir (istemci seçer); kadro + ilk LABEL_MAX_TEAMS numara, gerisi '?'."""
+    if isinstance(tk, bool) or not isinstance(tk, int):
+        return "?"
+    if tk in ROSTER_TEAMS or tk in _label_teams:
+        return str(tk)
+    if len(_label_teams) < LABEL_MAX_TEAMS:
+        _label_teams.add(tk)
+        return str(tk)
+    return "?"
+
+
+TELEMETRY_STAGE_SECONDS = REGISTRY.histogram(
+    "iha_telemetry_stage_seconds", "telemetri_gonder aşama süreleri", ("stage",))
+TELEMETRY_REQUEST_SECONDS = REGISTRY.histogram(
+    "iha_telemetry_request_seconds", "telemetri_gonder toplam süre (kabul edilen paketler)")
+TELEMETRY_PACKETS = REGISTRY.counter(
+    "iha_telemetry_packets_total", "telemetri paketleri (sonuc: accepted|rejected|rate_limited|unauthorized|shed|duplicate)",
+    ("takim", "sonuc"))
+FLEET_TICK_SECONDS = REGISTRY.histogram("iha_fleet_tick_seconds", "fleet_update tick süresi (yayın yapılanlar)")
+REGISTRY.gauge("iha_telemetry_rejections_total", "şema doğrulamasında reddedilen paketler (neden koduna göre)",
+               ("takim", "neden"), kind="counter",
+               fn=lambda: {(str(t), code): n for t, codes in list(telemetry_validator.rejections.items())
+                           for code, n in codes.items()})
+REGISTRY.gauge("iha_db_writer_queue_depth", "DB yazıcı kuyruğundaki satır", fn=lambda: db_writer.qsize())
+REGISTRY.gauge("iha_db_writer_rows_total", "DB yazıcı satırları (durum: written|dropped|errors|ignored)",
+               ("durum",), kind="counter", fn=lambda: {("written",): db_writer.written, ("dropped",): db_writer.dropped,
+                                           ("errors",): db_writer.errors, ("ignored",): db_writer.ignored})
+REGISTRY.gauge("iha_fleet_pending_teams", "bir sonraki fleet_update tick'ini bekleyen takım",
+               fn=lambda: fleet_broadcaster.pending())
+REGISTRY.gauge("iha_live_teams", "bayat olmayan takım sayısı", fn=lambda: len(live_teams()))
+REGISTRY.gauge("iha_socketio_clients", "bağlı Socket.IO istemcisi", fn=lambda: len(_socket_clients))
+REGISTRY.gauge("iha_history_streams_active", "süren geçmiş sorgusu", fn=lambda: history_streamer.active_count())
+REGISTRY.gauge("iha_replay_sessions", "süren tekrar oynatma oturumu", fn=lambda: len(replays.sessions))
+REGISTRY.gauge("iha_log_records_total", "yazılmayan log kayıtları (durum: dropped=kuyruk dolu, suppressed=örnekleme)",
+               ("durum",), kind="counter", fn=lambda: {("dropped",): log_system.queue_handler.dropped,
+                                                        ("suppressed",): log_system.sampler.suppressed})
+REGISTRY.gauge("iha_track_buffer_bytes", "takım iz halkalarının bellek kullanımı", fn=lambda: track_store.nbytes())
+REGISTRY.gauge("iha_admission_level", "yük atma seviyesi (0 normal, 1 ui, 2 db, 3 reply)", fn=lambda: admission.level)
+REGISTRY.gauge("iha_event_loop_lag_seconds", "event loop gecikmesi (sönümlü tepe)", fn=lambda: admission.lag)
+REGISTRY.gauge("iha_admission_shed_total", "yük atmada bırakılan işler (is: ui|db|reply)", ("is",), kind="counter",
+               fn=lambda: {(k,): n for k, n in admission.shed.items()})
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return app.response_class(REGISTRY.render(), content_type=METRICS_CONTENT_TYPE), 200
+
+
+@app.route("/api/yuk", methods=["GET"])
+def yuk_durumu():
+    """Giriş kontrolü: seviye, gecikme, kuyruk doluluğu, atılan iş sayıları."""
+    return jsonify({"ok": True, **admission.status()}), 200
+
+
 @app.route("/api/hss_send_flag", methods=["POST"])
 def hss_send_flag():
-    global HSS_SEND_ENABLED
     if not ok_auth():
         return "401", 401
 
     d = request.get_json(silent=True) or {}
     # enabled true/false bekliyoruz
-    HSS_SEND_ENABLED = bool(d.get("enabled"))
-    print("🔁 HSS_SEND_ENABLED =", HSS_SEND_ENABLED)
-    return jsonify({"ok": True, "enabled": HSS_SEND_ENABLED}), 200
+    enabled = bool(d.get("enabled"))
+    state.set_flag("hss_send_enabled", enabled)
+    log.info("🔁 HSS_SEND_ENABLED = %s", enabled)
+    return jsonify({"ok": True, "enabled": enabled}), 200
 
 
 @app.route("/api/hss_toggle", methods=["POST"])
 def hss_toggle():
     """HSS sistemini aktif/pasif yap (uçak tarafında kaçınma aktif/pasif)"""
-    global HSS_SYSTEM_ACTIVE
     if not ok_auth():
         return "401", 401
 
@@ -548,213 +962,320 @@ def hss_toggle():
 
     # "active": true/false ile kontrol
     if "active" in d:
-        HSS_SYSTEM_ACTIVE = bool(d["active"])
+        active = bool(d["active"])
     else:
         # Toggle
-        HSS_SYSTEM_ACTIVE = not HSS_SYSTEM_ACTIVE
+        active = not hss_system_active()
+    state.set_flag("hss_system_active", active)
 
-    status = "AKTİF ✅" if HSS_SYSTEM_ACTIVE else "PASİF ❌"
-    print(f"🔄 HSS SİSTEMİ: {status}")
+    status = "AKTİF ✅" if active else "PASİF ❌"
+    log.info("🔄 HSS SİSTEMİ: %s", status)
 
     # SocketIO ile tüm clientlara bildir
-    socketio.emit("hss_system_status", {"hss_aktif": HSS_SYSTEM_ACTIVE})
+    socketio.emit("hss_system_status", {"hss_aktif": active})
 
     return jsonify({
         "ok": True,
-        "hss_aktif": HSS_SYSTEM_ACTIVE,
+        "hss_aktif": active,
         "message": f"HSS sistemi {status}"
     }), 200
 
 
 @app.route("/api/telemetri_gonder", methods=["POST"])
 def telemetri():
-    # TEAM_NO artık yayın/ayrım için kullanılmıyor; projede başka yerde kullanıyorsanız kalsın.
-    global _latest_telemetry, TEAM_NO, _TELEMETRY_STALE_SEC, _last_telemetry_ts, _RATE_PERIOD
-
+    stages = StageTimer(TELEMETRY_STAGE_SECONDS)  # her mark: önceki işaretten bu yana geçen süre
     if not ok_auth():
+        TELEMETRY_PACKETS.inc(("?", "unauthorized"))
         return "401", 401
+    if not admission.allow("reply"):  # en ağır yük: gövdeyi çözmeden geri çevir
+        TELEMETRY_PACKETS.inc(("?", "shed"))
+        return "busy", 503, {"Retry-After": "1"}
+    stages.mark("auth")
 
     t = request.get_json(silent=True) or {}
-    print("📡 Gelen Telemetri:", t)
+    status, body, headers = ingest_telemetry(t, stages)
+    if status == 200:
+        return app.response_class(body, mimetype="application/json"), 200
+    return body, status, headers
 
-    # Şema/alan kontrolü: başarısızsa 204 (gövde yok)
-    if not validate_telemetry(t):
-        return "", 204
 
-    # 0) Takım id'yi GÖNDERENDEN al
-    try:
-        takim = int(t["takim_numarasi"])
-    except Exception:
-        return ("bad request", 400)
-
-    # 1) Rate limit (takım bazlı) — 2 Hz (0.5 s)
-    now_m = time.monotonic()
-    last = _last_telemetry_ts.get(takim, 0)
-    if now_m - last < _RATE_PERIOD:
-        return ("3", 400)  # hızlı gönderim
-    _last_telemetry_ts[takim] = now_m
+def ingest_telemetry(t, stages):
+    """
+    Doğrulama → hız sınırı → canlı durum → bölge kontrolleri → DB → yayın → cevap.
+    HTTP (/api/telemetri_gonder) ve kalıcı bağlantılı kanal (/ucak) ortak yolu;
+    kimlik doğrulama ve paket çözme çağırandadır. (durum, gövde, başlıklar) döner;
+    200'de gövde konumBilgileri cevabının JSON metnidir.
+    """
+    # TEAM_NO artık yayın/ayrım için kullanılmıyor; projede başka yerde kullanıyorsanız kalsın.
+    global _latest_telemetry, TEAM_NO, _TELEMETRY_STALE_SEC
+    log_telemetry_in("📡 Gelen Telemetri: %s", t)
+
+    # Şema/alan kontrolü (tek geçiş): başarısızsa 204 (gövde yok), neden başlıkta
+    v, err = telemetry_validator.check(t)
+    stages.mark("validate")
+    if err:
+        tk = t.get("takim_numarasi") if isinstance(t, dict) else None
+        TELEMETRY_PACKETS.inc((team_label(tk), "rejected"))
+        if err == "type:takim_numarasi":
+            return 400, "bad request", {}
+        return 204, "", {"X-Red-Nedeni": err}
+
+    # 0) Takım id'yi GÖNDERENDEN al (doğrulayıcı int'e çevirdi)
+    takim = v["takim_numarasi"]
+
+    # 1) Rate limit (takım bazlı token bucket) — ortalama 2 Hz, TELEMETRY_BURST kadar titremeye izin
+    if not state.take_token(takim, time.monotonic(), TELEMETRY_RATE_HZ, TELEMETRY_BURST):
+        TELEMETRY_PACKETS.inc((team_label(takim), "rate_limited"))
+        return 400, "3", {}  # hızlı gönderim
+    stages.mark("rate_limit")
 
     # 2) In-memory son telemetri kaydı (takım bazlı)
     try:
-        _latest_telemetry[takim] = {"telemetry": t, "ts": time.time()}
+        st = _latest_telemetry[takim] = TeamState(takim, t, time.time())
+        state.publish_team(takim, st.ts, st.konum_json)  # diğer worker'ların düşman listesi / fleet görüntüsü
     except Exception as e:
-        print("❌ _latest_telemetry güncelleme hatası:", e)
+        log.error("❌ _latest_telemetry güncelleme hatası: %s", e)
+    track_store.append(takim, now_ms(), v["iha_enlem"], v["iha_boylam"], v["iha_irtifa"], v["iha_hiz"],
+                       v["iha_batarya"], v["iha_dikilme"], v["iha_yonelme"], v["iha_yatis"])
+    stages.mark("state")
 
     # 3) (Opsiyonel) Geofence kontrolü — gönderene uygula
+    #    Olay sadece giriş/çıkış geçişinde yayınlanır (zone_states, debounce'lu)
+    lat = v["iha_enlem"]
+    lon = v["iha_boylam"]
     try:
-        lat = float(t.get("iha_enlem"))
-        lon = float(t.get("iha_boylam"))
-        if not is_inside_fences(lat, lon):
+        changed = zone_states.observe(takim, "fence", is_inside_fences(lat, lon))
+        if changed is False:
             socketio.emit("geofence_violation", {
                 "takim": takim,
                 "lat": lat,
                 "lon": lon,
                 "utc": now_iso()
             })
-        else:
+        elif changed is True:
             socketio.emit("geofence_ok", {"takim": takim, "utc": now_iso()})
     except Exception as e:
-        print("⚠️ Geofence kontrol hatası:", e)
+        log.warning("⚠️ Geofence kontrol hatası: %s", e)
+    stages.mark("geofence")
 
     # 3b) (Opsiyonel) HSS kontrolü — gönderene uygula
     try:
-        lat = float(t.get("iha_enlem"))
-        lon = float(t.get("iha_boylam"))
-
         # HSS_SEND_ENABLED kapalıysa kimseyi HSS içinde sayma
-        if HSS_SEND_ENABLED and HSS_SYSTEM_ACTIVE and is_inside_hss(lat, lon):
+        inside = hss_send_enabled() and hss_system_active() and is_inside_hss(lat, lon)
+        changed = zone_states.observe(takim, "hss", inside)
+        if changed is True:
             socketio.emit("hss_inside", {
                 "takim": takim,
                 "lat": lat,
                 "lon": lon,
                 "utc": now_iso()
             })
-        else:
+        elif changed is False:
             # ya HSS yoktur, ya dışarıdadır, ya da HSS tamamen devredışı
             socketio.emit("hss_ok", {"takim": takim, "utc": now_iso()})
     except Exception as e:
-        print("⚠️ HSS kontrol hatası:", e)
+        log.warning("⚠️ HSS kontrol hatası: %s", e)
+    stages.mark("hss")
 
-    # 4) (Opsiyonel) DB'ye yaz
-    try:
-        save_telemetry_row(takim, t)
-    except Exception as e:
-        print("save_telemetry_row hata:", e)
+    # 4) (Opsiyonel) DB'ye yaz (yük atma seviyesi 2+ ise atlanır)
+    if admission.allow("db"):
+        try:
+            save_telemetry_row(takim, t, v)
+        except Exception as e:
+            log.error("save_telemetry_row hata: %s", e)
+    stages.mark("db_write")
 
     # 5) Enemies: diğer takımların güncel (bayat değilse) telemetrileri
+    #    Kayıtlar alımda JSON'a çevrildi (TeamState.konum_json); burada sadece birleştirilir
     enemies = []
     try:
         now_ts = time.time()
-        for tnum, info in list(_latest_telemetry.items()):
-            ts = info.get("ts", 0)
-            if _TELEMETRY_STALE_SEC is not None and (now_ts - ts) > _TELEMETRY_STALE_SEC:
+        remote = remote_fleet()  # başka worker'a düşmüş (ve daha yeni) takımlar
+        for tnum, st in list(_latest_telemetry.items()):
+            if st.is_stale(now_ts, _TELEMETRY_STALE_SEC):
                 continue
-            if tnum == takim:  # ← gönderenden farklı olanlar düşman
+            if tnum == takim or tnum in remote:  # ← gönderenden farklı olanlar düşman
                 continue
-
-            packet = info.get("telemetry", {}) or {}
-
-            def g(k, alts=()):
-                if k in packet: return packet[k]
-                for a in alts:
-                    if a in packet: return packet[a]
-                return None
-
-            enemies.append({
-                "takim_numarasi": int(tnum),
-                "iha_enlem": g("iha_enlem", ["enlem", "lat", "latitude"]),
-                "iha_boylam": g("iha_boylam", ["boylam", "lon", "longitude"]),
-                "iha_irtifa": g("iha_irtifa", ["irtifa", "alt", "altitude"]),
-                "iha_dikilme": g("iha_dikilme", ["dikilme", "pitch"]),
-                "iha_yonelme": g("iha_yonelme", ["yonelme", "yaw", "heading"]),
-                "iha_yatis": g("iha_yatis", ["yatis", "roll"]),
-                "iha_hiz": g("iha_hiz", ["iha_hizi", "hiz", "speed"]),
-                "iha_batarya": g("iha_batarya", ["batarya"]),
-                "iha_otonom": g("iha_otonom", ["otonom"]),
-                "iha_kilitlenme": g("iha_kilitlenme", ["kilitlenme"]),
-                "hedef_merkez_X": g("hedef_merkez_X", ["target_center_x", "hx"]),
-                "hedef_merkez_Y": g("hedef_merkez_Y", ["target_center_y", "hy"]),
-                "hedef_genislik": g("hedef_genislik", ["target_w", "hw"]),
-                "hedef_yukseklik": g("hedef_yukseklik", ["target_h", "hh"]),
-                "gps_saati": g("gps_saati", ["gps_time", "time"]),
-                "zaman_farki": 0
-            })
+            enemies.append(st.konum_json)
+        for tnum, (ts, konum_json) in remote.items():
+            if tnum != takim and now_ts - ts <= _TELEMETRY_STALE_SEC:
+                enemies.append(konum_json)
     except Exception as e:
-        print("enemies oluştururken hata:", e)
+        log.error("enemies oluştururken hata: %s", e)
         enemies = []
+    stages.mark("enemies")
 
-    # 6) UI'ye yayın — 'takim' ve 'telemetry' gönderene ait
-    try:
-        socketio.emit('telemetry_update', {
-            "takim": takim,
-
-            # İHA ana telemetri bilgileri
-            "lat": t.get("iha_enlem"),
-            "lon": t.get("iha_boylam"),
-            "alt": t.get("iha_irtifa"),
-            "pitch": t.get("iha_dikilme"),
-            "yaw": t.get("iha_yonelme"),
-            "roll": t.get("iha_yatis"),
-            "speed": t.get("iha_hiz"),
-            "battery": t.get("iha_batarya"),
-            "otonom": t.get("iha_otonom"),
-            "kilit": t.get("iha_kilitlenme"),
-
-            # HEDEF bilgileri
-            "hedefX": t.get("hedef_merkez_X"),
-            "hedefY": t.get("hedef_merkez_Y"),
-            "hedefW": t.get("hedef_genislik"),
-            "hedefH": t.get("hedef_yukseklik"),
-
-            # GPS saati
-            "gps": t.get("gps_saati"),
-
-            # diğer takımlar
-            "enemies": enemies,
-            "sunucusaati": server_now_dict(),
-            "telemetry": t
-        })
-    except Exception as _e:
-        print("socketio.emit hata:", _e)
+    # 6) UI'ye yayın: paket başına emit yok; takım işaretlenir, fleet_broadcaster
+    #    sabit hızda (FLEET_BROADCAST_HZ) sadece değişen takımları tek mesajda yollar
+    #    (yük atma seviyesi 1+ ise işaretlenmez; panel takımın sonraki paketinde güncellenir)
+    if admission.allow("ui"):
+        fleet_broadcaster.mark(takim)
+    stages.mark("emit")
 
     # 7) HTTP cevabı aynı formatta (UI geriye uyumlu)
-    return jsonify({
-        "sunucusaati": server_now_dict(),
-        "konumBilgileri": enemies,
-        "hss_koordinat_bilgileri": [
-            {"id": it["id"], "hssEnlem": it["lat"], "hssBoylam": it["lon"], "hssYaricap": it["radius"]}
-            for it in list_hss()
-        ] if HSS_SYSTEM_ACTIVE else []
-    }), 200
+    #    HSS listesi sadece HSS tablosu değişince serileştirilir (hss_store.coords_json)
+    body = '{"hss_koordinat_bilgileri":%s,"konumBilgileri":%s,"sunucusaati":%s}' % (
+        hss_store.coords_json() if hss_system_active() else "[]",
+        json_list(enemies),
+        json.dumps(server_now_dict(), sort_keys=True),
+    )
+    stages.mark("serialize")
+    TELEMETRY_REQUEST_SECONDS.observe(stages.elapsed())
+    TELEMETRY_PACKETS.inc((team_label(takim), "accepted"))
+    return 200, body, {}
+
+
+@app.route("/api/telemetri_toplu", methods=["POST"])
+def telemetri_toplu():
+    """
+    Bağlantı kopukken yer istasyonunda / rölede biriken telemetrinin toplu gönderimi.
+    Gövde: paket dizisi (JSON; birden çok takım olabilir) ya da art arda
+    telemetry_frame çerçeveleri (application/octet-stream).
+
+    Paketler tek geçişte doğrulanır, zamanları gps_saati'nden türetilir ve
+    kabul edilenler tek transaction'da yazılır. Canlı 2 Hz sınırı uygulanmaz;
+    aynı (takım, gps zamanı) daha önce toplu gönderilmişse (tabloda ya da yazıcı
+    kuyruğunda) paket "duplicate" olur; yeniden gönderim güvenli. Son
+    gönderimlerin anahtarları canlı durumda (state) tutulur, worker'lar ortak
+    görür; tablo da toplu satırlarda UNIQUE(takim, ts_ms) + INSERT OR IGNORE ile
+    tek satır tutar. Canlı kanaldan gelmiş paketlerle eşleştirme yapılmaz:
+    onların zamanı sunucu saatidir.
+    _latest_telemetry'ye takım başına yalnız en yeni paket, o da mevcut kayıttan
+    yeniyse yazılır; geofence / HSS olayı üretilmez.
+
+    Cevap: {"ok", "accepted", "rejected", "duplicate", "items": [...]}; items
+    gönderim sırasıyla {"durum": accepted|rejected|duplicate, "ts_ms" | "neden"}.
+    """
+    if not ok_auth():
+        TELEMETRY_PACKETS.inc(("?", "unauthorized"))
+        return "401", 401
+    if not admission.allow("reply") or not admission.allow("db"):  # toplu alımın tek işi kayıt
+        TELEMETRY_PACKETS.inc(("?", "shed"))
+        return "busy", 503, {"Retry-After": "1"}
+
+    if request.mimetype == "application/octet-stream":
+        raw = request.get_data()
+        if len(raw) % telemetry_frame.SIZE:
+            return jsonify({"ok": False, "error": "gövde %d baytlık çerçevelerden oluşmalı" % telemetry_frame.SIZE}), 400
+        packets = [raw[i:i + telemetry_frame.SIZE] for i in range(0, len(raw), telemetry_frame.SIZE)]
+    else:
+        packets = request.get_json(silent=True)
+        if not isinstance(packets, list):
+            return jsonify({"ok": False, "error": "paket dizisi bekleniyor"}), 400
+    if len(packets) > TELEMETRY_BATCH_MAX:
+        return jsonify({"ok": False, "error": "istek başına en fazla %d paket" % TELEMETRY_BATCH_MAX}), 413
+
+    now = now_ms()
+    oldest = now - TELEMETRY_BATCH_MAX_AGE_SEC * 1000
+    items = []
+    valid = []  # (items sırası, takım, ts_ms, paket, tipli değerler)
+    for t in packets:
+        if isinstance(t, bytes):
+            try:
+                t = telemetry_frame.decode(t)
+            except ValueError:
+                t = {}  # yalnız sürüm hatası olabilir (boyut yukarıda denetlendi)
+        v, err = telemetry_validator.check(t)
+        if not err:
+            ts = ms_from_clock(v["gps_saati"], now)
+            if ts < oldest:
+                err = "range:gps_saati"
+        if err:
+            tk = t.get("takim_numarasi") if isinstance(t, dict) else None
+            TELEMETRY_PACKETS.inc((team_label(tk), "rejected"))
+            items.append({"durum": "rejected", "neden": err})
+            continue
+        valid.append((len(items), v["takim_numarasi"], ts, t, v))
+        items.append({"durum": "accepted", "ts_ms": ts})
+
+    # bu istekte ya da yakın zamanda (herhangi bir worker'da) kuyruğa atılmış olanlar; tek adımda ayrılır
+    fresh = state.reserve_batch_keys([(takim, ts) for _, takim, ts, _, _ in valid], time.time(),
+                                     TELEMETRY_BATCH_RECENT_SEC, TELEMETRY_BATCH_RECENT_MAX)
+    for (i, _, ts, _, _), ok in zip(valid, fresh):
+        if not ok:
+            items[i]["durum"] = "duplicate"
+    valid = [x for x, ok in zip(valid, fresh) if ok]
+
+    # önceki (kısmen başarılı / zaman aşımına uğramış) gönderimlerde yazılmış olanlar
+    stored = _stored_telemetry_times(valid)
+    kept = []
+    for i, takim, ts, t, v in valid:
+        if ts in stored.get(takim, ()):
+            items[i]["durum"] = "duplicate"
+        else:
+            kept.append((takim, ts, t, v))
+    if not db_writer.submit_many("telemetry_toplu", [telemetry_row(takim, t, v, ts) for takim, ts, t, v in kept]):
+        state.release_batch_keys([(takim, ts) for takim, ts, _, _ in kept])  # yazılmadı; yeniden gönderilebilsin
+        return jsonify({"ok": False, "error": "kayıt kuyruğu dolu"}), 503, {"Retry-After": "1"}
+
+    newest = {}
+    for takim, ts, t, v in kept:
+        TELEMETRY_PACKETS.inc((team_label(takim), "accepted"))
+        if takim not in newest or ts > newest[takim][0]:
+            newest[takim] = (ts, t, v)
+    for takim, (ts, t, v) in newest.items():
+        st = _latest_telemetry.get(takim)
+        if st is not None and st.ts >= ts / 1000.0:
+            continue  # canlı kanaldan daha yeni paket gelmiş
+        try:
+            st = _latest_telemetry[takim] = TeamState(takim, t, ts / 1000.0)
+            state.publish_team(takim, st.ts, st.konum_json)
+        except Exception as e:
+            log.error("❌ _latest_telemetry güncelleme hatası: %s", e)
+            continue
+        track_store.append(takim, ts, v["iha_enlem"], v["iha_boylam"], v["iha_irtifa"], v["iha_hiz"],
+                           v["iha_batarya"], v["iha_dikilme"], v["iha_yonelme"], v["iha_yatis"])
+        if admission.allow("ui"):
+            fleet_broadcaster.mark(takim)
+
+    counts = {k: 0 for k in ("accepted", "rejected", "duplicate")}
+    for item in items:
+        counts[item["durum"]] += 1
+    log.info("📦 toplu telemetri: %s paket → %s", len(packets), counts)
+    return jsonify(dict(ok=True, items=items, **counts)), 200
+
+
+def _stored_telemetry_times(valid):
+    """takım → {ts_ms} (paketlerin zaman aralığında daha önce toplu yazılmış olanlar)."""
+    spans = {}
+    for _, takim, ts, _, _ in valid:
+        lo, hi = spans.get(takim, (ts, ts))
+        spans[takim] = (min(lo, ts), max(hi, ts))
+    out = {}
+    for takim, (lo, hi) in spans.items():
+        rows = db.query_offhub("SELECT ts_ms FROM telemetry "
+                               "WHERE toplu = 1 AND takim = ? AND ts_ms BETWEEN ? AND ?", (takim, lo, hi))
+        out[takim] = {r[0] for r in rows}
+    return out
 
 
 @app.route("/api/kilitlenme_bilgisi", methods=["POST"])
 def kilitlenme():
     if not ok_auth():
-        print("401 kilitlenme_bilgisi")
+        log.warning("401 kilitlenme_bilgisi")
         return "401", 401
 
     data = request.get_json(silent=True) or {}
-    print("→ kilitlenme_bilgisi PAYLOAD:", data)
+    log_lock_in("→ kilitlenme_bilgisi PAYLOAD: %s", data)
 
     kb = data.get("kilitlenmeBitisZamani", {})
     if not all(k in kb for k in ("saat", "dakika", "saniye", "milisaniye")):
-        print("❌ VALIDATION FAIL (kilitlenmeBitisZamani alanları eksik)")
+        log_lock_reject("❌ VALIDATION FAIL (kilitlenmeBitisZamani alanları eksik)")
         return "", 204
     try:
         ok_flag = int(data.get("otonom_kilitlenme", -1))
     except Exception:
         ok_flag = -1
     if ok_flag not in (0, 1):
-        print("❌ VALIDATION FAIL (otonom_kilitlenme 0/1 değil):", data.get("otonom_kilitlenme"))
+        log_lock_reject("❌ VALIDATION FAIL (otonom_kilitlenme 0/1 değil): %s", data.get("otonom_kilitlenme"))
         return "", 204
 
     # 1) DB'ye KAYDET
     try:
         save_lock_row(data)
-        print("📝 lock→DB OK")
+        log.debug("📝 lock→DB OK")
     except Exception as e:
-        print("❌ save_lock_row HATA:", e, "| payload:", data)
+        log.error("❌ save_lock_row HATA: %s | payload: %s", e, data)
 
     # 2) UI'ye CANLI YAYIN (TEK emit)
     kb = data.get("kilitlenmeBitisZamani", {})
@@ -766,12 +1287,12 @@ def kilitlenme():
     }
 
     try:
-        print("📢 lock_event emit:", payload)
+        log.debug("📢 lock_event emit: %s", payload)
         socketio.emit('lock_event', payload)  # tek yayın, broadcast
     except Exception as e:
-        print("❌ socketio.emit lock HATA:", e)
+        log.error("❌ socketio.emit lock HATA: %s", e)
 
-    print("🔒 Kilitlenme OK")
+    log.debug("🔒 Kilitlenme OK")
     return "OK", 200
 
 
@@ -791,9 +1312,9 @@ def kamikaze():
     # 1) DB'ye kaydet
     try:
         save_kamikaze_row(d)
-        print("📝 kamikaze→DB OK")
+        log.debug("📝 kamikaze→DB OK")
     except Exception as e:
-        print("❌ save_kamikaze_row HATA:", e, "| payload:", d)
+        log.error("❌ save_kamikaze_row HATA: %s | payload: %s", e, d)
 
     # 2) UI'ye canlı yayın
     try:
@@ -804,19 +1325,43 @@ def kamikaze():
             "kamikazeBitisZamani": d.get("kamikazeBitisZamani"),
             "sunucusaati": server_now_dict(),
         })
-        print("📢 kamikaze_event emit")
+        log.debug("📢 kamikaze_event emit")
     except Exception as e:
-        print("❌ socketio.emit kamikaze HATA:", e)
+        log.error("❌ socketio.emit kamikaze HATA: %s", e)
 
-    print("💥 Kamikaze:", d)
+    log_kamikaze_in("💥 Kamikaze: %s", d)
     return "OK", 200
 
 
+# --- Seyrek değişen GET cevapları: sürüme bağlı önceden serileştirilmiş gövde + ETag/304 ---
+# Sürümler yalnız HSS / fence yazma route'larında (ve diğer worker'dan eşitlemede) değişir.
+from cached_response import CachedBody, conditional
+
+QR_KOORDINATI = {"qrEnlem": 41.51238882, "qrBoylam": 36.11935778}
+
+_qr_body = CachedBody(lambda _: json.dumps(QR_KOORDINATI, sort_keys=True))
+_hss_list_body = CachedBody(lambda _: json.dumps({"ok": True, "items": list_hss()}, sort_keys=True))
+_fences_body = CachedBody(lambda _: json.dumps({"ok": True, "items": _fence_items}, sort_keys=True))
+
+
+def _hss_coords_head(key):
+    """/api/hss_koordinatlari gövdesinin sunucusaati'ne kadarki kısmı (istekte tamamlanır)."""
+    _, send_enabled, active = key
+    coords = hss_store.coords_json() if send_enabled else "[]"
+    return '{"durum":%s,"hss_aktif":%s,"hss_koordinat_bilgileri":%s,"sunucusaati":' % (
+        json.dumps("aktif" if coords != "[]" else "bos"), json.dumps(active), coords)
+
+
+_hss_coords_body = CachedBody(_hss_coords_head)
+SERVER_TIME_HEADER = "X-Sunucu-Saati"
+
+
 @app.route("/api/qr_koordinati", methods=["GET"])
 def qr():
     if not ok_auth():
         return "401", 401
-    return jsonify({"qrEnlem": 41.51238882, "qrBoylam": 36.11935778}), 200
+    body, etag = _qr_body.get(None)
+    return conditional(app.response_class, request, body, etag, cache_control="private, no-cache")
 
 
 # helper:
@@ -838,7 +1383,8 @@ def ok_auth_or_public_hss():
 
 @app.route("/api/hss", methods=["GET"])
 def api_hss_list():
-    return jsonify({"ok": True, "items": list_hss()}), 200
+    body, etag = _hss_list_body.get(hss_store.version)
+    return conditional(app.response_class, request, body, etag)
 
 
 @app.route("/api/hss", methods=["POST"])
@@ -885,27 +1431,29 @@ def api_hss_delete(hid):
 
 @app.route("/api/hss_koordinatlari", methods=["GET"])
 def hss_public():
-    if not HSS_SEND_ENABLED:
-        hss_list = []
-    else:
-        items = list_hss()
-        hss_list = [
-            {"id": it["id"], "hssEnlem": it["lat"], "hssBoylam": it["lon"], "hssYaricap": it["radius"]}
-            for it in items
-        ]
+    """
+    HSS koordinatları + sunucusaati.
 
-    return jsonify({
-        "sunucusaati": server_now_dict(),
-        "hss_koordinat_bilgileri": hss_list,
-        "durum": "aktif" if hss_list else "bos",
-        "hss_aktif": HSS_SYSTEM_ACTIVE
-    }), 200
+    ETag yalnız HSS kısmını kapsar ve zayıftır (W/"..."): sunucusaati her
+    istekte değiştiği için gövde bayt bayt aynı değildir. HSS'ler değişmediyse
+    cevap gövdesiz 304'tür. Saat eşitlemesi önbellek isabetinde de sürsün diye
+    sunucusaati her cevapta (200 ve 304) X-Sunucu-Saati başlığında da gelir:
+    gövdedekiyle aynı JSON nesnesi.
+    """
+    head, etag = _hss_coords_body.get((hss_store.version, hss_send_enabled(), hss_system_active()))
+    now = json.dumps(server_now_dict(), sort_keys=True)
+    body = head + now.encode() + b"}"
+    return conditional(app.response_class, request, body, etag, weak=True,
+                       headers={SERVER_TIME_HEADER: now, "Access-Control-Expose-Headers": SERVER_TIME_HEADER})
 
 
 
 @app.route("/api/fences", methods=["GET"])
 def get_fences():
-    return jsonify({"ok": True, "items": list_fences()}), 200
+    if fence_engine.version == 0:
+        reload_fences()
+    body, etag = _fences_body.get(fence_engine.version)
+    return conditional(app.response_class, request, body, etag)
 
 
 @app.route("/api/fences", methods=["POST"])
@@ -918,13 +1466,10 @@ def create_fence():
     color = data.get("color") or "#ef4444"
     if kind not in ("polygon",) or not gj:
         return jsonify({"ok": False, "error": "invalid payload"}), 400
-    con = sqlite3.connect(DB_PATH);
-    cur = con.cursor()
-    cur.execute("INSERT INTO fences(name,kind,geojson,color,updated_at) VALUES(?,?,?,?,?)",
-                (name, kind, json.dumps(gj), color, now_iso()))
-    con.commit();
-    con.close()
-    items = list_fences()
+    db.execute("INSERT INTO fences(name,kind,geojson,color,updated_at) VALUES(?,?,?,?,?)",
+               (name, kind, json.dumps(gj), color, now_iso()))
+    items = reload_fences()
+    state.bump("fences")
     socketio.emit("fences_update", {"items": items})
     return jsonify({"ok": True, "items": items}), 200
 
@@ -939,13 +1484,10 @@ def update_fence(fid):
     color = data.get("color") or "#ef4444"
     if kind not in ("polygon",) or not gj:
         return jsonify({"ok": False, "error": "invalid payload"}), 400
-    con = sqlite3.connect(DB_PATH);
-    cur = con.cursor()
-    cur.execute("UPDATE fences SET name=?,kind=?,geojson=?,color=?,updated_at=? WHERE id=?",
-                (name, kind, json.dumps(gj), color, now_iso(), fid))
-    con.commit();
-    con.close()
-    items = list_fences()
+    db.execute("UPDATE fences SET name=?,kind=?,geojson=?,color=?,updated_at=? WHERE id=?",
+               (name, kind, json.dumps(gj), color, now_iso(), fid))
+    items = reload_fences()
+    state.bump("fences")
     socketio.emit("fences_update", {"items": items})
     return jsonify({"ok": True, "items": items}), 200
 
@@ -953,12 +1495,9 @@ def update_fence(fid):
 @app.route("/api/fences/<int:fid>", methods=["DELETE"])
 def delete_fence(fid):
     if not ok_auth(): return "401", 401
-    con = sqlite3.connect(DB_PATH);
-    cur = con.cursor()
-    cur.execute("DELETE FROM fences WHERE id=?", (fid,))
-    con.commit();
-    con.close()
-    items = list_fences()
+    db.execute("DELETE FROM fences WHERE id=?", (fid,))
+    items = reload_fences()
+    state.bump("fences")
     socketio.emit("fences_update", {"items": items})
     return jsonify({"ok": True, "items": items}), 200
 
@@ -978,48 +1517,317 @@ def point_in_polygon(lat, lon, polygon_latlon):
 
 
 def is_inside_fences(lat, lon):
-    for f in list_fences():
-        gj = f["geojson"]
-        if f["kind"] == "polygon":
-            try:
-                outer = gj["geometry"]["coordinates"][0]  # [[lon,lat],...]
-                poly = [[pt[1], pt[0]] for pt in outer]
-                if point_in_polygon(lat, lon, poly): return True
-            except:
-                pass
-    return False
+    # Tüm filo taramasıyla aynı vektörize motor (bbox ön eleme); delik ve MultiPolygon destekli
+    if fence_engine.version == 0:
+        reload_fences()
+    return zone_engine.inside_any_fence(lat, lon)
+
+
+def fleet_positions():
+    """Bayat olmayan takımların konumları: (takımlar, enlemler, boylamlar)"""
+    teams, lats, lons = [], [], []
+    remote = remote_fleet()
+    for tnum in live_teams():
+        if tnum in remote:
+            st = TeamState(tnum, json.loads(remote[tnum][1]), remote[tnum][0])
+        else:
+            st = _latest_telemetry[tnum]
+        teams.append(tnum)
+        lats.append(st.lat)
+        lons.append(st.lon)
+    return teams, lats, lons
+
+
+_table_gens = {"hss": 0, "fences": 0}
+
+
+def sync_shared_tables():
+    """Başka worker HSS / fence tablosunu değiştirdiyse DB'den yeniden yükle."""
+    if not state.shared:
+        return
+    gen = state.generation("hss")
+    if gen != _table_gens["hss"]:
+        _table_gens["hss"] = gen
+        hss_store.load()
+    gen = state.generation("fences")
+    if gen != _table_gens["fences"]:
+        _table_gens["fences"] = gen
+        reload_fences()
+
+
+def sweep_fleet_zones():
+    """Tüm filo × tüm fence/HSS üyeliğini tek vektörize geçişte hesapla."""
+    global _fleet_zones
+    if fence_engine.version == 0:
+        reload_fences()
+    teams, lats, lons = fleet_positions()
+    # bayatlayan takımın bölge durumunu unut: geri dönünce ilk durumu yeniden yayınlanır
+    for tnum in zone_states.teams() - set(teams):
+        zone_states.forget(tnum)
+    fm, hm = zone_engine.evaluate(lats, lons)
+    f_ids, h_ids = zone_engine.fence_ids, zone_engine.hss_ids
+    _fleet_zones = {
+        tnum: {
+            "fences": [f_ids[j] for j in fm[i].nonzero()[0]],
+            "hss": [h_ids[j] for j in hm[i].nonzero()[0]],
+        }
+        for i, tnum in enumerate(teams)
+    }
+    return _fleet_zones
+
+
+def _zone_sweep_loop():
+    while True:
+        socketio.sleep(ZONE_SWEEP_SEC)
+        try:
+            sync_shared_tables()
+            sweep_fleet_zones()
+        except Exception as e:
+            log.warning("⚠️ bölge taraması hata: %s", e)
+
+
+_bg_started = False
+
+
+def start_background_tasks():
+    """Arka plan görevlerini sunucunun hub'ında bir kez başlat.
+    (debug reloader'da wsgi sunucusu ayrı bir thread/hub'da çalıştığı için
+    __main__ içinden değil, ilk istek/bağlantıda çağrılır.)"""
+    global _bg_started
+    if _bg_started:
+        return
+    _bg_started = True
+    socketio.start_background_task(_zone_sweep_loop)
+    socketio.start_background_task(fleet_broadcaster.run)
+    socketio.start_background_task(admission.run)
+
+
+@app.before_request
+def _ensure_background_tasks():
+    start_background_tasks()
+
+
+@app.route("/api/bolge_durumu", methods=["GET"])
+def bolge_durumu():
+    """Son tüm-filo taramasının sonucu: hangi takım hangi fence/HSS içinde."""
+    return jsonify({
+        "ok": True,
+        "sunucusaati": server_now_dict(),
+        "takimlar": {str(k): v for k, v in _fleet_zones.items()}
+    }), 200
+
+
+@app.route("/api/export", methods=["GET"])
+def export_logs():
+    """
+    Kayıtları akış halinde dışa aktar (bellekte biriktirmeden, parça parça).
+    ?table=telemetry|locks|kamikaze &format=csv|parquet|arrow &takim= &start= &end=
+    """
+    from log_export import open_export
+    table = request.args.get("table", "telemetry")
+    fmt = request.args.get("format", "csv")
+    try:
+        stream, ext, mimetype = open_export(db.query_offhub, table, fmt, request.args.get("takim"),
+                                            request.args.get("start"), request.args.get("end"))
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    fname = "%s_%s.%s" % (table, datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ"), ext)
+    return app.response_class(stream_with_context(stream), mimetype=mimetype,
+                              headers={"Content-Disposition": 'attachment; filename="%s"' % fname})
+
+
+@app.route("/api/son_telemetri", methods=["GET"])
+def son_telemetri():
+    """
+    Son ?saniye=300 (varsayılan) telemetri, takım başına kolonlar. ?takim= &max_points=
+    Bellek halkasından; çok worker'da DB'den (bkz. recent_tracks).
+    """
+    try:
+        seconds = float(request.args.get("saniye", 300))
+        max_points = int(request.args["max_points"]) if request.args.get("max_points") else None
+        takimlar = recent_tracks(request.args.get("takim"), seconds, max_points)
+    except (TypeError, ValueError) as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    return jsonify({"ok": True, "kolonlar": list(TRACK_COLUMNS), "takimlar": takimlar}), 200
+
+
+@app.route("/api/telemetri_redleri", methods=["GET"])
+def telemetri_redleri():
+    """Şema doğrulamasında reddedilen paketler: takım → {hata_kodu: adet}."""
+    return jsonify({
+        "ok": True,
+        "kabul": telemetry_validator.accepted,
+        "takimlar": {str(k): dict(v) for k, v in list(telemetry_validator.rejections.items())}
+    }), 200
 
 
 @socketio.on('connect')
 def on_connect():
-    print("🔌 socket connected:", request.sid)
+    start_background_tasks()
+    _socket_clients.add(request.sid)
+    log.info("🔌 socket connected: %s", request.sid)
+    fleet_broadcaster.send_full(request.sid)  # yeni panel tüm filoyu hemen görsün
+    emit_zone_state(request.sid)  # ve mevcut geofence/HSS durumlarını
+
+
+def emit_zone_state(sid):
+    """O anki bölge durumları (geçmiş yeniden gönderilmez)."""
+    socketio.emit("zone_state", {
+        "sunucusaati": server_now_dict(),
+        "takimlar": {str(k): v for k, v in zone_states.snapshot().items()}
+    }, to=sid)
+
+
+@socketio.on('fetch_zone_state')
+def on_fetch_zone_state(_payload=None):
+    emit_zone_state(request.sid)
 
 
 @socketio.on('disconnect')
 def on_disconnect():
-    print("🔌 socket disconnected:", request.sid)
+    log.info("🔌 socket disconnected: %s", request.sid)
+    _socket_clients.discard(request.sid)
+    history_streamer.cancel_all(request.sid)
+    replays.stop(request.sid)
+
+
+# --- Uçaklar için kalıcı bağlantılı telemetri kanalı ---
+# HTTP POST'ta her pakette yeniden yapılan bağlantı / başlık ayrıştırma / ok_auth()
+# yerine: bağlanırken bir kez token doğrulanır, sonra "telemetri" olayı ile JSON dict
+# ya da ikili çerçeve (telemetry_frame, 55 bayt) gönderilir. Cevap ack ile döner:
+# (durum, gövde) — 200'de gövde HTTP cevabıyla aynı konumBilgileri JSON metni,
+# 204'te ret nedeni, 400'de "3" (hız limiti) ya da hata.
+#   sio.connect(url, namespaces=["/ucak"], auth={"token": tok}, transports=["websocket"])
+#   durum, govde = sio.call("telemetri", telemetry_frame.encode(pkt), namespace="/ucak")
+import telemetry_frame
+
+INGEST_NAMESPACE = "/ucak"
+_ingest_clients = set()
+REGISTRY.gauge("iha_ingest_connections", "kalıcı telemetri kanalına bağlı uçak", fn=lambda: len(_ingest_clients))
+
+
+@socketio.on("connect", namespace=INGEST_NAMESPACE)
+def on_ingest_connect(auth=None):
+    start_background_tasks()
+    tok = auth.get("token") if isinstance(auth, dict) else None
+    if not ((tok and (tok == TOKEN or state.token_team(tok) is not None)) or ok_auth()):
+        TELEMETRY_PACKETS.inc(("?", "unauthorized"))
+        return False  # bağlantı reddedilir
+    _ingest_clients.add(request.sid)
+    log.info("🛩️ telemetri kanalı bağlandı: %s", request.sid)
+
+
+@socketio.on("disconnect", namespace=INGEST_NAMESPACE)
+def on_ingest_disconnect():
+    _ingest_clients.discard(request.sid)
+    log.info("🛩️ telemetri kanalı kapandı: %s", request.sid)
+
+
+@socketio.on("telemetri", namespace=INGEST_NAMESPACE)
+def on_ingest_telemetry(data):
+    stages = StageTimer(TELEMETRY_STAGE_SECONDS)
+    if not admission.allow("reply"):
+        TELEMETRY_PACKETS.inc(("?", "shed"))
+        return 503, "busy"
+    if isinstance(data, (bytes, bytearray)):
+        try:
+            data = telemetry_frame.decode(data)
+        except ValueError as e:
+            TELEMETRY_PACKETS.inc(("?", "rejected"))
+            return 400, "frame: %s" % e
+    stages.mark("decode")
+    status, body, headers = ingest_telemetry(data if data is not None else {}, stages)
+    return status, body or headers.get("X-Red-Nedeni", "")
 
 
 from flask_socketio import emit
 from flask import request
 
 
+# --- Geçmiş sorguları: keyset sayfalama, isteğe bağlı parça parça akış ---
+HISTORY_MAX_CONCURRENT = 2  # istemci (sid) başına eşzamanlı sorgu
+HISTORY_CHUNK_ROWS = 500  # akış modunda mesaj başına satır
+HISTORY_MAX_PAGE = 5000  # tek mesajlık sorguda limit üst sınırı
+HISTORY_MAX_STREAM_ROWS = 500000  # bir akışta en fazla satır
+
+history_streamer = HistoryStreamer(socketio, max_concurrent=HISTORY_MAX_CONCURRENT, chunk_rows=HISTORY_CHUNK_ROWS,
+                                   max_page=HISTORY_MAX_PAGE, max_stream_rows=HISTORY_MAX_STREAM_ROWS)
+
+
+def _run_history(payload, event, fetch):
+    """
+    Ortak akış: payload'daki stream/cursor/limit/req_id'yi uygula.
+    fetch(limit, cursor) → satırlar. stream=true ise <event>_chunk/<event>_end,
+    değilse tek <event>_result {ok, rows, count, next_cursor, req_id}.
+    """
+    sid = request.sid
+    p = payload if isinstance(payload, dict) else {}
+    req_id = p.get("req_id")
+    try:
+        req_id = history_streamer.begin(sid, req_id)
+    except QueryRejected as e:
+        name = event + ("_end" if p.get("stream") else "_result")
+        socketio.emit(name, {"ok": False, "error": e.code, "detail": str(e),
+                             "req_id": req_id if isinstance(req_id, (str, int)) else None}, to=sid)
+        return
+
+    if p.get("stream"):
+        history_streamer.stream(sid, req_id, event, lambda cur, n: fetch(n, cur),
+                                limit=p.get("limit"), cursor=p.get("cursor"))
+        return
+
+    try:
+        limit = history_streamer.clamp_page(p.get("limit"))
+        rows = fetch(limit, p.get("cursor"))
+        socketio.emit(event + "_result", {"ok": True, "rows": rows, "count": len(rows), "req_id": req_id,
+                                          "next_cursor": next_cursor(rows, limit)}, to=sid)
+    except Exception as e:
+        log.error("❌ fetch_%s hata: %s", event, e)
+        socketio.emit(event + "_result", {"ok": False, "error": str(e), "req_id": req_id}, to=sid)
+    finally:
+        history_streamer.finish(sid, req_id)
+
+
 @socketio.on('fetch_history')
 def on_fetch_history(payload):
     """
-    payload: { takim?: int|string, start?: 'YYYY-MM-DDTHH:MM:SSZ', end?: 'YYYY-MM-DDTHH:MM:SSZ', limit?: int }
+    payload: { takim?: int|string, start?: 'YYYY-MM-DDTHH:MM:SSZ', end?: 'YYYY-MM-DDTHH:MM:SSZ', limit?: int,
+               cursor?: '<ts_ms>:<id>', stream?: bool, req_id?: string }
     """
-    try:
-        takim = payload.get("takim") if isinstance(payload, dict) else None
-        start = payload.get("start") if isinstance(payload, dict) else None
-        end = payload.get("end") if isinstance(payload, dict) else None
-        limit = payload.get("limit") if isinstance(payload, dict) else 1000
+    p = payload if isinstance(payload, dict) else {}
+    if p.get("downsample") or p.get("max_points") or p.get("resolution"):
+        return _fetch_history_downsampled(p)
+    _run_history(p, "history", lambda n, cur: query_telemetry_history(
+        p.get("takim"), p.get("start"), p.get("end"), n, cur))
+
 
-        rows = query_telemetry_history(takim, start, end, limit)
-        emit('history_result', {"ok": True, "rows": rows, "count": len(rows)}, room=request.sid)
+def _fetch_history_downsampled(p):
+    """
+    fetch_history + { downsample?: "lttb"|"bucket", max_points?: int, resolution?: sn, field?: "irtifa"|"hiz"|"batarya" }
+    Tek history_result mesajı; ek alan "downsampled": {mode, source_rows, points[, bucket_ms]}.
+    """
+    sid = request.sid
+    mode = p.get("downsample") or ("bucket" if p.get("resolution") else "lttb")
+    try:
+        req_id = history_streamer.begin(sid, p.get("req_id"))
+    except QueryRejected as e:
+        rid = p.get("req_id")
+        socketio.emit("history_result", {"ok": False, "error": e.code, "detail": str(e),
+                                         "req_id": rid if isinstance(rid, (str, int)) else None}, to=sid)
+        return
+    try:
+        if mode not in ("lttb", "bucket"):
+            raise ValueError("downsample: lttb | bucket")
+        rows, info = query_telemetry_downsampled(p.get("takim"), p.get("start"), p.get("end"),
+                                                 p.get("max_points") or p.get("limit") or 2000, mode,
+                                                 p.get("resolution"), p.get("field"), HISTORY_MAX_PAGE)
+        socketio.emit("history_result", {"ok": True, "rows": rows, "count": len(rows), "req_id": req_id,
+                                         "next_cursor": None, "downsampled": info}, to=sid)
     except Exception as e:
-        print("❌ fetch_history hata:", e)
-        emit('history_result', {"ok": False, "error": str(e)}, room=request.sid)
+        log.error("❌ fetch_history (seyreltme) hata: %s", e)
+        socketio.emit("history_result", {"ok": False, "error": str(e), "req_id": req_id}, to=sid)
+    finally:
+        history_streamer.finish(sid, req_id)
 
 
 @socketio.on('fetch_locks')
@@ -1030,42 +1838,159 @@ def on_fetch_locks(payload):
       kilitlenen?: int|string,     # kilitlenen takım (ops)
       start?: 'YYYY-MM-DDTHH:MM:SSZ',  # opss
       end?:   'YYYY-MM-DDTHH:MM:SSZ',  # ops
-      limit?: int                  # varsayılan 1000
+      limit?: int,                 # varsayılan 1000 (tek mesajda en fazla HISTORY_MAX_PAGE)
+      cursor?, stream?, req_id?    # fetch_history ile aynı
     }
     """
-    try:
-        kay = payload.get("kaynak") if isinstance(payload, dict) else None
-        dst = payload.get("kilitlenen") if isinstance(payload, dict) else None
-        start = payload.get("start") if isinstance(payload, dict) else None
-        end = payload.get("end") if isinstance(payload, dict) else None
-        limit = payload.get("limit") if isinstance(payload, dict) else 1000
-
-        rows = query_locks_history(kay, dst, start, end, limit)
-        emit('locks_result', {"ok": True, "rows": rows, "count": len(rows)}, room=request.sid)
-    except Exception as e:
-        print("❌ fetch_locks hata:", e)
-        emit('locks_result', {"ok": False, "error": str(e)}, room=request.sid)
+    p = payload if isinstance(payload, dict) else {}
+    _run_history(p, "locks", lambda n, cur: query_locks_history(
+        p.get("kaynak"), p.get("kilitlenen"), p.get("start"), p.get("end"), n, cur))
 
 
 @socketio.on('fetch_kamikaze')
 def on_fetch_kamikaze(payload):
     """
-    payload: { kaynak?: int|string, start?: 'YYYY-MM-DDTHH:MM:SSZ', end?: 'YYYY-MM-DDTHH:MM:SSZ', limit?: int }
+    payload: { kaynak?: int|string, start?: 'YYYY-MM-DDTHH:MM:SSZ', end?: 'YYYY-MM-DDTHH:MM:SSZ', limit?: int,
+               cursor?, stream?, req_id? }
+    """
+    p = payload if isinstance(payload, dict) else {}
+    _run_history(p, "kamikaze", lambda n, cur: query_kamikaze_history(
+        p.get("kaynak"), p.get("start"), p.get("end"), n, cur))
+
+
+@socketio.on('fetch_recent')
+def on_fetch_recent(payload):
+    """
+    payload: { takim?: int, seconds?: sn (varsayılan 300), max_points?: int, req_id? }
+    Bellekteki halkadan (çok worker'da DB'den; bkz. recent_tracks)
+    → recent_result {ok, req_id, takimlar: {takim: {kolon: [..]}}}
     """
+    p = payload if isinstance(payload, dict) else {}
     try:
-        kaynak = payload.get("kaynak") if isinstance(payload, dict) else None
-        start = payload.get("start") if isinstance(payload, dict) else None
-        end = payload.get("end") if isinstance(payload, dict) else None
-        limit = payload.get("limit") if isinstance(payload, dict) else 1000
+        takimlar = recent_tracks(p.get("takim"), float(p.get("seconds") or 300),
+                                 int(p["max_points"]) if p.get("max_points") else None)
+        socketio.emit("recent_result", {"ok": True, "req_id": p.get("req_id"), "takimlar": takimlar}, to=request.sid)
+    except (TypeError, ValueError) as e:
+        socketio.emit("recent_result", {"ok": False, "req_id": p.get("req_id"), "error": str(e)}, to=request.sid)
 
-        rows = query_kamikaze_history(kaynak, start, end, limit)
-        emit('kamikaze_result', {"ok": True, "rows": rows, "count": len(rows)}, room=request.sid)
-    except Exception as e:
-        print("❌ fetch_kamikaze hata:", e)
-        emit('kamikaze_result', {"ok": False, "error": str(e)}, room=request.sid)
+
+@socketio.on('cancel_query')
+def on_cancel_query(payload):
+    """payload: { req_id: string } — devam eden akışı durdur (son mesaj <olay>_end, cancelled=true)."""
+    req_id = payload.get("req_id") if isinstance(payload, dict) else None
+    return {"ok": history_streamer.cancel(request.sid, req_id)}
+
+
+# --- Kayıtlı görevi yeniden oynatma (sadece isteyen panele; canlı yayın sürer) ---
+REPLAY_CHUNK_ROWS = 2000  # tablo başına bir okumada satır
+REPLAY_LOW_WATER = 500  # tampon bunun altına inince sonraki parça önceden okunur
+
+replays = ReplayManager(socketio, db.query_offhub, tick_hz=FLEET_BROADCAST_HZ,
+                        chunk_rows=REPLAY_CHUNK_ROWS, low_water=REPLAY_LOW_WATER)
+
+
+def _replay_bounds():
+    """Kayıttaki ilk/son olay zamanı (ms); boş DB → (None, None)."""
+    lo = hi = None
+    for table in ("telemetry", "locks", "kamikaze"):
+        row = db.query_offhub(f"SELECT MIN(ts_ms), MAX(ts_ms) FROM {table}")[0]
+        if row[0] is not None:
+            lo = row[0] if lo is None else min(lo, row[0])
+            hi = row[1] if hi is None else max(hi, row[1])
+    return lo, hi
+
+
+@socketio.on('replay_start')
+def on_replay_start(payload):
+    """
+    payload: { start?: ISO|ms, end?: ISO|ms, speed?: 1..50, takim?: int }
+    Varsayılan aralık kayıttaki ilk–son olay. Oynatma fleet_update / lock_event / kamikaze_event
+    ("replay": true) ve ~1 sn'de bir replay_status {state, t_ms, start_ms, end_ms, speed, sent} yollar.
+    """
+    p = payload if isinstance(payload, dict) else {}
+    try:
+        lo, hi = _replay_bounds()
+        start = parse_ts_ms(p.get("start"))
+        end = parse_ts_ms(p.get("end"), end=True)
+        start = lo if start is None else start
+        end = hi if end is None else end
+        if start is None or end is None or start > end:
+            return {"ok": False, "error": "oynatılacak kayıt yok"}
+        s = replays.start(request.sid, start, end, p.get("speed") or 1, p.get("takim"))
+        return {"ok": True, "start_ms": s.start_ms, "end_ms": s.end_ms, "speed": s.speed}
+    except (TypeError, ValueError) as e:
+        return {"ok": False, "error": str(e)}
+
+
+@socketio.on('replay_control')
+def on_replay_control(payload):
+    """payload: { action: "pause"|"resume"|"speed"|"seek"|"stop", speed?: 1..50, t?: ISO|ms }"""
+    p = payload if isinstance(payload, dict) else {}
+    action = p.get("action")
+    if action == "stop":
+        replays.stop(request.sid)
+        return {"ok": True}
+    s = replays.get(request.sid)
+    if s is None:
+        return {"ok": False, "error": "oynatma yok"}
+    try:
+        if action == "pause":
+            s.pause()
+        elif action == "resume":
+            s.resume()
+        elif action == "speed":
+            s.set_speed(p.get("speed"))
+        elif action == "seek":
+            s.seek(parse_ts_ms(p.get("t")))
+        else:
+            return {"ok": False, "error": "action: pause | resume | speed | seek | stop"}
+    except (TypeError, ValueError) as e:
+        return {"ok": False, "error": str(e)}
+    return dict(s.status(), ok=True)
+
+
+# --- Masaüstü başlatıcıdan kapatma (app_window_single.py) ---
+# Başlatıcı her açılışta rastgele bir anahtar üretip ortamla verir; yoksa endpoint kapalıdır.
+# Sinyal / alt süreç bulma yerine istek: werkzeug reloader altında da her işletim sisteminde çalışır.
+SHUTDOWN_TOKEN = os.environ.get("IHA_SHUTDOWN_TOKEN", "")
+
+
+@app.route("/api/kapat", methods=["POST"])
+def shutdown():
+    """Kuyruktaki kayıtları yazıp süreci kapat (yalnız localhost + başlatıcının anahtarı)."""
+    tok = request.headers.get("X-Kapat-Anahtari", "")
+    if not SHUTDOWN_TOKEN or request.remote_addr not in ("127.0.0.1", "::1") \
+            or not secrets.compare_digest(tok, SHUTDOWN_TOKEN):
+        return "404", 404
+    socketio.start_background_task(_flush_and_exit)
+    return jsonify({"ok": True}), 202
+
+
+def _flush_and_exit():
+    time.sleep(0.1)  # cevap gitsin
+    log.info("🛑 kapatma isteği: DB kuyruğu yazılıyor")
+    db_writer.stop()
+    db.close()
+    log_system.stop()
+    # 0 ile çıkış: reloader ana süreci de (çıkış kodu 3 değil) kendiliğinden kapanır
+    os._exit(0)
 
 
 if __name__ == "__main__":
-    print("DB PATH =", os.path.abspath("iha_logs.db"))
+    log.info("DB PATH = %s", os.path.abspath("iha_logs.db"))
     init_db()  # <-- şart
-    socketio.run(app, host="0.0.0.0", port=10001, debug=True)
+    hss_store.load()
+    reload_fences()
+    dashboard_page()  # static/ + ui.html sıkıştırması ilk istekte değil açılışta
+    # SIGTERM (ör. app_window_single'dan terminate) gelince de atexit çalışsın → kuyruk diske yazılsın
+    import signal, sys
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    db_writer.start()
+    if WORKER_ID is not None:
+        # serve_workers.py: reloader yok; aynı portu paylaşan (SO_REUSEPORT) N süreçten biri
+        import eventlet, eventlet.wsgi
+        log.info("👷 worker %s: port %s, state=%s", WORKER_ID, os.environ.get("IHA_PORT", 10001), STATE_BACKEND)
+        eventlet.wsgi.server(eventlet.listen(("0.0.0.0", int(os.environ.get("IHA_PORT", 10001))), reuse_port=True),
+                             app, log_output=False)
+    else:
+        socketio.run(app, host="0.0.0.0", port=10001, debug=True)
@@ -0,0 +1,85 @@
+"""
+Sabit hızlı filo yayıncısı.
+
+Her kabul edilen pakette tüm panellere ayrı ayrı ``telemetry_update`` +
+tam düşman listesi göndermek yerine, paket geldiğinde takım sadece "değişti"
+olarak işaretlenir. Ayrı bir greenlet saniyede ``rate_hz`` kez tek bir
+``fleet_update`` mesajı yollar; mesajda yalnızca son tick'ten beri değişen
+takımlar bulunur. Yeni bağlanan panel ``send_full`` ile tam anlık görüntü alır.
+
+Mesaj biçimi:
+    {"seq": int, "full": bool, "sunucusaati": {...},
+     "teams": [{"takim_numarasi": .., "iha_enlem": .., ...}, ...]}
+"""
+import logging
+import time
+
+log = logging.getLogger("iha.fleet")
+
+
+class FleetBroadcaster:
+    def __init__(self, socketio, render_team, live_teams, now_dict, rate_hz=5.0, event="fleet_update",
+                 on_tick=None):
+        """
+        render_team(takim) → takımın yayın kaydı (dict) ya da None (bayat/bilinmiyor)
+        live_teams()       → bayat olmayan takım numaraları
+        now_dict()         → sunucu saati dict'i (sunucusaati)
+        on_tick(sn)        → (ops) yayın yapılan her tick'in süresi (izleme)
+        """
+        self.socketio = socketio
+        self.render_team = render_team
+        self.live_teams = live_teams
+        self.now_dict = now_dict
+        self.period = 1.0 / float(rate_hz)
+        self.event = event
+        self.on_tick = on_tick
+        self.seq = 0
+        self._dirty = set()
+
+        # izleme için
+        self.ticks = 0
+        self.sent_teams = 0
+
+    def mark(self, takim):
+        """Takımın yeni paketi geldi; bir sonraki tick'te yayınlanacak."""
+        self._dirty.add(takim)
+
+    def pending(self):
+        return len(self._dirty)
+
+    def _payload(self, teams, full):
+        entries = []
+        for takim in teams:
+            e = self.render_team(takim)
+            if e is not None:
+                entries.append(e)
+        self.seq += 1
+        return {"seq": self.seq, "full": full, "sunucusaati": self.now_dict(), "teams": entries}
+
+    def tick(self):
+        """Değişen takımları tek mesajda yayınla (değişen yoksa bir şey gönderme)."""
+        if not self._dirty:
+            return None
+        dirty, self._dirty = self._dirty, set()
+        payload = self._payload(sorted(dirty), full=False)
+        if payload["teams"]:
+            self.socketio.emit(self.event, payload)
+            self.ticks += 1
+            self.sent_teams += len(payload["teams"])
+        return payload
+
+    def send_full(self, sid):
+        """Yeni bağlanan panele tüm canlı takımların anlık görüntüsü."""
+        self.socketio.emit(self.event, self._payload(sorted(self.live_teams()), full=True), to=sid)
+
+    def run(self):
+        nxt = time.monotonic()
+        while True:
+            nxt += self.period
+            self.socketio.sleep(max(0.0, nxt - time.monotonic()))
+            try:
+                t0 = time.perf_counter()
+                if self.tick() is not None and self.on_tick is not None:
+                    self.on_tick(time.perf_counter() - t0)
+            except Exception as e:
+                log.error("❌ fleet_update yayın hatası: %s", e)
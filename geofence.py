@@ -0,0 +1,149 @@
+"""
+Derlenmiş geofence motoru.
+
+Fence'ler oluşturulunca/güncellenince bir kez derlenir:
+  - GeoJSON (Feature ya da çıplak geometry; Polygon veya MultiPolygon, delikler dahil)
+    düz koordinat dizilerine (xs=boylam, ys=enlem) çevrilir,
+  - her poligonun sınır kutusu (bbox) önceden hesaplanır,
+  - poligonlar sabit hücre boyutlu bir grid'e yerleştirilir.
+
+Sorguda nokta sadece kendi hücresindeki aday poligonlara, önce bbox ile
+sonra ray-cast ile test edilir. Noktanın bir poligonun içinde sayılması için
+dış halkanın içinde ve deliklerin hepsinin dışında olması gerekir.
+"""
+import json
+import logging
+import math
+
+log = logging.getLogger("iha.geofence")
+
+GRID_CELL_DEG = 0.01  # ~1.1 km (enlem yönünde)
+_MAX_CELLS_PER_POLY = 4096  # bundan büyük poligonlar grid yerine "geniş" listeye girer
+
+
+def _ring_contains(xs, ys, x, y):
+    """Çift-tek (ray-cast) kuralı; xs/ys kapanış noktası olsa da olmasa da çalışır."""
+    inside = False
+    n = len(xs)
+    j = n - 1
+    for i in range(n):
+        yi, yj = ys[i], ys[j]
+        if (yi > y) != (yj > y):
+            xi, xj = xs[i], xs[j]
+            if x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+                inside = not inside
+        j = i
+    return inside
+
+
+class CompiledPolygon:
+    __slots__ = ("fence_id", "outer", "holes", "bbox")
+
+    def __init__(self, fence_id, rings):
+        # rings[0] dış halka, kalanlar delik; her biri [[lon,lat], ...]
+        self.fence_id = fence_id
+        self.outer = self._flat(rings[0])
+        self.holes = [self._flat(r) for r in rings[1:] if len(r) >= 3]
+        xs, ys = self.outer
+        self.bbox = (min(xs), min(ys), max(xs), max(ys))  # (minLon, minLat, maxLon, maxLat)
+
+    @staticmethod
+    def _flat(ring):
+        return (tuple(float(p[0]) for p in ring), tuple(float(p[1]) for p in ring))
+
+    def contains(self, lat, lon):
+        x0, y0, x1, y1 = self.bbox
+        if lon < x0 or lon > x1 or lat < y0 or lat > y1:
+            return False
+        if not _ring_contains(self.outer[0], self.outer[1], lon, lat):
+            return False
+        for hx, hy in self.holes:
+            if _ring_contains(hx, hy, lon, lat):
+                return False
+        return True
+
+
+def compile_geojson(fence_id, gj):
+    """GeoJSON Feature/geometry → CompiledPolygon listesi (geçersizse boş liste)."""
+    if isinstance(gj, str):
+        gj = json.loads(gj)
+    geom = gj.get("geometry", gj) if isinstance(gj, dict) else None
+    if not isinstance(geom, dict):
+        return []
+    gtype = geom.get("type")
+    coords = geom.get("coordinates") or []
+    if gtype == "Polygon":
+        polys = [coords]
+    elif gtype == "MultiPolygon":
+        polys = coords
+    else:
+        return []
+    return [CompiledPolygon(fence_id, rings) for rings in polys if rings and len(rings[0]) >= 3]
+
+
+class FenceEngine:
+    def __init__(self, cell_deg=GRID_CELL_DEG):
+        self.cell = float(cell_deg)
+        self.version = 0
+        self.polygons = []
+        self._compiled = {}  # fence id → (updated_at, [CompiledPolygon])
+        self._grid = {}  # (cx, cy) → [CompiledPolygon]
+        self._wide = []  # grid'e sığmayan büyük poligonlar
+
+    def _cell_of(self, lat, lon):
+        return math.floor(lon / self.cell), math.floor(lat / self.cell)
+
+    def sync(self, fences):
+        """list_fences() çıktısıyla motoru eşitle; değişmeyen fence yeniden derlenmez."""
+        compiled = {}
+        for f in fences:
+            if f.get("kind") != "polygon":
+                continue
+            fid = f["id"]
+            prev = self._compiled.get(fid)
+            if prev is not None and prev[0] == f.get("updated_at"):
+                compiled[fid] = prev
+                continue
+            try:
+                compiled[fid] = (f.get("updated_at"), compile_geojson(fid, f["geojson"]))
+            except Exception as e:
+                log.warning("⚠️ fence derlenemedi: %s %s", fid, e)
+        self._compiled = compiled
+        self._build_index()
+
+    def _build_index(self):
+        polygons, grid, wide = [], {}, []
+        for _, polys in self._compiled.values():
+            for p in polys:
+                polygons.append(p)
+                x0, y0, x1, y1 = p.bbox
+                cx0, cy0 = self._cell_of(y0, x0)
+                cx1, cy1 = self._cell_of(y1, x1)
+                if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > _MAX_CELLS_PER_POLY:
+                    wide.append(p)
+                    continue
+                for cx in range(cx0, cx1 + 1):
+                    for cy in range(cy0, cy1 + 1):
+                        grid.setdefault((cx, cy), []).append(p)
+        self.polygons, self._grid, self._wide = polygons, grid, wide
+        self.version += 1
+
+    def candidates(self, lat, lon):
+        return self._grid.get(self._cell_of(lat, lon), ()), self._wide
+
+    def contains(self, lat, lon):
+        """Nokta herhangi bir fence'in içinde mi?"""
+        for group in self.candidates(lat, lon):
+            for p in group:
+                if p.contains(lat, lon):
+                    return True
+        return False
+
+    def fences_containing(self, lat, lon):
+        """Noktayı içeren fence id'leri (sıralı, tekrarsız)."""
+        ids = set()
+        for group in self.candidates(lat, lon):
+            for p in group:
+                if p.fence_id not in ids and p.contains(lat, lon):
+                    ids.add(p.fence_id)
+        return sorted(ids)
@@ -0,0 +1,152 @@
+"""
+Geçmiş sorguları: keyset sayfalama + parça parça (chunk) yayın.
+
+Sayfalama ``(ts_ms, id)`` üzerinde, yeniden eskiye: imleç son satırın
+``"<ts_ms>:<id>"`` değeridir, sonraki sayfa ``(ts_ms, id) < imleç`` ile alınır
+(OFFSET yok; her sayfa indekste doğrudan konumlanır).
+
+Akış modunda sonuç tek mesaj yerine ``<olay>_chunk`` mesajlarıyla, her biri en
+fazla ``chunk_rows`` satır olacak şekilde gönderilir; bitişte ``<olay>_end``
+gelir. Her parça ayrı bir keyset sorgusudur, araya ``socketio.sleep(0)`` girer;
+uzun bir akış hub'ı ve tarayıcıyı kilitlemez. İstemci ``cancel_query`` ile
+akışı yarıda kesebilir. İstemci (sid) başına eşzamanlı sorgu sayısı sınırlıdır.
+
+Mesajlar:
+    <olay>_chunk: {"req_id", "seq", "rows", "count"}
+    <olay>_end:   {"req_id", "ok", "total", "next_cursor", "cancelled"[, "error"]}
+"""
+
+
+def parse_cursor(cursor):
+    """'<ts_ms>:<id>' → (ts_ms, id); boş → None. Geçersiz → ValueError."""
+    if cursor in (None, "", "null"):
+        return None
+    ts, rid = str(cursor).split(":", 1)
+    return int(ts), int(rid)
+
+
+def keyset_clause(cursor):
+    """Sorguya eklenecek (sql, args): imleçten sonraki satırlar, (ts_ms, id) azalan sırada."""
+    pos = parse_cursor(cursor)
+    if pos is None:
+        return "", []
+    return " AND (ts_ms, id) < (?, ?)", list(pos)
+
+
+KEYSET_ORDER = " ORDER BY ts_ms DESC, id DESC"
+
+
+def next_cursor(rows, page_size):
+    """Sayfa doluysa son satırın imleci (devamı olabilir), değilse None."""
+    if not rows or len(rows) < page_size:
+        return None
+    last = rows[-1]
+    return "%d:%d" % (last["ts_ms"], last["id"])
+
+
+class QueryRejected(Exception):
+    """Sorgu başlatılamadı; ``code`` istemciye giden hata kodudur."""
+    code = "rejected"
+
+
+class TooManyQueries(QueryRejected):
+    code = "too_many_queries"
+
+
+class BadQueryId(QueryRejected):
+    """req_id metin / tamsayı değil ya da aynı istemcide zaten süren bir sorgunun."""
+    code = "bad_req_id"
+
+
+class HistoryStreamer:
+    def __init__(self, socketio, max_concurrent=2, chunk_rows=500, max_page=5000, max_stream_rows=500000):
+        self.socketio = socketio
+        self.max_concurrent = int(max_concurrent)
+        self.chunk_rows = int(chunk_rows)
+        self.max_page = int(max_page)  # tek mesajlık sorguda en fazla satır
+        self.max_stream_rows = int(max_stream_rows)  # bir akışta en fazla satır
+        self._active = {}  # sid → {req_id: iptal_edildi_mi}
+        self._seq = 0
+
+    # ---- eşzamanlılık / iptal ----
+    def begin(self, sid, req_id):
+        if req_id is not None and (isinstance(req_id, bool) or not isinstance(req_id, (str, int))):
+            raise BadQueryId("req_id metin ya da tamsayı olmalı")
+        active = self._active.setdefault(sid, {})
+        if req_id in active:
+            raise BadQueryId("req_id zaten kullanımda: %s" % req_id)
+        if len(active) >= self.max_concurrent:
+            raise TooManyQueries("en fazla %d eşzamanlı sorgu" % self.max_concurrent)
+        while req_id is None or req_id in active:
+            self._seq += 1
+            req_id = "q%d" % self._seq
+        active[req_id] = False
+        return req_id
+
+    def finish(self, sid, req_id):
+        active = self._active.get(sid)
+        if active is not None:
+            active.pop(req_id, None)
+            if not active:
+                self._active.pop(sid, None)
+
+    def cancel(self, sid, req_id):
+        active = self._active.get(sid)
+        if active and req_id in active:
+            active[req_id] = True
+            return True
+        return False
+
+    def cancel_all(self, sid):
+        """Bağlantı kopunca: süren akışlar durur (cancelled() kayıtsız sorguya True döner), kayıtlar silinir."""
+        active = self._active.pop(sid, None) or {}
+        for req_id in active:
+            active[req_id] = True
+
+    def active_count(self):
+        return sum(len(a) for a in self._active.values())
+
+    def cancelled(self, sid, req_id):
+        return self._active.get(sid, {}).get(req_id, True)
+
+    def clamp_page(self, limit, default=1000):
+        try:
+            limit = int(limit) if limit not in (None, "") else default
+        except (TypeError, ValueError):
+            limit = default
+        return max(1, min(limit or default, self.max_page))
+
+    # ---- akış ----
+    def stream(self, sid, req_id, event, fetch_page, limit=None, cursor=None):
+        """
+        fetch_page(cursor, n) → satır listesi ((ts_ms, id) azalan, her satırda "ts_ms" ve "id").
+        En fazla ``limit`` satırı parça parça yollar; bitince <event>_end.
+        """
+        total, seq, cancelled = 0, 0, False
+        end = {"req_id": req_id, "ok": True}
+        try:
+            total_max = self.max_stream_rows
+            if limit not in (None, "", 0):
+                total_max = max(1, min(int(limit), self.max_stream_rows))
+            while total < total_max:
+                if self.cancelled(sid, req_id):
+                    cancelled = True
+                    break
+                n = min(self.chunk_rows, total_max - total)
+                rows = fetch_page(cursor, n)
+                cursor = next_cursor(rows, n)
+                if rows:
+                    seq += 1
+                    total += len(rows)
+                    self.socketio.emit(event + "_chunk", {"req_id": req_id, "seq": seq, "rows": rows,
+                                                          "count": len(rows)}, to=sid)
+                if cursor is None:
+                    break
+                self.socketio.sleep(0)  # diğer istemciler / iptal mesajı işlensin
+        except Exception as e:
+            end.update(ok=False, error=str(e))
+        finally:
+            self.finish(sid, req_id)
+        end.update(total=total, next_cursor=cursor, cancelled=cancelled)
+        self.socketio.emit(event + "_end", end, to=sid)
+        return end
@@ -0,0 +1,111 @@
+"""
+HSS (hava savunma sistemi) bölgeleri için bellek içi tablo.
+
+DB yalnızca kalıcılık için kullanılır; okuma her zaman bellekten yapılır.
+insert/update/delete önce DB'ye yazar, sonra bellekteki tabloyu yerinde
+günceller ve ``version`` sayacını artırır. Uçağa giden
+``hssEnlem/hssBoylam/hssYaricap`` listesi ve JSON hali sadece sürüm
+değiştiğinde yeniden üretilir.
+"""
+import json
+import threading
+
+_COLUMNS = ("id", "name", "lat", "lon", "radius", "active", "updated_at")
+_SELECT = "SELECT id,name,lat,lon,radius,active,updated_at FROM hss"
+
+
+class HssStore:
+    def __init__(self, db):
+        self.db = db
+        self.version = 0
+        self._rows = {}  # id → satır dict (aktif + pasif)
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._cache_version = -1
+        self._items = []
+        self._coords = []
+        self._coords_json = "[]"
+
+    # ---- yükleme ----
+    def load(self):
+        rows = self.db.query(_SELECT + " ORDER BY id")
+        with self._lock:
+            self._rows = {r[0]: dict(zip(_COLUMNS, r)) for r in rows}
+            self._loaded = True
+            self.version += 1
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def _reload_row(self, hid):
+        """DB'deki tek satırı belleğe al (yoksa bellekten de sil)."""
+        r = self.db.query(_SELECT + " WHERE id=?", (hid,))
+        with self._lock:
+            rows = dict(self._rows)  # kopyala-değiştir: okuyucular hep tutarlı bir tablo görür
+            if r:
+                rows[hid] = dict(zip(_COLUMNS, r[0]))
+            else:
+                rows.pop(hid, None)
+            self._rows = rows
+            self.version += 1
+
+    # ---- CRUD (önce DB, sonra bellek) ----
+    def insert(self, name, lat, lon, radius, updated_at):
+        self._ensure_loaded()
+        hid, _ = self.db.execute(
+            "INSERT INTO hss(name,lat,lon,radius,active,updated_at) VALUES (?,?,?,?,1,?)",
+            (name, float(lat), float(lon), float(radius), updated_at))
+        self._reload_row(hid)
+        return hid
+
+    def update(self, hid, fields, updated_at):
+        self._ensure_loaded()
+        sets, args = [], []
+        for k in ("name", "lat", "lon", "radius", "active"):
+            if k in fields: sets.append(f"{k}=?"); args.append(fields[k])
+        sets.append("updated_at=?")
+        args.append(updated_at)
+        args.append(int(hid))
+        self.db.execute(f"UPDATE hss SET {', '.join(sets)} WHERE id=?", args)
+        self._reload_row(int(hid))
+
+    def delete(self, hid):
+        self._ensure_loaded()
+        self.db.execute("DELETE FROM hss WHERE id=?", (int(hid),))
+        with self._lock:
+            rows = dict(self._rows)
+            rows.pop(int(hid), None)
+            self._rows = rows
+            self.version += 1
+
+    # ---- okuma (sürüm değişmediyse önbellekten) ----
+    def _refresh(self):
+        self._ensure_loaded()
+        if self._cache_version == self.version:
+            return
+        with self._lock:
+            version = self.version
+            items = [dict(r) for _, r in sorted(self._rows.items()) if r["active"] == 1]
+        coords = [
+            {"id": it["id"], "hssEnlem": it["lat"], "hssBoylam": it["lon"], "hssYaricap": it["radius"]}
+            for it in items
+        ]
+        self._items, self._coords = items, coords
+        self._coords_json = json.dumps(coords, sort_keys=True)
+        self._cache_version = version
+
+    def items(self):
+        """Aktif HSS'ler (list_hss ile aynı biçim). Dönen listeyi değiştirmeyin."""
+        self._refresh()
+        return self._items
+
+    def coords(self):
+        """Uçağa giden hss_koordinat_bilgileri listesi."""
+        self._refresh()
+        return self._coords
+
+    def coords_json(self):
+        """coords() listesinin önceden serileştirilmiş JSON metni."""
+        self._refresh()
+        return self._coords_json
@@ -0,0 +1,274 @@
+"""
+Kayıtların (telemetry / locks / kamikaze) toplu dışa aktarımı: CSV, Parquet, Arrow.
+
+Satırlar bellekte biriktirilmez: tablo (ts_ms, id) artan sırada keyset ile
+``chunk_rows``'luk parçalar halinde okunur, her parça hemen yazılıp bırakılır;
+bellek kullanımı tablo boyundan bağımsızdır. Duruş açıları, hedef kutusu ve
+telemetri gps saati tablolarda tipli kolondur (packet_store); kilitlenme /
+kamikaze GPS JSON alanları SQL tarafında ``json_extract`` ile kolonlara açılır.
+
+Parquet / Arrow için pyarrow gerekir (opsiyonel: ``pip install pyarrow``);
+CSV için ek bağımlılık yok.
+
+Sunucu: ``GET /api/export?table=telemetry&format=csv&takim=&start=&end=``
+Komut satırı (sunucu kapalıyken de çalışır, DB salt okunur açılır):
+    python log_export.py --table telemetry --format parquet --out telemetry.parquet
+    python log_export.py --table all --format csv --out export/ --start 2025-10-21T08:00:00Z
+"""
+import argparse
+import csv
+import io
+import os
+import sqlite3
+import sys
+import time
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # opsiyonel
+    pa = pq = None
+
+from utc_time import iso_from_ms, parse_ts_ms
+
+
+def _num(col, path, kind="REAL"):
+    # JSON alanı sayıysa tipli değer, değilse (metin / yok) NULL
+    return (f"CASE WHEN json_type({col}, '{path}') IN ('integer', 'real') "
+            f"THEN CAST(json_extract({col}, '{path}') AS {kind}) END")
+
+
+def _gps(col, prefix, base="$"):
+    return [(f"{prefix}_{k}", _num(col, f"{base}.{k}", "INTEGER"), "int")
+            for k in ("saat", "dakika", "saniye", "milisaniye")]
+
+
+def _target():
+    # hedef kutusu kolonları (INTEGER; tam olmayan değerler REAL saklanır) → float
+    return [(k, f"CAST({k} AS REAL)", "float")
+            for k in ("hedef_merkez_X", "hedef_merkez_Y", "hedef_genislik", "hedef_yukseklik")]
+
+
+# tablo → (takım filtresi kolonu, [(çıktı kolonu, SQL ifadesi, tip)]); ilk iki kolon her zaman id, ts_ms
+EXPORT_TABLES = {
+    "telemetry": ("takim", [
+        ("id", "id", "int"), ("ts_ms", "ts_ms", "int"), ("takim", "takim", "int"),
+        ("enlem", "enlem", "float"), ("boylam", "boylam", "float"), ("irtifa", "irtifa", "float"),
+        ("hiz", "hiz", "float"), ("batarya", "batarya", "int"),
+        ("dikilme", "dikilme", "float"), ("yonelme", "yonelme", "float"), ("yatis", "yatis", "float"),
+        ("otonom", "CAST(otonom AS INTEGER)", "int"), ("kilitlenme", "CAST(kilitlenme AS INTEGER)", "int"),
+    ] + _target() + [
+        ("gps_" + k, "CAST(gps_%s AS INTEGER)" % k, "int") for k in ("saat", "dakika", "saniye", "milisaniye")
+    ]),
+    "locks": ("kaynak_takim", [
+        ("id", "id", "int"), ("ts_ms", "ts_ms", "int"),
+        ("kaynak_takim", "kaynak_takim", "int"), ("kilitlenen_takim", "kilitlenen_takim", "int"),
+        ("otonom_kilitlenme", "otonom_kilitlenme", "int"),
+    ] + _target() + _gps("kilit_bitis_gps", "bitis")),
+    "kamikaze": ("kaynak_takim", [
+        ("id", "id", "int"), ("ts_ms", "ts_ms", "int"),
+        ("kaynak_takim", "kaynak_takim", "int"), ("qr_metni", "qr_metni", "str"),
+    ] + _gps("baslangic_gps", "baslangic") + _gps("bitis_gps", "bitis")),
+}
+
+FORMATS = {  # biçim → (uzantı, mimetype)
+    "csv": ("csv", "text/csv"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+    "arrow": ("arrows", "application/vnd.apache.arrow.stream"),
+}
+
+
+def columns(table):
+    """Çıktı kolonları: (ad, tip); ts_utc, ts_ms'ten üretilir."""
+    cols = [(name, kind) for name, _, kind in EXPORT_TABLES[table][1]]
+    return cols[:2] + [("ts_utc", "str")] + cols[2:]
+
+
+def iter_chunks(fetch, table, takim=None, start=None, end=None, chunk_rows=5000, stats=None):
+    """
+    fetch(sql, args) → tuple listesi. (ts_ms, id) artan keyset ile parça parça satır listesi üretir.
+    start/end: ISO ya da epoch ms (utc_time.parse_ts_ms); hatalıysa ilk next() değil, burada ValueError.
+    """
+    team_col, spec = EXPORT_TABLES[table]
+    where, args = "", []
+    if takim not in (None, ""):
+        where += f" AND {team_col} = ?"
+        args.append(int(takim))
+    start_ms, end_ms = parse_ts_ms(start), parse_ts_ms(end, end=True)
+    if start_ms is not None:
+        where += " AND ts_ms >= ?"
+        args.append(start_ms)
+    if end_ms is not None:
+        where += " AND ts_ms <= ?"
+        args.append(end_ms)
+    select = ", ".join(expr for _, expr, _ in spec)
+    chunk_rows = int(chunk_rows)
+
+    def gen():
+        pos = []
+        while True:
+            sql = f"SELECT {select} FROM {table} WHERE ts_ms IS NOT NULL{where}"
+            if pos:
+                sql += " AND (ts_ms, id) > (?, ?)"
+            sql += " ORDER BY ts_ms, id LIMIT ?"
+            rows = fetch(sql, args + pos + [chunk_rows])
+            if not rows:
+                return
+            if stats is not None:
+                stats["rows"] = stats.get("rows", 0) + len(rows)
+            yield [r[:2] + (iso_from_ms(r[1]),) + tuple(r[2:]) for r in rows]
+            if len(rows) < chunk_rows:
+                return
+            pos = [rows[-1][1], rows[-1][0]]
+
+    return gen()
+
+
+# ---- biçimler ----
+def csv_stream(chunks, table):
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    w.writerow([name for name, _ in columns(table)])
+    for rows in chunks:
+        w.writerows(rows)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+class _Sink:
+    """pyarrow yazıcıları için ara tampon: yazılanı parça parça dışarı verir."""
+
+    def __init__(self):
+        self._parts = []
+        self._pos = 0
+        self.closed = False
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._pos
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        out = b"".join(self._parts)
+        self._parts = []
+        return out
+
+
+_PA_TYPES = {"int": "int64", "float": "float64", "str": "string"}
+
+
+def _schema(table):
+    return pa.schema([(name, getattr(pa, _PA_TYPES[kind])()) for name, kind in columns(table)])
+
+
+def _batch(schema, rows):
+    cols = list(zip(*rows))
+    return pa.record_batch([pa.array(cols[i], type=f.type) for i, f in enumerate(schema)], schema=schema)
+
+
+def parquet_stream(chunks, table):
+    schema = _schema(table)
+    sink = _Sink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    for rows in chunks:
+        writer.write_batch(_batch(schema, rows))  # her parça bir row group
+        data = sink.drain()
+        if data:
+            yield data
+    writer.close()
+    yield sink.drain()
+
+
+def arrow_stream(chunks, table):
+    schema = _schema(table)
+    sink = _Sink()
+    writer = pa.ipc.new_stream(sink, schema)
+    yield sink.drain()
+    for rows in chunks:
+        writer.write_batch(_batch(schema, rows))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def open_export(fetch, table, fmt="csv", takim=None, start=None, end=None, chunk_rows=5000, stats=None):
+    """
+    Parametreleri hemen doğrula (yayın başladıktan sonra hata olmasın), sonra
+    (parça üreteci, uzantı, mimetype) döndür. Hatalı parametre → ValueError.
+    """
+    if table not in EXPORT_TABLES:
+        raise ValueError("table: " + " | ".join(EXPORT_TABLES))
+    if fmt not in FORMATS:
+        raise ValueError("format: " + " | ".join(FORMATS))
+    if fmt != "csv" and pa is None:
+        raise ValueError(f"{fmt} için pyarrow gerekli (pip install pyarrow)")
+    chunks = iter_chunks(fetch, table, takim, start, end, chunk_rows, stats)
+    writer = {"csv": csv_stream, "parquet": parquet_stream, "arrow": arrow_stream}[fmt]
+    ext, mimetype = FORMATS[fmt]
+    return writer(chunks, table), ext, mimetype
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--db", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "iha_logs.db"))
+    ap.add_argument("--table", default="telemetry", choices=list(EXPORT_TABLES) + ["all"])
+    ap.add_argument("--format", default="csv", choices=list(FORMATS))
+    ap.add_argument("--out", default="-", help="dosya ('-' → stdout); --table all ise klasör")
+    ap.add_argument("--takim", help="takım (telemetry: takim, locks/kamikaze: kaynak_takim)")
+    ap.add_argument("--start", help="ISO 8601 ya da epoch ms (UTC)")
+    ap.add_argument("--end", help="ISO 8601 ya da epoch ms (UTC), dahil")
+    ap.add_argument("--chunk", type=int, default=5000, help="parça başına satır")
+    args = ap.parse_args()
+
+    con = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+
+    def fetch(sql, params):
+        return con.execute(sql, params).fetchall()
+
+    tables = list(EXPORT_TABLES) if args.table == "all" else [args.table]
+    if args.table == "all" and args.out == "-":
+        ap.error("--table all için --out bir klasör olmalı")
+    for table in tables:
+        stats = {}
+        t0 = time.perf_counter()
+        try:
+            stream, ext, _ = open_export(fetch, table, args.format, args.takim, args.start, args.end,
+                                         args.chunk, stats)
+        except ValueError as e:
+            ap.error(str(e))
+        if args.table == "all":
+            os.makedirs(args.out, exist_ok=True)
+            path = os.path.join(args.out, f"{table}.{ext}")
+        else:
+            path = args.out
+        if path == "-":
+            out = sys.stdout.buffer
+        else:
+            out = open(path, "wb")
+        try:
+            for part in stream:
+                out.write(part.encode("utf-8") if isinstance(part, str) else part)
+        except sqlite3.OperationalError as e:
+            sys.exit(f"❌ {table}: {e} (eski şema ise sunucuyu bir kez başlatıp DB'yi güncelleyin)")
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
+        print(f"💾 {table}: {stats.get('rows', 0)} satır → {path} ({time.perf_counter() - t0:.2f} sn)",
+              file=sys.stderr)
+    con.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Düşük maliyetli sayaç / histogram / gösterge ve Prometheus metin biçimi.
+
+Ek bağımlılık yok (prometheus_client gerekmez). Gözlem sıcak yolda sadece bir
+``bisect`` + iki toplama; metin ``/metrics`` istendiğinde üretilir.
+
+    REGISTRY = Registry()
+    h = REGISTRY.histogram("iha_x_seconds", "açıklama", ("stage",))
+    t = StageTimer(h); ...; t.mark("auth"); ...; t.mark("validate")
+    REGISTRY.gauge("iha_queue_depth", "açıklama", fn=lambda: q.qsize())
+    REGISTRY.render()  → "text/plain; version=0.0.4"
+
+``fn`` ile tanımlanan metrikler okuma anında hesaplanır; fn bir sayı ya da
+{etiket_değerleri_tuple: sayı} döndürebilir.
+"""
+import bisect
+import time
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# saniye; istek aşamaları 10 µs – 1 sn aralığında
+DEFAULT_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def _esc(v):
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=""):
+    parts = ['%s="%s"' % (n, _esc(v)) for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(v):
+    if v == float("inf"):
+        return "+Inf"
+    if isinstance(v, float) and v.is_integer() and abs(v) < 1e15:
+        return str(int(v))
+    return repr(v) if isinstance(v, float) else str(v)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+
+    def _header(self):
+        return ["# HELP %s %s" % (self.name, self.help), "# TYPE %s %s" % (self.name, self.kind)]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self.values = {}
+
+    def inc(self, labels=(), n=1):
+        self.values[labels] = self.values.get(labels, 0) + n
+
+    def render(self):
+        out = self._header()
+        for lv, v in sorted(self.values.items(), key=lambda kv: tuple(map(str, kv[0]))):
+            out.append("%s%s %s" % (self.name, _labels(self.labelnames, lv), _num(v)))
+        return out
+
+
+class Gauge(_Metric):
+    """fn verilirse değer okuma anında fn()'den; değilse set() ile."""
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labelnames=(), fn=None, kind=None):
+        super().__init__(name, help_text, labelnames)
+        self.fn = fn
+        self.values = {}
+        if kind:
+            self.kind = kind  # fn ile dışarıdaki bir sayacı yayınlarken "counter"
+
+    def set(self, value, labels=()):
+        self.values[labels] = value
+
+    def render(self):
+        out = self._header()
+        values = self.values
+        if self.fn is not None:
+            v = self.fn()
+            values = v if isinstance(v, dict) else {(): v}
+        for lv, v in sorted(values.items(), key=lambda kv: tuple(map(str, kv[0]))):
+            out.append("%s%s %s" % (self.name, _labels(self.labelnames, lv), _num(v)))
+        return out
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # etiketler → [kova sayıları (+Inf dahil), toplam]
+
+    def observe(self, value, labels=()):
+        s = self._series.get(labels)
+        if s is None:
+            s = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        s[0][bisect.bisect_left(self.buckets, value)] += 1
+        s[1] += value
+
+    def render(self):
+        out = self._header()
+        for lv, (counts, total) in sorted(self._series.items(), key=lambda kv: tuple(map(str, kv[0]))):
+            acc = 0
+            for le, c in zip(self.buckets + (float("inf"),), counts):
+                acc += c
+                out.append("%s_bucket%s %d" % (self.name, _labels(self.labelnames, lv, 'le="%s"' % _num(le)), acc))
+            out.append("%s_sum%s %s" % (self.name, _labels(self.labelnames, lv), repr(total)))
+            out.append("%s_count%s %d" % (self.name, _labels(self.labelnames, lv), acc))
+        return out
+
+
+class StageTimer:
+    """Ardışık aşama süreleri: her mark(aşama) bir önceki işaretten bu yana geçen süreyi gözler."""
+    __slots__ = ("hist", "t0", "t")
+
+    def __init__(self, hist):
+        self.hist = hist
+        self.t0 = self.t = time.perf_counter()
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.hist.observe(now - self.t, (stage,))
+        self.t = now
+
+    def skip(self):
+        """Ölçülmeyecek aradaki süreyi at (sonraki aşamaya sayılmasın)."""
+        self.t = time.perf_counter()
+
+    def elapsed(self):
+        return time.perf_counter() - self.t0
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def _add(self, m):
+        if m.name in self._metrics:
+            raise ValueError("metrik zaten tanımlı: " + m.name)
+        self._metrics[m.name] = m
+        return m
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._add(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=(), fn=None, kind=None):
+        return self._add(Gauge(name, help_text, labelnames, fn, kind))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for m in self._metrics.values():
+            try:
+                lines.extend(m.render())
+            except Exception as e:  # bir metriğin hatası /metrics'i düşürmesin
+                lines.append("# %s okunamadı: %s" % (m.name, _esc(e)))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
@@ -0,0 +1,323 @@
+"""
+Ham paketlerin kompakt saklanması: sık okunan alanlar tipli kolon, kalanı sıkıştırılmış blob.
+
+Eskiden her telemetri satırı tipli kolonların yanında paketin tamamını bir kez
+daha JSON metni olarak (``raw_json``) tutuyordu; kilitlenmelerde ``extra_json``
+aynı şekilde. Şimdi:
+  - duruş açıları, otonom / kilitlenme bayrakları, hedef kutusu ve GPS saati
+    gerçek kolonlardır (sorgu / dışa aktarım JSON çözmez)
+  - paketin kolonda aynı JSON tipiyle (int → INTEGER, float → REAL) saklanan
+    alanları pakete tekrar yazılmaz; geriye kalanlar (beklenmeyen alanlar,
+    metin / bool değerler, tipi kolona uymayan sayılar) ``raw_z`` / ``extra_z``
+    blob'una gider. Normal bir pakette hiçbir şey kalmaz → NULL.
+  - blob: 1 bayt etiket + JSON; 0x01 = paylaşılan sözlüklü raw deflate
+    (küçük JSON'larda bile sıkışır), 0x00 = sıkıştırmasız (daha kısaysa)
+  - ``telemetry_packet`` / ``lock_packet`` paketi kolonlar + blob'dan aynen geri
+    kurar (anahtar sırası hariç)
+
+Eski DB'ler sunucu açılışında dönüştürülür (fake_server._migrate_schema, v3).
+Büyük dosyalar önceden komut satırından dönüştürülebilir (sonunda VACUUM ve
+kazanç raporu; sunucu kapalıyken çalıştırın):
+    python packet_store.py --db iha_logs.db
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+import zlib
+
+# (kolon, paket anahtarı, SQLite tipi); paketteki değer tam bu Python tipindeyse kolondan geri kurulur
+_PY_TYPE = {"INTEGER": int, "REAL": float}
+
+TELEMETRY_BASE = (  # mevcut kolonlar (değerler doğrulayıcıdan)
+    ("takim", "takim_numarasi", "INTEGER"), ("enlem", "iha_enlem", "REAL"), ("boylam", "iha_boylam", "REAL"),
+    ("irtifa", "iha_irtifa", "REAL"), ("hiz", "iha_hiz", "REAL"), ("batarya", "iha_batarya", "INTEGER"),
+)
+TELEMETRY_EXTRA = (  # v3 ile eklenen kolonlar (değerler paketten)
+    ("dikilme", "iha_dikilme", "REAL"), ("yonelme", "iha_yonelme", "REAL"), ("yatis", "iha_yatis", "REAL"),
+    ("otonom", "iha_otonom", "INTEGER"), ("kilitlenme", "iha_kilitlenme", "INTEGER"),
+    ("hedef_merkez_X", "hedef_merkez_X", "INTEGER"), ("hedef_merkez_Y", "hedef_merkez_Y", "INTEGER"),
+    ("hedef_genislik", "hedef_genislik", "INTEGER"), ("hedef_yukseklik", "hedef_yukseklik", "INTEGER"),
+)
+GPS_FIELD = "gps_saati"
+GPS_PARTS = ("saat", "dakika", "saniye", "milisaniye")
+GPS_COLUMNS = tuple(("gps_" + p, p, "INTEGER") for p in GPS_PARTS)
+
+LOCK_BASE = (("kaynak_takim", "kaynak_takim", "INTEGER"), ("kilitlenen_takim", "kilitlenen_takim", "INTEGER"),
+             ("otonom_kilitlenme", "otonom_kilitlenme", "INTEGER"))
+LOCK_EXTRA = TELEMETRY_EXTRA[5:]  # hedef kutusu
+LOCK_GPS_FIELD = "kilitlenmeBitisZamani"  # kilit_bitis_gps kolonunda JSON metni
+
+# INSERT sırası (telemetry_writer.INSERT_SQL ile aynı)
+TELEMETRY_NEW_COLUMNS = tuple(c for c, _, _ in TELEMETRY_EXTRA + GPS_COLUMNS) + ("raw_z",)
+LOCK_NEW_COLUMNS = tuple(c for c, _, _ in LOCK_EXTRA) + ("extra_z",)
+
+# paket geri kurmak için SELECT kolonları (sıra: telemetry_packet / lock_packet argümanı)
+TELEMETRY_PACKET_SQL = ", ".join([c for c, _, _ in TELEMETRY_BASE] + list(TELEMETRY_NEW_COLUMNS))
+LOCK_PACKET_SQL = ", ".join([c for c, _, _ in LOCK_BASE] + ["kilit_bitis_gps"] + list(LOCK_NEW_COLUMNS))
+
+_ABSENT = "__yok__"  # kolonu her zaman dolu olup pakette olmayan anahtarlar (eski kayıtlar)
+
+# raw deflate ön sözlüğü: sık geçen anahtarlar. DEĞİŞTİRMEYİN (eski blob'lar bununla çözülür);
+# gerekirse yeni etiketle ikinci sözlük ekleyin.
+_ZDICT_V1 = (
+    b'{"takim_numarasi":0,"iha_enlem":0,"iha_boylam":0,"iha_irtifa":0,"iha_hiz":0,"iha_batarya":0,'
+    b'"iha_dikilme":0,"iha_yonelme":0,"iha_yatis":0,"iha_otonom":0,"iha_kilitlenme":0,"hedef_merkez_X":0,'
+    b'"hedef_merkez_Y":0,"hedef_genislik":0,"hedef_yukseklik":0,"kaynak_takim":0,"kilitlenen_takim":0,'
+    b'"otonom_kilitlenme":0,"gps_saati":{"saat":0,"dakika":0,"saniye":0,"milisaniye":0},'
+    b'"kilitlenmeBitisZamani":{"saat":0,"dakika":0,"saniye":0,"milisaniye":0},"iha_hizi":0,"zaman_farki":0,'
+    b'"qrMetni":"","__yok__":[]}'
+)
+_TAG_JSON, _TAG_ZDICT_V1 = 0, 1
+
+
+# ---- blob ----
+def pack(rest):
+    """dict → blob (boşsa None)."""
+    if not rest:
+        return None
+    raw = json.dumps(rest, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    c = zlib.compressobj(9, zlib.DEFLATED, -15, 9, zlib.Z_DEFAULT_STRATEGY, _ZDICT_V1)
+    z = c.compress(raw) + c.flush()
+    if len(z) < len(raw):
+        return bytes((_TAG_ZDICT_V1,)) + z
+    return bytes((_TAG_JSON,)) + raw
+
+
+def unpack(blob):
+    """blob → dict (None → {})."""
+    if not blob:
+        return {}
+    tag, body = blob[0], bytes(blob[1:])
+    if tag == _TAG_ZDICT_V1:
+        d = zlib.decompressobj(-15, zdict=_ZDICT_V1)
+        body = d.decompress(body) + d.flush()
+    elif tag != _TAG_JSON:
+        raise ValueError("bilinmeyen blob etiketi: %r" % tag)
+    return json.loads(body.decode("utf-8"))
+
+
+# ---- ayırma / geri kurma ----
+def _exact(value, kind):
+    return type(value) is _PY_TYPE[kind]
+
+
+def _numeric(value):
+    """Kolona yazılacak değer: bool olmayan, SQLite'a sığan sayı (NaN değil); değilse NULL."""
+    t = type(value)
+    if t is float:
+        return value if value == value else None
+    if t is int:
+        return value if -(1 << 63) <= value < (1 << 63) else None
+    return None
+
+
+def _split_fields(packet, rest, base, base_values, extra, always=()):
+    cols = []
+    for (col, key, kind), stored in zip(base, base_values):
+        if key in packet:
+            if _exact(packet[key], kind) and packet[key] == stored:
+                del rest[key]
+        elif col in always:
+            rest.setdefault(_ABSENT, []).append(key)
+    for col, key, kind in extra:
+        value = _numeric(packet.get(key))
+        cols.append(value)
+        if value is not None and _exact(value, kind):
+            del rest[key]
+    return cols
+
+
+def _gps_split(gps, rest, field):
+    """GPS saati 4 tam sayı alanlıysa pakete yazılmaz; kolonlar yine de sayısal olanlarla dolar."""
+    if not isinstance(gps, dict):
+        return [None] * len(GPS_PARTS)
+    cols = [_numeric(gps.get(p)) for p in GPS_PARTS]
+    if set(gps) == set(GPS_PARTS) and all(type(gps[p]) is int for p in GPS_PARTS):
+        del rest[field]
+    return cols
+
+
+def split_telemetry(packet, base_values):
+    """
+    packet: gelen telemetri dict'i; base_values: TELEMETRY_BASE kolonlarına yazılan değerler.
+    → TELEMETRY_NEW_COLUMNS sırasıyla değerler (son eleman raw_z blob'u).
+    """
+    rest = dict(packet)
+    cols = _split_fields(packet, rest, TELEMETRY_BASE, base_values, TELEMETRY_EXTRA)
+    cols += _gps_split(packet.get(GPS_FIELD), rest, GPS_FIELD)
+    cols.append(pack(rest))
+    return tuple(cols)
+
+
+def _join_fields(packet, specs, values):
+    for (col, key, kind), value in zip(specs, values):
+        if value is not None and key not in packet:
+            packet[key] = value
+
+
+def telemetry_packet(row):
+    """row: TELEMETRY_PACKET_SQL sırasıyla değerler → gelen paketin aynısı."""
+    nb, ne, ng = len(TELEMETRY_BASE), len(TELEMETRY_EXTRA), len(GPS_COLUMNS)
+    packet = unpack(row[nb + ne + ng])
+    absent = packet.pop(_ABSENT, ())
+    _join_fields(packet, TELEMETRY_BASE, row[:nb])
+    _join_fields(packet, TELEMETRY_EXTRA, row[nb:nb + ne])
+    gps = row[nb + ne:nb + ne + ng]
+    if GPS_FIELD not in packet and all(v is not None for v in gps):
+        packet[GPS_FIELD] = dict(zip(GPS_PARTS, gps))
+    for key in absent:
+        packet.pop(key, None)
+    return packet
+
+
+def split_lock(payload, base_values, gps_json):
+    """
+    payload: gelen kilitlenme paketi; base_values: LOCK_BASE kolonlarına yazılan değerler,
+    gps_json: kilit_bitis_gps kolonuna yazılan metin. → LOCK_NEW_COLUMNS sırasıyla değerler.
+    """
+    rest = dict(payload)
+    cols = _split_fields(payload, rest, LOCK_BASE, base_values, LOCK_EXTRA, always=("otonom_kilitlenme",))
+    gps = payload.get(LOCK_GPS_FIELD)
+    if isinstance(gps, dict) and json.loads(gps_json) == gps:
+        del rest[LOCK_GPS_FIELD]
+    elif LOCK_GPS_FIELD not in payload:
+        rest.setdefault(_ABSENT, []).append(LOCK_GPS_FIELD)
+    cols.append(pack(rest))
+    return tuple(cols)
+
+
+def lock_packet(row):
+    """row: LOCK_PACKET_SQL sırasıyla değerler → gelen kilitlenme paketinin aynısı."""
+    nb, ne = len(LOCK_BASE), len(LOCK_EXTRA)
+    packet = unpack(row[nb + 1 + ne])
+    absent = packet.pop(_ABSENT, ())
+    _join_fields(packet, LOCK_BASE, row[:nb])
+    if LOCK_GPS_FIELD not in packet and row[nb]:
+        packet[LOCK_GPS_FIELD] = json.loads(row[nb])
+    _join_fields(packet, LOCK_EXTRA, row[nb + 1:nb + 1 + ne])
+    for key in absent:
+        packet.pop(key, None)
+    return packet
+
+
+# ---- şema / eski kayıtların dönüştürülmesi ----
+def _columns(cur, table):
+    return {r[1] for r in cur.execute(f"PRAGMA table_info({table})")}
+
+
+def add_columns(cur):
+    """v3 kolonlarını ekle (varsa dokunma)."""
+    for table, specs, blob in (("telemetry", TELEMETRY_EXTRA + GPS_COLUMNS, "raw_z"),
+                               ("locks", LOCK_EXTRA, "extra_z")):
+        have = _columns(cur, table)
+        for col, _, kind in specs:
+            if col not in have:
+                cur.execute(f"ALTER TABLE {table} ADD COLUMN {col} {kind}")
+        if blob not in have:
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN {blob} BLOB")
+
+
+def _load(text):
+    try:
+        d = json.loads(text)
+    except (TypeError, ValueError):
+        d = None
+    return d if isinstance(d, dict) else {"_ham": text}  # çözülemeyen kayıt kaybolmasın
+
+
+def _convert(cur, table, old_col, select, split, rebuild, new_cols, chunk, stats, progress):
+    if old_col not in _columns(cur, table):
+        return
+    sets = ", ".join(f"{c} = ?" for c in new_cols)
+    last = 0
+    while True:
+        rows = cur.execute(f"SELECT id, {select}, {old_col} FROM {table} WHERE id > ? AND {old_col} IS NOT NULL "
+                           f"ORDER BY id LIMIT ?", (last, chunk)).fetchall()
+        if not rows:
+            break
+        updates = []
+        for r in rows:
+            packet = _load(r[-1])
+            new = split(packet, r[1:-1])
+            if rebuild(r[1:-1], new) != packet:  # beklenmeyen durum: paketin tamamı blob'da kalsın
+                new = new[:-1] + (pack(packet),)
+                stats["fallback"] += 1
+            updates.append(new + (r[0],))
+        cur.executemany(f"UPDATE {table} SET {sets}, {old_col} = NULL WHERE id = ?", updates)
+        stats[table] += len(rows)
+        last = rows[-1][0]
+        if progress:
+            progress(table, stats[table])
+    try:
+        cur.execute(f"ALTER TABLE {table} DROP COLUMN {old_col}")
+    except sqlite3.OperationalError:  # SQLite < 3.35: kolon NULL olarak kalır
+        pass
+
+
+def convert_rows(cur, chunk=5000, progress=None):
+    """
+    raw_json / extra_json'lu eski satırları yeni kolonlara + blob'a taşı, eski kolonu kaldır.
+    Tekrar çalıştırmak zararsız. {"telemetry": n, "locks": n, "fallback": n} döner.
+    """
+    add_columns(cur)
+    stats = {"telemetry": 0, "locks": 0, "fallback": 0}
+    nb = len(TELEMETRY_BASE)
+    _convert(cur, "telemetry", "raw_json", ", ".join(c for c, _, _ in TELEMETRY_BASE),
+             lambda p, base: split_telemetry(p, base),
+             lambda base, new: telemetry_packet(tuple(base[:nb]) + new),
+             TELEMETRY_NEW_COLUMNS, chunk, stats, progress)
+    nl = len(LOCK_BASE)
+    _convert(cur, "locks", "extra_json", ", ".join(c for c, _, _ in LOCK_BASE) + ", kilit_bitis_gps",
+             lambda p, base: split_lock(p, base[:nl], base[nl] or "null"),
+             lambda base, new: lock_packet(tuple(base) + new),
+             LOCK_NEW_COLUMNS, chunk, stats, progress)
+    return stats
+
+
+def _db_bytes(con):
+    return con.execute("PRAGMA page_count").fetchone()[0] * con.execute("PRAGMA page_size").fetchone()[0]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--db", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "iha_logs.db"))
+    ap.add_argument("--chunk", type=int, default=5000, help="transaction başına satır")
+    ap.add_argument("--no-vacuum", action="store_true", help="dosyayı küçültme (boş sayfalar DB'de kalır)")
+    args = ap.parse_args()
+    if not os.path.exists(args.db):
+        sys.exit(f"❌ DB yok: {args.db}")
+
+    con = sqlite3.connect(args.db, isolation_level=None)
+    con.execute("PRAGMA journal_mode=WAL")
+    before = _db_bytes(con)
+    t0 = time.perf_counter()
+
+    def progress(table, n):
+        print(f"\r🔄 {table}: {n} satır", end="", file=sys.stderr, flush=True)
+
+    cur = con.cursor()
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        stats = convert_rows(cur, args.chunk, progress)
+        cur.execute("COMMIT")
+    except BaseException:
+        cur.execute("ROLLBACK")
+        raise
+    print(file=sys.stderr)
+    if not args.no_vacuum:
+        con.execute("VACUUM")
+    con.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    after = _db_bytes(con)
+    con.close()
+    saved = before - after
+    print(f"💾 {args.db}: telemetry {stats['telemetry']} / locks {stats['locks']} satır dönüştürüldü "
+          f"(blob'a aynen kalan: {stats['fallback']}), {time.perf_counter() - t0:.1f} sn")
+    print(f"📉 {before / 1048576:.1f} MB → {after / 1048576:.1f} MB "
+          f"({saved / 1048576:.1f} MB, %{100.0 * saved / before if before else 0:.0f} kazanç)")
+
+
+if __name__ == "__main__":
+    main()
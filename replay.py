@@ -0,0 +1,274 @@
+"""
+Kayıtlı görevi (iha_logs.db) panele yeniden oynatma.
+
+telemetry / locks / kamikaze tabloları ts_ms sırasıyla birleştirilip canlı
+yayınla aynı olaylar ve aynı biçimlerle gönderilir:
+    fleet_update   (tick başına değişen takımlar, konum kayıtları TeamState ile)
+    lock_event     {"kaynak_takim", "kilitlenen_takim", "otonom_kilitlenme", "kilit_bitis_gps", "sunucusaati"}
+    kamikaze_event {"kaynak_takim", "qrMetni", "kamikazeBaslangicZamani", "kamikazeBitisZamani", "sunucusaati"}
+Oynatma mesajlarında ek olarak ``"replay": true`` bulunur; ``sunucusaati`` kaydın zamanıdır.
+Panel bu mesajları canlı tablolara / markerlara değil, ayrı oynatma katmanına
+ve oynatma olayları tablosuna yazar.
+
+Oturum istemci (sid) başınadır ve sadece o istemciye yayın yapar. Hız 1x–50x,
+duraklatma ve ileri/geri atlama (seek) desteklenir. Her tablo için ayrı bir
+ön-okuma (read-ahead) tamponu vardır: tampon ``low_water`` altına inince
+sonraki parça arka planda (hub dışında) okunur; oturum tüm görevi belleğe
+almaz.
+"""
+import collections
+import json
+import logging
+import time
+
+from packet_store import TELEMETRY_PACKET_SQL, telemetry_packet
+from team_state import TeamState
+from utc_time import utc_dict_from_ms
+
+log = logging.getLogger("iha.replay")
+
+SPEED_MIN, SPEED_MAX = 1.0, 50.0
+
+# tablo → (SELECT kolonları (id, ts_ms ilk ikisi), takım kolonu)
+REPLAY_TABLES = {
+    "telemetry": ("id, ts_ms, takim, " + TELEMETRY_PACKET_SQL, "takim"),
+    "locks": ("id, ts_ms, otonom_kilitlenme, kilit_bitis_gps, kaynak_takim, kilitlenen_takim", "kaynak_takim"),
+    "kamikaze": ("id, ts_ms, kaynak_takim, qr_metni, baslangic_gps, bitis_gps", "kaynak_takim"),
+}
+
+
+def _json(s):
+    try:
+        return json.loads(s) if s else None
+    except (TypeError, ValueError):
+        return None
+
+
+class _Source:
+    """Bir tablonun (ts_ms, id) sıralı okuyucusu + ön-okuma tamponu."""
+
+    def __init__(self, session, table):
+        self.s = session
+        self.table = table
+        self.buf = collections.deque()
+        self.pos = None  # son okunan (ts_ms, id)
+        self.done = False
+        self.filling = False
+        self.gen = 0  # seek sonrası eski ön-okuma sonuçlarını atmak için
+
+    def reset(self, gen):
+        self.buf.clear()
+        self.pos = None
+        self.done = False
+        self.gen = gen
+
+    def _query(self, pos):
+        cols, team_col = REPLAY_TABLES[self.table]
+        sql = f"SELECT {cols} FROM {self.table} WHERE ts_ms >= ? AND ts_ms <= ?"
+        args = [self.s.cursor_ms, self.s.end_ms]
+        if self.s.takim is not None:
+            sql += f" AND {team_col} = ?"
+            args.append(self.s.takim)
+        if pos is not None:
+            sql += " AND (ts_ms, id) > (?, ?)"
+            args += list(pos)
+        sql += " ORDER BY ts_ms, id LIMIT ?"
+        args.append(self.s.chunk_rows)
+        return self.s.fetch(sql, args)
+
+    def fill(self):
+        """Bir parça oku (fetch hub dışında çalışır); seek olduysa sonucu at."""
+        if self.filling or self.done:
+            return
+        self.filling = True
+        gen = self.gen
+        try:
+            rows = self._query(self.pos)
+        finally:
+            self.filling = False
+        if gen != self.gen:
+            return
+        if rows:
+            self.buf.extend(rows)
+            self.pos = (rows[-1][1], rows[-1][0])
+        if len(rows) < self.s.chunk_rows:
+            self.done = True
+
+    def head(self):
+        """Sıradaki satır; tampon boşsa ve devamı varsa eşzamanlı okur. Bitti → None."""
+        if not self.buf and not self.done:
+            while self.filling:  # süren ön-okumayı bekle
+                self.s.socketio.sleep(0.01)
+            if not self.buf:
+                self.fill()
+        if len(self.buf) < self.s.low_water and not self.done and not self.filling:
+            self.s.socketio.start_background_task(self.fill)
+        return self.buf[0] if self.buf else None
+
+
+class ReplaySession:
+    def __init__(self, socketio, sid, fetch, start_ms, end_ms, speed=1.0, takim=None,
+                 tick_hz=5.0, chunk_rows=2000, low_water=500):
+        """fetch(sql, args) → satır listesi (hub dışında, ör. Database.query_offhub)."""
+        self.socketio = socketio
+        self.sid = sid
+        self.fetch = fetch
+        self.start_ms = int(start_ms)
+        self.end_ms = int(end_ms)
+        self.takim = int(takim) if takim not in (None, "") else None
+        self.period = 1.0 / float(tick_hz)
+        self.chunk_rows = int(chunk_rows)
+        self.low_water = int(low_water)
+
+        self.speed = self._clamp(speed)
+        self.cursor_ms = self.start_ms  # oynatma saatinin (kayıt zamanı) şimdiki değeri
+        self._anchor_wall = time.monotonic()
+        self._anchor_ms = self.start_ms
+        self.paused = False
+        self.stopped = False
+        self.seq = 0
+        self.sent = 0
+        self._gen = 0
+        self.sources = [_Source(self, t) for t in REPLAY_TABLES]
+
+    @staticmethod
+    def _clamp(speed):
+        return max(SPEED_MIN, min(SPEED_MAX, float(speed)))
+
+    # ---- kontrol ----
+    def _reanchor(self, t_ms):
+        self._anchor_ms = t_ms
+        self._anchor_wall = time.monotonic()
+        self.cursor_ms = t_ms
+
+    def clock(self):
+        if self.paused:
+            return self.cursor_ms
+        return self._anchor_ms + (time.monotonic() - self._anchor_wall) * self.speed * 1000.0
+
+    def set_speed(self, speed):
+        self._reanchor(self.clock())
+        self.speed = self._clamp(speed)
+
+    def pause(self):
+        self._reanchor(self.clock())
+        self.paused = True
+
+    def resume(self):
+        self._reanchor(self.cursor_ms)
+        self.paused = False
+
+    def seek(self, t_ms):
+        t_ms = max(self.start_ms, min(self.end_ms, int(t_ms)))
+        self._gen += 1
+        self._reanchor(t_ms)
+        for src in self.sources:
+            src.reset(self._gen)
+
+    def stop(self):
+        self.stopped = True
+
+    def status(self, state=None):
+        return {"state": state or ("paused" if self.paused else "playing"), "t_ms": int(self.clock()),
+                "start_ms": self.start_ms, "end_ms": self.end_ms, "speed": self.speed, "sent": self.sent}
+
+    # ---- yayın ----
+    def _emit(self, event, payload):
+        self.socketio.emit(event, payload, to=self.sid)
+        self.sent += 1
+
+    def _emit_fleet(self, teams, t_ms):
+        self.seq += 1
+        self._emit("fleet_update", {"seq": self.seq, "full": False, "replay": True,
+                                    "sunucusaati": utc_dict_from_ms(t_ms), "teams": list(teams.values())})
+
+    def _emit_row(self, table, row, teams):
+        if table == "telemetry":
+            teams[row[2]] = TeamState(row[2], telemetry_packet(row[3:]), row[1] / 1000.0).konum
+        elif table == "locks":
+            self._emit("lock_event", {"kaynak_takim": row[4], "kilitlenen_takim": row[5],
+                                      "otonom_kilitlenme": row[2], "kilit_bitis_gps": _json(row[3]) or {},
+                                      "sunucusaati": utc_dict_from_ms(row[1]), "replay": True})
+        else:
+            self._emit("kamikaze_event", {"kaynak_takim": row[2], "qrMetni": row[3],
+                                          "kamikazeBaslangicZamani": _json(row[4]),
+                                          "kamikazeBitisZamani": _json(row[5]),
+                                          "sunucusaati": utc_dict_from_ms(row[1]), "replay": True})
+
+    def _next(self):
+        best = None
+        for src in self.sources:
+            row = src.head()
+            if row is not None and (best is None or (row[1], row[0]) < (best[1][1], best[1][0])):
+                best = (src, row)
+        return best
+
+    def run(self):
+        self._emit("replay_status", self.status())
+        teams = {}
+        next_status = time.monotonic() + 1.0
+        while not self.stopped:
+            if self.paused:
+                self.socketio.sleep(0.1)
+                continue
+            gen = self._gen
+            now_ms = self.clock()
+            nxt = self._next()
+            while nxt is not None and nxt[1][1] <= now_ms and gen == self._gen:
+                src, row = nxt
+                src.buf.popleft()
+                self._emit_row(src.table, row, teams)
+                nxt = self._next()
+            if gen != self._gen:  # emit sırasında seek geldi
+                teams = {}
+                continue
+            self.cursor_ms = min(int(now_ms), self.end_ms)
+            if teams:
+                self._emit_fleet(teams, self.cursor_ms)
+                teams = {}
+            if time.monotonic() >= next_status:
+                self._emit("replay_status", self.status())
+                next_status = time.monotonic() + 1.0
+            if nxt is None:
+                break
+            self.socketio.sleep(self.period)  # canlı yayın gibi tick başına en fazla bir fleet_update
+        self._emit("replay_status", self.status("stopped" if self.stopped else "finished"))
+
+
+class ReplayManager:
+    """sid → ReplaySession; istemci başına tek oturum."""
+
+    def __init__(self, socketio, fetch, tick_hz=5.0, chunk_rows=2000, low_water=500):
+        self.socketio = socketio
+        self.fetch = fetch
+        self.tick_hz = tick_hz
+        self.chunk_rows = chunk_rows
+        self.low_water = low_water
+        self.sessions = {}
+
+    def start(self, sid, start_ms, end_ms, speed=1.0, takim=None):
+        self.stop(sid)
+        s = ReplaySession(self.socketio, sid, self.fetch, start_ms, end_ms, speed, takim,
+                          tick_hz=self.tick_hz, chunk_rows=self.chunk_rows, low_water=self.low_water)
+        self.sessions[sid] = s
+
+        def _run():
+            try:
+                s.run()
+            except Exception as e:
+                log.error("❌ replay hata: %s", e)
+                self.socketio.emit("replay_status", dict(s.status("error"), error=str(e)), to=sid)
+            finally:
+                if self.sessions.get(sid) is s:
+                    self.sessions.pop(sid, None)
+
+        self.socketio.start_background_task(_run)
+        return s
+
+    def get(self, sid):
+        return self.sessions.get(sid)
+
+    def stop(self, sid):
+        s = self.sessions.pop(sid, None)
+        if s is not None:
+            s.stop()
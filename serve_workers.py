@@ -0,0 +1,108 @@
+"""
+Sunucuyu tek port arkasında N süreçle çalıştır (SO_REUSEPORT; çekirdek bağlantıları dağıtır).
+
+Tek eventlet süreci bir CPU çekirdeğiyle sınırlı; telemetri doğrulama, JSON
+ve Socket.IO serileştirme yükü arttığında worker sayısı çekirdek sayısına
+kadar artırılabilir. Worker'lar arasında paylaşılanlar:
+  - canlı durum (token'lar, 2 Hz limiti, HSS bayrakları, filo görüntüsü,
+    HSS / fence tablo nesilleri, bölge giriş/çıkış debounce durumu, toplu
+    alımın yeniden gönderim anahtarları): ``--state`` (state_backend.py)
+  - Socket.IO yayınları (fleet_update, lock_event, ...): ``--message-queue``
+    (sio_queue.py; redis://.. / amqp://.. ya da yerel sqlite:<dosya>)
+  - kalıcı kayıtlar: iha_logs.db (WAL, her worker kendi yazıcı thread'iyle)
+
+Panel bu modda yalnız websocket taşımasıyla bağlanır (long-polling istekleri
+farklı worker'lara düşerdi). Son N dakikalık iz (/api/son_telemetri) bu modda
+worker'ın bellek halkasından değil DB'den okunur.
+
+    python serve_workers.py --workers 4
+    python serve_workers.py --workers 4 --message-queue redis://localhost:6379/0
+"""
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _remove_db(path):
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    ap.add_argument("--port", type=int, default=10001)
+    ap.add_argument("--run-dir", default=os.path.join(HERE, "run"), help="geçici state / kuyruk dosyaları")
+    ap.add_argument("--state", help="varsayılan: sqlite:<run-dir>/iha_state.db")
+    ap.add_argument("--message-queue", help="varsayılan: sqlite:<run-dir>/iha_sio.db")
+    args = ap.parse_args()
+
+    if not hasattr(socket, "SO_REUSEPORT"):
+        sys.exit("❌ SO_REUSEPORT yok (Linux / BSD gerekli); tek süreç: python fake_server.py")
+    if args.workers < 1:
+        ap.error("--workers en az 1")
+
+    os.makedirs(args.run_dir, exist_ok=True)
+    state = args.state
+    if not state:
+        path = os.path.join(args.run_dir, "iha_state.db")
+        _remove_db(path)  # önceki çalıştırmanın token / bayrakları taşınmasın
+        state = "sqlite:" + path
+    mq = args.message_queue
+    if not mq:
+        path = os.path.join(args.run_dir, "iha_sio.db")
+        _remove_db(path)
+        mq = "sqlite:" + path
+
+    env = dict(os.environ, IHA_STATE=state, IHA_SIO_MQ=mq, IHA_SIO_TRANSPORTS="websocket",
+               IHA_PORT=str(args.port))
+    # şema / migrasyon tek seferde (worker'lar aynı anda migrasyon yapmasın)
+    subprocess.run([sys.executable, "-c", "import fake_server; fake_server.init_db()"],
+                   cwd=HERE, env=env, check=True)
+
+    def spawn(i):
+        return subprocess.Popen([sys.executable, os.path.join(HERE, "fake_server.py")], cwd=HERE,
+                                env=dict(env, IHA_WORKER_ID=str(i)))
+
+    procs = {i: spawn(i) for i in range(args.workers)}
+    print(f"🚀 {args.workers} worker → 0.0.0.0:{args.port} (state={state}, mq={mq})", flush=True)
+
+    stopping = []
+
+    def _stop(*_):
+        stopping.append(True)
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    while not stopping:
+        time.sleep(0.5)
+        for i, p in list(procs.items()):
+            if p.poll() is not None and not stopping:
+                print(f"⚠️ worker {i} çıktı (kod {p.returncode}), yeniden başlatılıyor", flush=True)
+                procs[i] = spawn(i)
+
+    # worker'lar SIGTERM ile kuyruklarını boşaltıp kapanır
+    for p in procs.values():
+        if p.poll() is None:
+            p.send_signal(signal.SIGTERM)
+    deadline = time.monotonic() + 10
+    for p in procs.values():
+        try:
+            p.wait(timeout=max(0.1, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            p.kill()
+    print("👋 worker'lar durdu", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Socket.IO mesaj kuyruğu: N worker'ın emit'leri tüm panellere ulaşsın.
+
+python-socketio'nun ``PubSubManager``'ı emit / oda / disconnect mesajlarını
+bir pub/sub kanalı üzerinden diğer sunuculara iletir. Üretimde bunun için
+Redis / RabbitMQ kullanılır (``message_queue="redis://..."``, Flask-SocketIO
+yerleşik). Aynı makinede ek servis olmadan çalışmak için buradaki
+``SqlitePubSubManager`` yerel bir karşılıktır: yayınlanan mesajlar ortak bir
+SQLite dosyasına eklenir, her worker ``poll_sec`` aralıkla yenilerini okur
+(gecikme ≈ poll_sec). Eski satırlar ``keep_sec`` sonra silinir.
+
+make_client_manager("sqlite:/yol/iha_sio.db") → SocketIO(app, client_manager=...)
+make_client_manager("redis://...")            → None (Flask-SocketIO message_queue ile)
+"""
+import sqlite3
+import time
+
+import socketio
+
+
+class SqlitePubSubManager(socketio.PubSubManager):
+    name = "sqlite"
+
+    def __init__(self, path, channel="flask-socketio", write_only=False, logger=None, json=None,
+                 poll_sec=0.02, keep_sec=30.0):
+        super().__init__(channel=channel, write_only=write_only, logger=logger, json=json)
+        self.path = path
+        self.poll_sec = float(poll_sec)
+        self.keep_sec = float(keep_sec)
+        self._pub = self._connect()
+        self._published = 0
+
+    def _connect(self):
+        con = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=OFF")
+        con.execute("CREATE TABLE IF NOT EXISTS sio_queue (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                    "channel TEXT NOT NULL, ts REAL NOT NULL, msg TEXT NOT NULL)")
+        return con
+
+    def _publish(self, data):
+        self._pub.execute("INSERT INTO sio_queue(channel, ts, msg) VALUES (?, ?, ?)",
+                          (self.channel, time.time(), self.json.dumps(data)))
+        self._published += 1
+        if self._published % 500 == 0:
+            self._pub.execute("DELETE FROM sio_queue WHERE ts < ?", (time.time() - self.keep_sec,))
+
+    def _listen(self):
+        con = self._connect()
+        last = con.execute("SELECT COALESCE(MAX(id), 0) FROM sio_queue").fetchone()[0]
+        while True:
+            rows = con.execute("SELECT id, msg FROM sio_queue WHERE id > ? AND channel = ? ORDER BY id",
+                               (last, self.channel)).fetchall()
+            for rid, msg in rows:
+                last = rid
+                yield msg
+            self.server.sleep(self.poll_sec)
+
+
+def make_client_manager(url, channel="flask-socketio"):
+    """sqlite:<dosya> → SqlitePubSubManager; diğer URL'ler Flask-SocketIO'ya bırakılır (None)."""
+    if url and url.startswith("sqlite:"):
+        return SqlitePubSubManager(url[len("sqlite:"):], channel=channel)
+    return None
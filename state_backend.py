@@ -0,0 +1,287 @@
+"""
+Canlı durumun saklandığı yer: tek süreç (bellek) ya da aynı makinedeki N süreç (SQLite).
+
+Paylaşılan durum:
+  - oturum token'ları (token → takım)
+  - takım başına token bucket (2 Hz + burst): dolum + harcama tek atomik adım
+  - HSS bayrakları (hss_send_enabled, hss_system_active)
+  - filo anlık görüntüsü: takım → (ts, konum_json); her worker kendi aldığı
+    paketleri yayınlar, düşman listesi / fleet_update tam görüntüsü buradan birleşir
+  - nesil sayaçları (hss / fences): bir worker tabloyu değiştirince diğerleri yeniden yükler
+  - bölge (geofence / HSS) durum makinesi kayıtları: takımın paketleri farklı
+    worker'lara düşse de giriş/çıkış olayı bir kez ve debounce'lu üretilir
+  - toplu alımın yakın zamanda kuyruğa atılmış (takım, ts_ms) anahtarları
+
+``MemoryState`` eski davranıştır (modül içi dict'ler, maliyet yok).
+``SqliteState`` aynı dosyayı açan tüm süreçlerde ortaktır; dosya geçicidir
+(kalıcı kayıtlar iha_logs.db'de). Sıcak yoldaki okumalar kısa süreli yerel
+önbellekten verilir: token'lar (geri alınmaz) kalıcı, bayraklar ``flag_ttl``,
+filo görüntüsü ``fleet_ttl`` saniye. Bölge kayıtları ve toplu anahtarlar
+önbelleklenmez; oku-değiştir-yaz adımları ``BEGIN IMMEDIATE`` ile tek transaction'dır.
+
+open_state("memory") | open_state("sqlite:/yol/iha_state.db")
+"""
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+
+class MemoryState:
+    shared = False
+
+    def __init__(self):
+        self._tokens = {}
+        self._buckets = {}  # takım → (token, son dolum anı)
+        self._flags = {}
+        self._gens = {}
+        self._zones = {}  # (takım, bölge) → kayıt
+        self._batch_keys = {}  # (takım, ts_ms) → ayrıldığı an; ekleme sırası = zaman sırası
+
+    # ---- token ----
+    def issue_token(self, token, takim):
+        self._tokens[token] = takim
+
+    def token_team(self, token):
+        return self._tokens.get(token)
+
+    # ---- hız sınırı ----
+    def take_token(self, takim, now, rate, burst):
+        """Token bucket: saniyede ``rate`` dolar, en fazla ``burst``; 1 token varsa harca ve True."""
+        b = self._buckets.get(takim)
+        tokens = burst if b is None else min(burst, b[0] + (now - b[1]) * rate)
+        if tokens < 1:
+            return False  # dolum son harcamadan hesaplanmaya devam eder
+        self._buckets[takim] = (tokens - 1, now)
+        return True
+
+    # ---- bayraklar / nesiller ----
+    def set_flag(self, name, value):
+        self._flags[name] = value
+
+    def get_flag(self, name, default=None):
+        return self._flags.get(name, default)
+
+    def bump(self, name):
+        self._gens[name] = self._gens.get(name, 0) + 1
+
+    def generation(self, name):
+        return self._gens.get(name, 0)
+
+    # ---- filo (tek süreçte yerel durum zaten tam) ----
+    def publish_team(self, takim, ts, konum_json):
+        pass
+
+    def fleet(self):
+        return {}
+
+    # ---- bölge durumları (zone_state.ZoneStateMachine; kayıt: (inside, since, candidate, count)) ----
+    def zone_get(self, takim, zone):
+        return self._zones.get((takim, zone))
+
+    def zone_update(self, takim, zone, step):
+        """step(kayıt | None) → (yeni kayıt, sonuç); oku-değiştir-yaz tek adım, sonuç döner."""
+        rec, result = step(self._zones.get((takim, zone)))
+        self._zones[(takim, zone)] = rec
+        return result
+
+    def zone_forget(self, takim):
+        for key in [k for k in self._zones if k[0] == takim]:
+            del self._zones[key]
+
+    def zone_records(self):
+        """(takım, bölge) → kayıt"""
+        return dict(self._zones)
+
+    # ---- toplu alım anahtarları ----
+    def reserve_batch_keys(self, keys, now, ttl, max_keys):
+        """
+        keys: (takım, ts_ms) listesi → her biri için True (son ``ttl`` sn'de ayrılmamıştı, şimdi
+        ayrıldı) / False. Aynı listede tekrar eden anahtarın ikincisi False olur.
+        """
+        recent = self._batch_keys
+        while recent:
+            first = next(iter(recent))
+            if now - recent[first] < ttl and len(recent) < max_keys:
+                break
+            del recent[first]
+        out = []
+        for key in keys:
+            fresh = key not in recent
+            if fresh:
+                recent[key] = now
+            out.append(fresh)
+        return out
+
+    def release_batch_keys(self, keys):
+        for key in keys:
+            self._batch_keys.pop(key, None)
+
+    def close(self):
+        pass
+
+
+class SqliteState:
+    shared = True
+
+    _SCHEMA = """
+    CREATE TABLE IF NOT EXISTS tokens (token TEXT PRIMARY KEY, takim INTEGER);
+    CREATE TABLE IF NOT EXISTS bucket (takim INTEGER PRIMARY KEY, tokens REAL NOT NULL, last REAL NOT NULL);
+    CREATE TABLE IF NOT EXISTS kv (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+    CREATE TABLE IF NOT EXISTS fleet (takim INTEGER PRIMARY KEY, ts REAL NOT NULL, konum TEXT NOT NULL);
+    CREATE TABLE IF NOT EXISTS zone (takim INTEGER NOT NULL, zone TEXT NOT NULL, inside INTEGER NOT NULL,
+                                     since REAL NOT NULL, candidate INTEGER, count INTEGER NOT NULL,
+                                     PRIMARY KEY (takim, zone));
+    CREATE TABLE IF NOT EXISTS batch_keys (takim INTEGER NOT NULL, ts_ms INTEGER NOT NULL, at REAL NOT NULL,
+                                           PRIMARY KEY (takim, ts_ms));
+    CREATE INDEX IF NOT EXISTS batch_keys_at ON batch_keys(at);
+    """
+
+    def __init__(self, path, flag_ttl=0.25, fleet_ttl=0.1):
+        self.path = path
+        self.flag_ttl = float(flag_ttl)
+        self.fleet_ttl = float(fleet_ttl)
+        self._con = sqlite3.connect(path, timeout=1.0, isolation_level=None, check_same_thread=False)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("PRAGMA synchronous=OFF")  # geçici durum; kalıcılık gerekmez
+        self._con.executescript(self._SCHEMA)
+        self._lock = threading.Lock()
+        self._tokens = {}
+        self._flags = {}  # ad → (okunduğu an, değer)
+        self._fleet = (0.0, {})
+
+    def _q(self, sql, args=()):
+        with self._lock:
+            return self._con.execute(sql, args).fetchall()
+
+    def _x(self, sql, args=()):
+        with self._lock:
+            return self._con.execute(sql, args).rowcount
+
+    @contextmanager
+    def _txn(self):
+        """Yazma kilidi baştan alınan transaction: arada başka süreç aynı kaydı değiştiremez."""
+        with self._lock:
+            self._con.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._con
+            except BaseException:
+                self._con.execute("ROLLBACK")
+                raise
+            self._con.execute("COMMIT")
+
+    # ---- token ----
+    def issue_token(self, token, takim):
+        self._x("INSERT OR REPLACE INTO tokens(token, takim) VALUES (?, ?)", (token, takim))
+        self._tokens[token] = takim
+
+    def token_team(self, token):
+        takim = self._tokens.get(token)
+        if takim is None:
+            row = self._q("SELECT takim FROM tokens WHERE token = ?", (token,))
+            if row:
+                takim = self._tokens[token] = row[0][0]
+        return takim
+
+    # ---- hız sınırı (tek UPDATE / INSERT: iki worker aynı token'ı harcayamaz) ----
+    def take_token(self, takim, now, rate, burst):
+        args = {"takim": takim, "now": now, "rate": float(rate), "burst": float(burst)}
+        if self._x("UPDATE bucket SET tokens = MIN(:burst, tokens + (:now - last) * :rate) - 1, last = :now "
+                   "WHERE takim = :takim AND MIN(:burst, tokens + (:now - last) * :rate) >= 1", args):
+            return True
+        return self._x("INSERT OR IGNORE INTO bucket(takim, tokens, last) VALUES (:takim, :burst - 1, :now)",
+                       args) == 1
+
+    # ---- bayraklar / nesiller ----
+    def set_flag(self, name, value):
+        self._x("INSERT OR REPLACE INTO kv(name, value) VALUES (?, ?)", ("flag:" + name, json.dumps(value)))
+        self._flags[name] = (time.monotonic(), value)
+
+    def get_flag(self, name, default=None):
+        now = time.monotonic()
+        hit = self._flags.get(name)
+        if hit is not None and now - hit[0] < self.flag_ttl:
+            return hit[1]
+        row = self._q("SELECT value FROM kv WHERE name = ?", ("flag:" + name,))
+        value = json.loads(row[0][0]) if row else default
+        self._flags[name] = (now, value)
+        return value
+
+    def bump(self, name):
+        self._x("INSERT INTO kv(name, value) VALUES (?, '1') "
+                "ON CONFLICT(name) DO UPDATE SET value = CAST(value AS INTEGER) + 1", ("gen:" + name,))
+
+    def generation(self, name):
+        row = self._q("SELECT value FROM kv WHERE name = ?", ("gen:" + name,))
+        return int(row[0][0]) if row else 0
+
+    # ---- filo ----
+    def publish_team(self, takim, ts, konum_json):
+        self._x("INSERT OR REPLACE INTO fleet(takim, ts, konum) VALUES (?, ?, ?)", (takim, ts, konum_json))
+
+    def fleet(self):
+        """takım → (ts, konum_json); en fazla fleet_ttl saniye eski."""
+        now = time.monotonic()
+        if now - self._fleet[0] >= self.fleet_ttl:
+            rows = self._q("SELECT takim, ts, konum FROM fleet")
+            self._fleet = (now, {r[0]: (r[1], r[2]) for r in rows})
+        return self._fleet[1]
+
+    # ---- bölge durumları ----
+    @staticmethod
+    def _zone_rec(row):
+        if row is None:
+            return None
+        inside, since, candidate, count = row
+        return bool(inside), since, None if candidate is None else bool(candidate), count
+
+    def zone_get(self, takim, zone):
+        row = self._q("SELECT inside, since, candidate, count FROM zone WHERE takim = ? AND zone = ?",
+                      (takim, zone))
+        return self._zone_rec(row[0] if row else None)
+
+    def zone_update(self, takim, zone, step):
+        with self._txn() as con:
+            row = con.execute("SELECT inside, since, candidate, count FROM zone WHERE takim = ? AND zone = ?",
+                              (takim, zone)).fetchone()
+            rec, result = step(self._zone_rec(row))
+            con.execute("INSERT OR REPLACE INTO zone(takim, zone, inside, since, candidate, count) "
+                        "VALUES (?, ?, ?, ?, ?, ?)", (takim, zone) + tuple(rec))
+        return result
+
+    def zone_forget(self, takim):
+        self._x("DELETE FROM zone WHERE takim = ?", (takim,))
+
+    def zone_records(self):
+        rows = self._q("SELECT takim, zone, inside, since, candidate, count FROM zone")
+        return {(r[0], r[1]): self._zone_rec(r[2:]) for r in rows}
+
+    # ---- toplu alım anahtarları ----
+    def reserve_batch_keys(self, keys, now, ttl, max_keys):
+        out = []
+        with self._txn() as con:
+            con.execute("DELETE FROM batch_keys WHERE at < ?", (now - ttl,))
+            con.execute("DELETE FROM batch_keys WHERE rowid <= (SELECT MAX(rowid) FROM batch_keys) - ?",
+                        (max_keys,))
+            for takim, ts_ms in keys:
+                out.append(con.execute("INSERT OR IGNORE INTO batch_keys(takim, ts_ms, at) VALUES (?, ?, ?)",
+                                       (takim, ts_ms, now)).rowcount == 1)
+        return out
+
+    def release_batch_keys(self, keys):
+        with self._txn() as con:
+            con.executemany("DELETE FROM batch_keys WHERE takim = ? AND ts_ms = ?", list(keys))
+
+    def close(self):
+        with self._lock:
+            self._con.close()
+
+
+def open_state(spec):
+    """'memory' (varsayılan) | 'sqlite:<dosya>'"""
+    if not spec or spec == "memory":
+        return MemoryState()
+    if spec.startswith("sqlite:"):
+        return SqliteState(spec[len("sqlite:"):])
+    raise ValueError("state backend: memory | sqlite:<dosya>")
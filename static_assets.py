@@ -0,0 +1,144 @@
+"""
+Panel kabuğu (ui.html) ve static/ dosyalarının bellekten, önceden sıkıştırılmış sunumu.
+
+Açılışta her dosya bir kez okunur, gzip (ve kuruluysa brotli) ile sıkıştırılır;
+istekte diske gidilmez, sıkıştırma yapılmaz. Sürüm, istemcinin
+Accept-Encoding başlığına göre seçilir (br > gzip > sıkıştırmasız).
+
+Her dosyanın içerik özetinden bir URL'si de vardır:
+``/static/leaflet/leaflet.js`` → ``/static/leaflet/leaflet.<özet>.js``. ui.html
+bu adreslerle yeniden yazılır. Özetli adres içerik değişince değiştiği için
+``immutable`` + 1 yıl önbelleklenir. Özetsiz adres ve panel sayfası her
+seferinde ETag ile doğrulanır (çoğu 304).
+
+Brotli opsiyoneldir (``pip install brotli``); yoksa yalnız gzip üretilir.
+
+    assets = AssetStore("static")
+    ui = assets.page("ui.html", html_text)
+    return assets.serve(app.response_class, request, ui)
+"""
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+
+try:
+    import brotli
+except ImportError:  # opsiyonel
+    brotli = None
+
+log = logging.getLogger("iha.static")
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+_COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml")
+_MIN_COMPRESS = 512  # bundan küçük dosyalar olduğu gibi
+
+
+def _compress(data):
+    """encoding → gövde; sıkıştırma kazandırmıyorsa o kodlama yok."""
+    out = {}
+    gz = gzip.compress(data, compresslevel=9, mtime=0)  # mtime=0: aynı girdi → aynı bayt (worker'lar arası ETag)
+    if len(gz) < len(data):
+        out["gzip"] = gz
+    if brotli is not None:
+        br = brotli.compress(data, quality=11)
+        if len(br) < len(data):
+            out["br"] = br
+    return out
+
+
+class Asset:
+    __slots__ = ("name", "mimetype", "digest", "variants")
+
+    def __init__(self, name, data, mimetype=None):
+        self.name = name
+        self.mimetype = mimetype or mimetypes.guess_type(name)[0] or "application/octet-stream"
+        self.digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        # encoding → (gövde, güçlü ETag); kodlamalar farklı bayt olduğundan ETag'leri de farklı
+        self.variants = {None: (data, '"%s"' % self.digest)}
+        if len(data) >= _MIN_COMPRESS and self.mimetype.startswith(_COMPRESSIBLE):
+            for enc, body in _compress(data).items():
+                self.variants[enc] = (body, '"%s-%s"' % (self.digest, enc))
+
+    def hashed_name(self, length=10):
+        root, ext = os.path.splitext(self.name)
+        return "%s.%s%s" % (root, self.digest[:length], ext)
+
+
+class AssetStore:
+    def __init__(self, root, prefix="/static/"):
+        self.root = root
+        self.prefix = prefix
+        self._by_name = {}  # "leaflet/leaflet.js" → Asset
+        self._by_hashed = {}  # "leaflet/leaflet.<özet>.js" → Asset
+        self._loaded = False
+
+    def load(self):
+        by_name, by_hashed = {}, {}
+        raw = packed = 0
+        for dirpath, _, files in os.walk(self.root):
+            for fname in sorted(files):
+                full = os.path.join(dirpath, fname)
+                name = os.path.relpath(full, self.root).replace(os.sep, "/")
+                with open(full, "rb") as f:
+                    asset = Asset(name, f.read())
+                by_name[name] = asset
+                by_hashed[asset.hashed_name()] = asset
+                raw += len(asset.variants[None][0])
+                packed += min(len(body) for body, _ in asset.variants.values())
+        self._by_name, self._by_hashed = by_name, by_hashed
+        self._loaded = True
+        log.info("📦 static: %s dosya, %.0f KB → %.0f KB sıkıştırılmış (brotli %s)", len(by_name), raw / 1024,
+                 packed / 1024, "var" if brotli is not None else "yok")
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def lookup(self, path):
+        """(Asset, cache_control) ya da (None, None) — static/ dışında eklenen dosyalar diskten sunulur."""
+        self._ensure_loaded()
+        asset = self._by_hashed.get(path)
+        if asset is not None:
+            return asset, IMMUTABLE
+        asset = self._by_name.get(path)
+        if asset is not None:
+            return asset, REVALIDATE
+        return None, None
+
+    def url(self, name):
+        self._ensure_loaded()
+        return self.prefix + self._by_name[name].hashed_name()
+
+    def rewrite(self, text):
+        """Metindeki ``<prefix><dosya>`` adreslerini özetli adreslerle değiştir."""
+        self._ensure_loaded()
+        for name in self._by_name:
+            for quote in "\"'":
+                text = text.replace(self.prefix + name + quote, self.url(name) + quote)
+        return text
+
+    def page(self, name, text, mimetype="text/html"):
+        """Sayfa kabuğu: static adresleri yeniden yazılmış, sıkıştırılmış Asset."""
+        return Asset(name, self.rewrite(text).encode("utf-8"), mimetype)
+
+    @staticmethod
+    def serve(response_class, request, asset, cache_control=REVALIDATE):
+        """Accept-Encoding'e göre sürüm seç; If-None-Match (zayıf karşılaştırma, W/ önekli de) eşleşirse 304."""
+        enc = None
+        for candidate in ("br", "gzip"):
+            if candidate in asset.variants and request.accept_encodings[candidate] > 0:
+                enc = candidate
+                break
+        body, etag = asset.variants[enc]
+        headers = {"ETag": etag, "Cache-Control": cache_control}
+        if len(asset.variants) > 1:
+            headers["Vary"] = "Accept-Encoding"
+        if request.if_none_match.contains_weak(etag.strip('"')):
+            return response_class(status=304, headers=headers)
+        if enc is not None:
+            headers["Content-Encoding"] = enc
+        return response_class(body, status=200, mimetype=asset.mimetype, headers=headers)
@@ -0,0 +1,74 @@
+"""
+Takım başına son telemetri kaydı.
+
+Gelen paket alımda bir kez normalize edilir (alias anahtarlar tek sefer
+çözülür) ve ``_latest_telemetry`` içinde ``TeamState`` olarak saklanır.
+Kayıt, konumBilgileri / fleet_update girdisini hem dict hem de JSON metni
+olarak önceden hazır tutar; HTTP cevabı bu metinlerin birleştirilmesiyle
+kurulur, her istekte yeniden üretilmez.
+"""
+import json
+
+# çıktı alanı → pakette aranacak anahtarlar (ilk bulunan kullanılır)
+FIELD_ALIASES = (
+    ("iha_enlem", ("iha_enlem", "enlem", "lat", "latitude")),
+    ("iha_boylam", ("iha_boylam", "boylam", "lon", "longitude")),
+    ("iha_irtifa", ("iha_irtifa", "irtifa", "alt", "altitude")),
+    ("iha_dikilme", ("iha_dikilme", "dikilme", "pitch")),
+    ("iha_yonelme", ("iha_yonelme", "yonelme", "yaw", "heading")),
+    ("iha_yatis", ("iha_yatis", "yatis", "roll")),
+    ("iha_hiz", ("iha_hiz", "iha_hizi", "hiz", "speed")),
+    ("iha_batarya", ("iha_batarya", "batarya")),
+    ("iha_otonom", ("iha_otonom", "otonom")),
+    ("iha_kilitlenme", ("iha_kilitlenme", "kilitlenme")),
+    ("hedef_merkez_X", ("hedef_merkez_X", "target_center_x", "hx")),
+    ("hedef_merkez_Y", ("hedef_merkez_Y", "target_center_y", "hy")),
+    ("hedef_genislik", ("hedef_genislik", "target_w", "hw")),
+    ("hedef_yukseklik", ("hedef_yukseklik", "target_h", "hh")),
+    ("gps_saati", ("gps_saati", "gps_time", "time")),
+)
+
+
+def _pick(packet, keys):
+    for k in keys:
+        if k in packet:
+            return packet[k]
+    return None
+
+
+def _num(v):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+class TeamState:
+    __slots__ = ("takim", "ts", "lat", "lon", "alt", "speed", "battery", "packet", "konum", "konum_json")
+
+    def __init__(self, takim, packet, ts):
+        self.takim = int(takim)
+        self.ts = ts
+        self.packet = packet  # ham paket (DB / yeniden oynatma için)
+
+        konum = {"takim_numarasi": self.takim}
+        for out_key, keys in FIELD_ALIASES:
+            konum[out_key] = _pick(packet, keys)
+        konum["zaman_farki"] = 0
+        self.konum = konum  # konumBilgileri + fleet_update girdisi (değiştirmeyin)
+        self.konum_json = json.dumps(konum, sort_keys=True)
+
+        # hesaplamalarda kullanılan sayısal alanlar
+        self.lat = _num(konum["iha_enlem"])
+        self.lon = _num(konum["iha_boylam"])
+        self.alt = _num(konum["iha_irtifa"])
+        self.speed = _num(konum["iha_hiz"])
+        self.battery = _num(konum["iha_batarya"])
+
+    def is_stale(self, now_ts, stale_sec):
+        return stale_sec is not None and (now_ts - self.ts) > stale_sec
+
+
+def json_list(json_items):
+    """Önceden serileştirilmiş JSON parçalarından liste metni."""
+    return "[" + ",".join(json_items) + "]"
@@ -0,0 +1,55 @@
+"""
+Telemetri paketinin sabit boyutlu ikili (struct) karşılığı.
+
+Kalıcı bağlantılı alım kanalında (Socket.IO ``/ucak`` namespace'i) JSON yerine
+gönderilebilir: ~380 bayt JSON yerine 55 bayt, çözme tek ``struct.unpack``.
+Çözülen dict HTTP'deki JSON paketle aynı alanları taşır, doğrulama / kayıt /
+yayın aynı yoldan geçer.
+
+Düzen (little-endian):
+    B   sürüm (1)
+    H   takim_numarasi
+    d d iha_enlem, iha_boylam
+    f×5 iha_irtifa, iha_dikilme, iha_yonelme, iha_yatis, iha_hiz   (3 ondalığa yuvarlanır)
+    B×3 iha_batarya, iha_otonom, iha_kilitlenme
+    h×4 hedef_merkez_X, hedef_merkez_Y, hedef_genislik, hedef_yukseklik
+        (kilitlenme yoksa çerçevede 0; çözülen dict'te bu alanlar hiç yer almaz,
+        JSON paketteki gibi — aynı paket iki kanaldan aynı saklanır / yayınlanır)
+    B×3 H  gps_saati: saat, dakika, saniye, milisaniye
+"""
+import struct
+
+VERSION = 1
+FRAME = struct.Struct("<BHddfffffBBBhhhhBBBH")
+SIZE = FRAME.size
+
+_FLOATS = ("iha_irtifa", "iha_dikilme", "iha_yonelme", "iha_yatis", "iha_hiz")
+_TARGET = ("hedef_merkez_X", "hedef_merkez_Y", "hedef_genislik", "hedef_yukseklik")
+_GPS = ("saat", "dakika", "saniye", "milisaniye")
+
+
+def encode(t):
+    """Telemetri dict'i → SIZE baytlık çerçeve (istemci tarafı / testler). Aralık dışı → struct.error."""
+    g = t["gps_saati"]
+    return FRAME.pack(VERSION, t["takim_numarasi"], t["iha_enlem"], t["iha_boylam"],
+                      *(t[k] for k in _FLOATS),
+                      t["iha_batarya"], t["iha_otonom"], t["iha_kilitlenme"],
+                      *(int(t.get(k) or 0) for k in _TARGET),
+                      *(g[k] for k in _GPS))
+
+
+def decode(buf):
+    """Çerçeve → telemetri dict'i. Boyut / sürüm hatalıysa ValueError."""
+    if len(buf) != SIZE:
+        raise ValueError("çerçeve boyu %d (beklenen %d)" % (len(buf), SIZE))
+    v = FRAME.unpack(buf)
+    if v[0] != VERSION:
+        raise ValueError("çerçeve sürümü %d" % v[0])
+    t = {"takim_numarasi": v[1], "iha_enlem": v[2], "iha_boylam": v[3]}
+    for k, x in zip(_FLOATS, v[4:9]):
+        t[k] = round(x, 3)
+    t["iha_batarya"], t["iha_otonom"], t["iha_kilitlenme"] = v[9:12]
+    if t["iha_kilitlenme"]:
+        t.update(zip(_TARGET, v[12:16]))
+    t["gps_saati"] = dict(zip(_GPS, v[16:20]))
+    return t
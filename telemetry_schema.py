@@ -0,0 +1,163 @@
+"""
+Tek geçişte telemetri doğrulayıcı.
+
+Alan listeleri ve aralık tablosundan bir kez kurulur. ``validate(t)``
+  - başarılıysa (tipli_değerler, None),
+  - değilse (None, hata_kodu)
+döner. Hata kodları makinece okunabilir: ``missing:<alan>``, ``type:<alan>``,
+``range:<alan>``, ``not_object``. Tipli değerler (float/int, gps_saati dahil)
+sonraki adımlarda (DB, geofence) yeniden dönüştürme yapılmadan kullanılır.
+
+Hızlı yol, tablodan üretilip bir kez derlenen düz bir fonksiyondur (alan
+başına döngü / sözlük araması yok). Paket reddedilirse nedeni yavaş yol
+(``_diagnose``) alan alan bulur; bu sadece hatalı paketlerde çalışır.
+
+Reddedilen paketler takım bazında neden koduna göre sayılır.
+"""
+
+_CONVERT_ERRORS = (TypeError, ValueError, OverflowError)
+
+
+class _Reject(Exception):
+    pass
+
+
+def _compile_checks(ranges):
+    # (alan, dönüştürücü, alt, üst, üst_açık_mı); alt/üst None → sınırsız
+    return tuple((f, conv, lo, hi, hi_open) for f, (conv, lo, hi, hi_open) in ranges.items())
+
+
+def _range_expr(var, lo, hi, hi_open):
+    parts = []
+    if lo is not None:
+        parts.append("%r <= %s" % (lo, var))
+    if hi is not None:
+        parts.append("%s %s %r" % (var, "<" if hi_open else "<=", hi))
+    if not parts:
+        return "%s == %s" % (var, var)  # sadece NaN eler
+    return " and ".join(parts)
+
+
+def _build_fast(required, checks, lock_fields, lock_flag, gps_field, gps_checks):
+    """Tablodan düz Python kaynağı üret ve derle."""
+    env = {"_Reject": _Reject}
+    lines = []
+    out = []
+
+    checked = {f for f, *_ in checks}
+    for f in required:
+        if f not in checked and f != gps_field:
+            lines.append("    t[%r]" % f)  # sadece varlık
+    for i, (f, conv, lo, hi, hi_open) in enumerate(checks):
+        env["_c%d" % i] = conv
+        var = "v%d" % i
+        lines.append("    %s = _c%d(t[%r])" % (var, i, f))
+        lines.append("    if not (%s): raise _Reject" % _range_expr(var, lo, hi, hi_open))
+        out.append("%r: %s" % (f, var))
+        if f == lock_flag:
+            lock_var = var
+    if lock_fields:
+        lines.append("    if %s == 1:" % lock_var)
+        for f in lock_fields:
+            lines.append("        t[%r]" % f)
+        out.extend("%r: t.get(%r)" % (f, f) for f in lock_fields)
+
+    lines.append("    g = t[%r]" % gps_field)
+    lines.append("    if type(g) is not dict: raise _Reject")
+    gps_out = []
+    for i, (f, conv, lo, hi, hi_open) in enumerate(gps_checks):
+        env["_g%d" % i] = conv
+        var = "g%d" % i
+        lines.append("    %s = _g%d(g[%r])" % (var, i, f))
+        lines.append("    if not (%s): raise _Reject" % _range_expr(var, lo, hi, hi_open))
+        gps_out.append("%r: %s" % (f, var))
+    out.append("%r: {%s}" % (gps_field, ", ".join(gps_out)))
+    lines.append("    return {%s}" % ", ".join(out))
+
+    # dönüştürücüler varsayılan argüman olarak bağlanır (global arama yerine yerel)
+    binds = ", ".join("%s=%s" % (k, k) for k in env if k[0] == "_" and k[1] in "cg")
+    src = "def _fast(t, %s):\n" % binds + "\n".join(lines)
+    exec(compile(src, "<telemetry_schema>", "exec"), env)
+    return env["_fast"]
+
+
+class TelemetryValidator:
+    def __init__(self, required, lock_fields, ranges, gps_ranges,
+                 lock_flag="iha_kilitlenme", gps_field="gps_saati", known_teams=(), max_teams=64):
+        self.required = tuple(required)
+        self.lock_fields = tuple(lock_fields)
+        self.lock_flag = lock_flag
+        self.gps_field = gps_field
+        self._checks = _compile_checks(ranges)
+        self._gps_checks = _compile_checks(gps_ranges)
+        self._fast = _build_fast(self.required, self._checks, self.lock_fields,
+                                 lock_flag, gps_field, self._gps_checks)
+        self.rejections = {}  # takım → {hata_kodu: adet}
+        # takım numarası reddedilen paketten okunur: kadro dışında en fazla max_teams ayrı takım, gerisi '?'
+        self.known_teams = frozenset(known_teams)
+        self.max_teams = int(max_teams)
+        self.accepted = 0
+
+    def validate(self, t):
+        try:
+            return self._fast(t), None
+        except Exception:
+            return None, self._diagnose(t)
+
+    # ---- yavaş yol: sadece reddedilen paketlerde, ilk hatalı alanı bulur ----
+    @staticmethod
+    def _run(src, checks, prefix=""):
+        for f, conv, lo, hi, hi_open in checks:
+            if f not in src:
+                return "missing:" + prefix + f
+            try:
+                v = conv(src[f])
+            except _CONVERT_ERRORS:
+                return "type:" + prefix + f
+            if v != v:  # NaN
+                return "range:" + prefix + f
+            if lo is not None and v < lo:
+                return "range:" + prefix + f
+            if hi is not None and (v >= hi if hi_open else v > hi):
+                return "range:" + prefix + f
+        return None
+
+    def _diagnose(self, t):
+        if not isinstance(t, dict):
+            return "not_object"
+        for f in self.required:
+            if f not in t:
+                return "missing:" + f
+        err = self._run(t, self._checks)
+        if err:
+            return err
+        if int(t[self.lock_flag]) == 1:
+            for f in self.lock_fields:
+                if f not in t:
+                    return "missing:" + f
+        gps = t[self.gps_field]
+        if not isinstance(gps, dict):
+            return "type:" + self.gps_field
+        return self._run(gps, self._gps_checks, self.gps_field + ".") or "invalid"
+
+    # ---- ret istatistikleri ----
+    def record(self, t, err):
+        """Ret nedenini takım bazında say (takım okunamıyorsa ya da izlenen takım sınırı dolduysa '?')."""
+        try:
+            takim = int(t.get("takim_numarasi"))
+        except Exception:
+            takim = "?"
+        if (takim not in self.rejections and takim not in self.known_teams
+                and len(self.rejections) >= self.max_teams):
+            takim = "?"
+        per_team = self.rejections.setdefault(takim, {})
+        per_team[err] = per_team.get(err, 0) + 1
+
+    def check(self, t):
+        """validate + sayaçlar; telemetri() bunu kullanır."""
+        values, err = self.validate(t)
+        if err:
+            self.record(t if isinstance(t, dict) else {}, err)
+        else:
+            self.accepted += 1
+        return values, err
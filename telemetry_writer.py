@@ -0,0 +1,191 @@
+"""
+Telemetri / kilitlenme / kamikaze kayıtları için arka plan yazıcı (write-behind).
+
+İstek içinde her paket için ayrı bağlantı açıp commit (fsync) etmek yerine
+satırlar sınırlı bir kuyruğa atılır. Ayrı bir thread kuyruğu boşaltır ve
+N satır birikince ya da en geç M milisaniyede bir tek transaction içinde
+executemany + commit yapar (group commit).
+"""
+import logging
+import queue
+import threading
+import time
+
+from packet_store import LOCK_NEW_COLUMNS, TELEMETRY_NEW_COLUMNS
+
+log = logging.getLogger("iha.db_writer")
+
+
+def _insert(table, columns, verb="INSERT", fixed=()):
+    """fixed: (kolon, SQL sabiti) çiftleri — satırda taşınmayan sabit değerler."""
+    names = list(columns) + [c for c, _ in fixed]
+    values = ["?"] * len(columns) + [v for _, v in fixed]
+    return "%s INTO %s (%s) VALUES (%s)" % (verb, table, ", ".join(names), ", ".join(values))
+
+
+_TELEMETRY_COLUMNS = ("ts_utc", "ts_ms", "takim", "enlem", "boylam", "irtifa", "hiz", "batarya") \
+    + TELEMETRY_NEW_COLUMNS
+
+# Anahtar: submit()/submit_many() "tablo" adı (kuyruktaki satır türü)
+INSERT_SQL = {
+    "telemetry": _insert("telemetry", _TELEMETRY_COLUMNS),
+    # toplu alım: aynı satır + toplu=1. UNIQUE(takim, ts_ms) WHERE toplu=1 olduğundan yeniden
+    # gönderilen paket sessizce atlanır; canlı satırlar (sunucu saati) bu kısıta girmez
+    "telemetry_toplu": _insert("telemetry", _TELEMETRY_COLUMNS, verb="INSERT OR IGNORE", fixed=(("toplu", "1"),)),
+    "locks": _insert("locks", ("ts_utc", "ts_ms", "kaynak_takim", "kilitlenen_takim", "otonom_kilitlenme",
+                               "kilit_bitis_gps") + LOCK_NEW_COLUMNS),
+    "kamikaze": """
+        INSERT INTO kamikaze (ts_utc, ts_ms, kaynak_takim, qr_metni, baslangic_gps, bitis_gps, extra_json)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """,
+}
+
+_STOP = object()
+
+
+class _Batch:
+    """Aynı transaction'da yazılması gereken satırlar (kuyrukta tek öğe)."""
+    __slots__ = ("table", "rows")
+
+    def __init__(self, table, rows):
+        self.table = table
+        self.rows = rows
+
+
+class TelemetryWriter:
+    """Sınırlı kuyruk + yazıcı thread ile toplu (batch) SQLite yazımı.
+
+    Yazma, ``db_access.Database`` içindeki tek yazıcı bağlantı üzerinden yapılır;
+    dayanıklılık modu (WAL + synchronous) o bağlantıda ayarlıdır.
+    """
+
+    def __init__(self, db, batch_rows=200, flush_ms=250, queue_max=20000):
+        self.db = db
+        self.batch_rows = int(batch_rows)
+        self.flush_sec = float(flush_ms) / 1000.0
+        self._q = queue.Queue(maxsize=int(queue_max))
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        # basit sayaçlar (izleme için)
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.errors = 0
+        self.ignored = 0  # benzersiz anahtar çakışması (zaten kayıtlı satır)
+
+    # ---- üretici tarafı (istek içinden çağrılır, bloklamaz) ----
+    def submit(self, table, row):
+        """Satırı kuyruğa at. Kuyruk doluysa satır düşürülür ve False döner."""
+        if table not in INSERT_SQL:
+            raise ValueError(f"bilinmeyen tablo: {table}")
+        if self._thread is None:
+            self.start()
+        try:
+            self._q.put_nowait((table, row))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def submit_many(self, table, rows):
+        """Satırları tek öğe olarak kuyruğa at; hepsi aynı commit'te yazılır.
+        Kuyruk doluysa hiçbiri alınmaz ve False döner."""
+        if table not in INSERT_SQL:
+            raise ValueError(f"bilinmeyen tablo: {table}")
+        rows = list(rows)
+        if not rows:
+            return True
+        if self._thread is None:
+            self.start()
+        try:
+            self._q.put_nowait(_Batch(table, rows))
+            return True
+        except queue.Full:
+            self.dropped += len(rows)
+            return False
+
+    def qsize(self):
+        return self._q.qsize()
+
+    # ---- yaşam döngüsü ----
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+            self._thread.start()
+
+    def flush(self, timeout=5.0):
+        """Şu ana kadar kuyruğa atılan her şey commit edilene kadar bekle."""
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        self._q.put(done)
+        return done.wait(timeout)
+
+    def stop(self, timeout=5.0):
+        """Kuyrukta kalanları yaz ve thread'i kapat (kapanışta çağrılır)."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._q.put(_STOP)
+        self._thread.join(timeout)
+        log.info("💾 DB yazıcı kapandı: %s satır / %s batch, düşen=%s", self.written, self.batches, self.dropped)
+
+    # ---- yazıcı thread ----
+    def _commit(self, pending):
+        n = sum(len(rows) for rows in pending.values())
+        if not n:
+            return
+        try:
+            changed = 0
+            with self.db.writer() as con:  # tek transaction → tek commit
+                for table, rows in pending.items():
+                    if rows:
+                        changed += con.executemany(INSERT_SQL[table], rows).rowcount
+            self.written += changed
+            self.ignored += n - changed
+            self.batches += 1
+        except Exception as e:
+            self.errors += 1
+            log.error("❌ DB batch yazma hatası: %s | satır: %s", e, n)
+        for rows in pending.values():
+            rows.clear()
+
+    def _run(self):
+        pending = {t: [] for t in INSERT_SQL}
+        count = 0
+        deadline = None
+        waiters = []
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._q.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            stop = item is _STOP
+            if isinstance(item, threading.Event):
+                waiters.append(item)
+            elif isinstance(item, _Batch):
+                pending[item.table].extend(item.rows)
+                count += len(item.rows)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_sec
+            elif item is not None and not stop:
+                table, row = item
+                pending[table].append(row)
+                count += 1
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_sec
+
+            due = deadline is not None and time.monotonic() >= deadline
+            if stop or waiters or count >= self.batch_rows or due:
+                self._commit(pending)
+                count = 0
+                deadline = None
+                for w in waiters:
+                    w.set()
+                waiters.clear()
+            if stop:
+                break
@@ -0,0 +1,92 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+# Modüller repo kökünde (paket yok): testler kökten de tests/ içinden de çalışsın
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# İlk sürümün (baseline) olay tabloları: ts_utc saniye çözünürlüklü metin, paket raw_json / extra_json'da
+BASELINE_SCHEMA = """
+CREATE TABLE telemetry (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts_utc TEXT NOT NULL,
+    takim INTEGER NOT NULL,
+    enlem REAL, boylam REAL, irtifa REAL, hiz REAL, batarya INTEGER,
+    raw_json TEXT
+);
+CREATE INDEX idx_telemetry_takim_ts ON telemetry(takim, ts_utc);
+CREATE TABLE locks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts_utc TEXT NOT NULL,
+    kaynak_takim INTEGER, kilitlenen_takim INTEGER,
+    otonom_kilitlenme INTEGER NOT NULL,
+    kilit_bitis_gps TEXT,
+    extra_json TEXT
+);
+CREATE INDEX idx_locks_ts ON locks(ts_utc);
+CREATE TABLE kamikaze (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts_utc TEXT NOT NULL,
+    kaynak_takim INTEGER,
+    qr_metni TEXT NOT NULL, baslangic_gps TEXT NOT NULL, bitis_gps TEXT NOT NULL,
+    extra_json TEXT
+);
+CREATE INDEX idx_kamikaze_ts ON kamikaze(ts_utc);
+"""
+
+
+def sample_packet(takim=3, saat=12, dakika=0, saniye=0, milisaniye=0, **over):
+    """Doğrulayıcıdan geçen telemetri paketi."""
+    t = {
+        "takim_numarasi": takim, "iha_enlem": 41.51, "iha_boylam": 36.11, "iha_irtifa": 120.5,
+        "iha_dikilme": 5.0, "iha_yonelme": 270.0, "iha_yatis": -3.0, "iha_hiz": 22.0, "iha_batarya": 80,
+        "iha_otonom": 1, "iha_kilitlenme": 0,
+        "gps_saati": {"saat": saat, "dakika": dakika, "saniye": saniye, "milisaniye": milisaniye},
+    }
+    t.update(over)
+    return t
+
+
+@pytest.fixture
+def baseline_db(tmp_path):
+    """Baseline şemalı DB: 10 saniyede saniyede 2 telemetri (aynı ts_utc), birer kilit / kamikaze."""
+    path = str(tmp_path / "baseline.db")
+    con = sqlite3.connect(path)
+    con.executescript(BASELINE_SCHEMA)
+    import json
+    for i in range(20):
+        ts = "2024-06-01T10:00:%02dZ" % (i // 2)
+        t = sample_packet(saniye=i // 2, milisaniye=500 * (i % 2), iha_enlem=41.5 + i * 1e-4)
+        con.execute("INSERT INTO telemetry (ts_utc, takim, enlem, boylam, irtifa, hiz, batarya, raw_json) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (ts, 3, t["iha_enlem"], t["iha_boylam"], t["iha_irtifa"], t["iha_hiz"], t["iha_batarya"],
+                     json.dumps(t, indent=2)))
+    con.execute("INSERT INTO locks (ts_utc, kaynak_takim, kilitlenen_takim, otonom_kilitlenme, kilit_bitis_gps, "
+                "extra_json) VALUES ('2024-06-01T10:00:03Z', 3, 5, 1, '{}', ?)",
+                (json.dumps({"kaynak_takim": 3, "kilitlenen_takim": 5, "hedef_merkez_X": 300}),))
+    con.execute("INSERT INTO kamikaze (ts_utc, kaynak_takim, qr_metni, baslangic_gps, bitis_gps) "
+                "VALUES ('2024-06-01T10:00:04.250000+00:00', 3, 'teknofest', '{}', '{}')")
+    con.commit()
+    con.close()
+    return path
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    """fake_server modülü: geçici DB + yazıcı + bellek içi durum, şema kurulmuş."""
+    import fake_server as fs
+    from db_access import Database
+    from state_backend import MemoryState
+    from telemetry_writer import TelemetryWriter
+
+    db = Database(str(tmp_path / "iha.db"), read_pool_size=1)
+    writer = TelemetryWriter(db, flush_ms=10)
+    monkeypatch.setattr(fs, "db", db)
+    monkeypatch.setattr(fs, "db_writer", writer)
+    monkeypatch.setattr(fs, "state", MemoryState())
+    fs.init_db()
+    yield fs
+    writer.stop()
+    db.close()
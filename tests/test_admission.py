@@ -0,0 +1,47 @@
+from admission import AdmissionController
+
+
+def controller(**kw):
+    return AdmissionController(lambda s: None, lambda: 0.0, **kw)
+
+
+def test_levels_shed_in_order():
+    adm = controller()
+    adm.observe(0.0, 0.85, now=0.0)  # kuyruk %85 → seviye 2
+    assert adm.level == 2
+    assert [adm.allow(k) for k in ("ui", "db", "reply")] == [False, False, True]
+    assert adm.shed == {"ui": 1, "db": 1, "reply": 0}
+    adm.observe(0.6, 0.0, now=0.1)  # gecikme 600 ms → seviye 3
+    assert adm.status()["mode"] == "reply" and not adm.allow("reply")
+
+
+def test_steps_down_one_level_after_hold():
+    adm = controller(hold_sec=2.0)
+    adm.observe(0.0, 0.96, now=0.0)
+    assert adm.level == 3
+    adm.observe(0.0, 0.0, now=1.0)
+    adm.observe(0.0, 0.0, now=2.5)
+    assert adm.level == 3  # sakinlik 1.5 sn, henüz inmez
+    adm.observe(0.0, 0.0, now=3.0)
+    assert adm.level == 2  # tek basamak
+    adm.observe(0.0, 0.0, now=3.5)
+    assert adm.level == 2  # yeni basamak için yeniden bekler
+    adm.observe(0.0, 0.0, now=5.5)
+    assert adm.level == 1
+
+
+def test_pressure_blip_resets_hold():
+    adm = controller(hold_sec=2.0)
+    adm.observe(0.0, 0.6, now=0.0)
+    adm.observe(0.0, 0.0, now=1.0)
+    adm.observe(0.0, 0.6, now=2.0)  # baskı geri döndü: sayaç sıfırlanır
+    adm.observe(0.0, 0.0, now=3.5)
+    adm.observe(0.0, 0.0, now=4.0)
+    assert adm.level == 1
+
+
+def test_lag_decays_slowly():
+    adm = controller()
+    adm.observe(0.3, 0.0, now=0.0)
+    adm.observe(0.0, 0.0, now=0.1)
+    assert abs(adm.lag - 0.24) < 1e-9 and adm.level == 2
@@ -0,0 +1,38 @@
+from flask import Flask, Response
+
+from cached_response import CachedBody, conditional
+
+app = Flask(__name__)
+
+
+def respond(body, etag, if_none_match=None, **kw):
+    headers = {"If-None-Match": if_none_match} if if_none_match else {}
+    with app.test_request_context(headers=headers):
+        from flask import request
+        return conditional(Response, request, body, etag, **kw)
+
+
+def test_cached_body_rebuilds_only_on_key_change():
+    calls = []
+    cb = CachedBody(lambda key: calls.append(key) or '{"v":%d}' % key)
+    b1, e1 = cb.get(1)
+    assert cb.get(1) == (b1, e1) and calls == [1]
+    b2, e2 = cb.get(2)
+    assert b2 == b'{"v":2}' and e2 != e1 and cb.builds == 2
+
+
+def test_strong_etag_304_with_either_form():
+    body, etag = CachedBody(lambda k: "x").get(0)
+    assert respond(body, etag).status_code == 200
+    for inm in (etag, "W/" + etag, '"nope", ' + etag):
+        r = respond(body, etag, inm)
+        assert r.status_code == 304 and r.headers["ETag"] == etag and not r.data
+    assert respond(body, etag, '"nope"').status_code == 200
+
+
+def test_weak_etag_and_extra_headers_on_304():
+    body, etag = CachedBody(lambda k: "x").get(0)
+    r = respond(body, etag, weak=True, headers={"X-Sunucu-Saati": "1"})
+    assert r.status_code == 200 and r.headers["ETag"] == "W/" + etag
+    r = respond(body, etag, r.headers["ETag"], weak=True, headers={"X-Sunucu-Saati": "2"})
+    assert r.status_code == 304 and r.headers["X-Sunucu-Saati"] == "2"
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from downsample import bucket_ms_for, lttb_indices, track_xy
+from utc_time import iso_from_ms
+
+T0 = 1717236000000  # 2024-06-01T10:00:00Z
+
+
+@pytest.mark.parametrize("n, n_out", [(1000, 50), (101, 3), (7, 5), (5000, 2000)])
+def test_lttb_shape(n, n_out):
+    x = np.arange(n, dtype=float)
+    idx = lttb_indices(x, np.sin(x / 7.0), n_out)
+    assert len(idx) == n_out
+    assert idx[0] == 0 and idx[-1] == n - 1  # uçlar hep korunur
+    assert np.all(np.diff(idx) > 0)  # artan, tekrarsız
+
+
+def test_lttb_short_series_is_untouched():
+    assert lttb_indices([0, 1, 2], [5, 6, 7], 10).tolist() == [0, 1, 2]
+    assert len(lttb_indices(range(10), range(10), 1)) == 3  # en az 3 nokta
+
+
+def test_lttb_keeps_spikes():
+    x = np.arange(1000, dtype=float)
+    y = np.zeros(1000)
+    y[[137, 512, 880]] = [50.0, -40.0, 30.0]
+    idx = set(lttb_indices(x, y, 20).tolist())
+    assert {137, 512, 880} <= idx
+
+
+def test_track_xy_scales_longitude():
+    x, y = track_xy([60.0, 60.0], [10.0, 12.0])
+    assert np.allclose(x, [5.0, 6.0]) and y.tolist() == [60.0, 60.0]
+
+
+@pytest.mark.parametrize("t_min, t_max, max_points, expected", [
+    (0, 999, 10, 100),
+    (0, 1000, 10, 101),  # yukarı yuvarlanır: kova sayısı sınırı aşmaz
+    (5, 5, 10, 1),
+    (10, 0, 10, 1),
+    (0, 99, 0, 100),
+])
+def test_bucket_ms_for(t_min, t_max, max_points, expected):
+    assert bucket_ms_for(t_min, t_max, max_points) == expected
+    if t_max >= t_min and max_points:
+        assert -(-(t_max - t_min + 1) // expected) <= max_points
+
+
+@pytest.fixture
+def long_history(server):
+    """Takım 3: 600 sn, 2 Hz; irtifa düz, 300. sn'de tek tepe. Takım 4: 600 sn, 1 Hz."""
+    rows = []
+    for i in range(1200):
+        ts = T0 + i * 500
+        rows.append((iso_from_ms(ts), ts, 3, 41.0 + i * 1e-5, 36.0, 900.0 if i == 600 else 100.0, 20.0, 80))
+    for i in range(600):
+        ts = T0 + i * 1000
+        rows.append((iso_from_ms(ts), ts, 4, 40.0, 35.0 + i * 1e-5, 90.0, 18.0, 70))
+    server.db.executemany("INSERT INTO telemetry (ts_utc, ts_ms, takim, enlem, boylam, irtifa, hiz, batarya) "
+                          "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    return server
+
+
+def test_lttb_query_splits_budget_and_keeps_peak(long_history):
+    rows, info = long_history._query_telemetry_downsampled(None, None, None, 100, "lttb", None, "irtifa", 5000)
+    assert info == {"mode": "lttb", "source_rows": 1800, "points": 100}
+    by_team = {t: [r for r in rows if r["takim"] == t] for t in (3, 4)}
+    assert len(by_team[3]) == len(by_team[4]) == 50
+    assert max(r["irtifa"] for r in by_team[3]) == 900.0
+    assert [r["ts_ms"] for r in rows] == sorted((r["ts_ms"] for r in rows), reverse=True)
+    assert all(isinstance(r["batarya"], int) and r["ts_utc"] == iso_from_ms(r["ts_ms"]) for r in rows)
+
+
+def test_bucket_query_aggregates(long_history):
+    rows, info = long_history._query_telemetry_downsampled(3, None, None, 1000, "bucket", 60, None, 5000)
+    assert info["bucket_ms"] == 60000 and info["points"] == 10 and not info["truncated"]
+    assert info["source_rows"] == 1200 and all(r["n"] == 120 for r in rows)
+    peak = next(r for r in rows if r["ts_ms"] == T0 + 300000)
+    assert (peak["irtifa_min"], peak["irtifa_max"]) == (100.0, 900.0)
+    assert peak["irtifa"] == pytest.approx((119 * 100.0 + 900.0) / 120)
+
+
+def test_bucket_query_truncates_oldest(long_history):
+    rows, info = long_history._query_telemetry_downsampled(3, None, None, 4, "bucket", 60, None, 5000)
+    assert info["truncated"] and [r["ts_ms"] for r in rows] == [T0 + k * 60000 for k in (9, 8, 7, 6)]
@@ -0,0 +1,95 @@
+import pytest
+
+from history_stream import next_cursor
+from utc_time import iso_from_ms, parse_ts_ms
+
+T0 = 1717236000000  # 2024-06-01T10:00:00Z
+
+
+@pytest.mark.parametrize("value, end, expected", [
+    ("2024-06-01T10:00:00Z", False, T0),
+    ("2024-06-01T10:00:00Z", True, T0 + 999),  # bitiş: o saniyenin tamamı
+    ("2024-06-01 10:00:00", False, T0),  # saat dilimsiz → UTC, boşluklu
+    ("2024-06-01T13:00:00+03:00", False, T0),
+    ("2024-06-01T10:00:00.250Z", True, T0 + 250),  # ms verilmişse genişletilmez
+    ("2024-06-01", True, T0 - 10 * 3600000 + 86400000 - 1),  # sadece tarih: günün sonu
+    (str(T0), False, T0),
+    (T0, True, T0),
+    (None, False, None),
+    ("", True, None),
+])
+def test_parse_ts_ms(value, end, expected):
+    assert parse_ts_ms(value, end=end) == expected
+
+
+def test_parse_ts_ms_rejects_garbage():
+    with pytest.raises(ValueError):
+        parse_ts_ms("dün")
+
+
+def test_iso_from_ms_single_format():
+    assert iso_from_ms(T0 + 5) == "2024-06-01T10:00:00.005Z"
+    assert parse_ts_ms(iso_from_ms(T0 + 123456)) == T0 + 123456
+
+
+@pytest.fixture
+def history(server):
+    """Takım 3: 10 saniyede saniyede 2 satır (aynı ts_ms çiftleri), takım 4: 5 satır."""
+    rows = [(iso_from_ms(T0 + (i // 2) * 1000), T0 + (i // 2) * 1000, 3, 41.0 + i * 1e-4, 36.0, 100.0, 20.0, 80)
+            for i in range(20)]
+    rows += [(iso_from_ms(T0 + i * 1000), T0 + i * 1000, 4, 40.0, 35.0, 90.0, 18.0, 70) for i in range(5)]
+    server.db.executemany("INSERT INTO telemetry (ts_utc, ts_ms, takim, enlem, boylam, irtifa, hiz, batarya) "
+                          "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    return server
+
+
+def test_keyset_pages_cover_every_row_once(history):
+    seen, cursor, pages = [], None, 0
+    while True:
+        page = history.query_telemetry_history(takim=3, limit=3, cursor=cursor)
+        seen += page
+        pages += 1
+        cursor = next_cursor(page, 3)
+        if cursor is None:
+            break
+    ids = [r["id"] for r in seen]
+    assert len(ids) == len(set(ids)) == 20
+    assert [(r["ts_ms"], r["id"]) for r in seen] == sorted(((r["ts_ms"], r["id"]) for r in seen), reverse=True)
+    assert pages == 7  # 6 dolu sayfa + 2 satırlık son sayfa
+
+
+def test_cursor_splits_rows_with_equal_ts(history):
+    first = history.query_telemetry_history(takim=3, limit=1)
+    rest = history.query_telemetry_history(takim=3, limit=1, cursor=next_cursor(first, 1))
+    assert first[0]["ts_ms"] == rest[0]["ts_ms"] and first[0]["id"] > rest[0]["id"]
+
+
+def test_range_bounds(history):
+    rows = history.query_telemetry_history(takim=3, start_iso="2024-06-01T10:00:02Z", end_iso="2024-06-01T10:00:04Z")
+    # bitiş saniyesinin tamamı dahil
+    assert sorted({r["ts_ms"] for r in rows}) == [T0 + 2000, T0 + 3000, T0 + 4000]
+    assert len(rows) == 6
+    assert all(r["ts_utc"] == iso_from_ms(r["ts_ms"]) for r in rows)
+    assert len(history.query_telemetry_history(start_iso=T0 + 4000, end_iso=T0 + 4000)) == 3  # iki takım
+
+
+def test_history_query_is_index_only(history):
+    where, params = history._telemetry_where(3, T0, T0 + 5000)
+    plan = " ".join(r[-1] for r in history.db.query(
+        "EXPLAIN QUERY PLAN SELECT id, ts_ms, takim, enlem, boylam, irtifa, hiz, batarya FROM telemetry"
+        + where + " ORDER BY ts_ms DESC, id DESC", params))
+    assert "COVERING INDEX idx_telemetry_takim_tsms_id" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_backfill_from_baseline_text(baseline_db, server):
+    import sqlite3
+    con = sqlite3.connect(baseline_db)
+    server._create_schema(con.cursor())
+    server._migrate_schema(con.cursor())
+    # baseline'ın üç farklı ts_utc biçimi aynı epoch ms'e iner
+    assert con.execute("SELECT MIN(ts_ms), MAX(ts_ms) FROM telemetry").fetchone() == (T0, T0 + 9000)
+    assert con.execute("SELECT ts_ms FROM locks").fetchone()[0] == T0 + 3000
+    assert con.execute("SELECT ts_ms FROM kamikaze").fetchone()[0] == T0 + 4250
+    indexes = {r[1] for r in con.execute("PRAGMA index_list(telemetry)")}
+    assert "idx_telemetry_takim_ts" not in indexes  # ts_utc indeksleri kaldırıldı
@@ -0,0 +1,110 @@
+import json
+import sqlite3
+
+import pytest
+
+import packet_store as ps
+
+from conftest import sample_packet
+
+LOCK_GPS = {"saat": 10, "dakika": 0, "saniye": 3, "milisaniye": 120}
+
+
+def typed_base(t):
+    """Doğrulayıcının yaptığı gibi: tam sayı kolonlar int, gerçel kolonlar float."""
+    return tuple(ps._PY_TYPE[kind](t[key]) for _, key, kind in ps.TELEMETRY_BASE)
+
+
+def round_trip(t):
+    base = typed_base(t)
+    cols = ps.split_telemetry(t, base)
+    return cols, ps.telemetry_packet(base + cols)
+
+
+def test_plain_packet_needs_no_blob():
+    t = sample_packet(iha_kilitlenme=1, hedef_merkez_X=320, hedef_merkez_Y=200, hedef_genislik=40,
+                      hedef_yukseklik=30)
+    cols, back = round_trip(t)
+    assert cols[-1] is None
+    assert back == t
+
+
+@pytest.mark.parametrize("over", [
+    {"iha_enlem": 41},  # int geldi, kolon REAL: tipi korunmalı
+    {"iha_batarya": 80.0},  # float geldi, kolon INTEGER
+    {"iha_otonom": True},  # bool kolona yazılmaz
+    {"iha_yatis": "3.5"},  # metin
+    {"iha_dikilme": None},
+    {"ek_alan": {"x": [1, 2]}, "zaman_farki": 12},  # beklenmeyen alanlar
+    {"gps_saati": {"saat": 10, "dakika": 0, "saniye": 1.5, "milisaniye": 0}},  # tam sayı olmayan GPS
+    {"gps_saati": "10:00:01"},
+])
+def test_unusual_fields_round_trip_exactly(over):
+    t = sample_packet(**over)
+    cols, back = round_trip(t)
+    assert cols[-1] is not None
+    assert back == t
+    assert {k: type(v) for k, v in back.items()} == {k: type(v) for k, v in t.items()}
+
+
+def test_missing_optional_fields_stay_missing():
+    t = sample_packet()
+    del t["iha_yatis"], t["gps_saati"]
+    _, back = round_trip(t)
+    assert back == t
+
+
+def split_lock(payload):
+    base = (payload.get("kaynak_takim"), payload.get("kilitlenen_takim"), int(payload.get("otonom_kilitlenme", 0)))
+    gps_json = json.dumps(payload.get(ps.LOCK_GPS_FIELD, {}))
+    cols = ps.split_lock(payload, base, gps_json)
+    return cols, ps.lock_packet(base + (gps_json,) + cols)
+
+
+def test_lock_round_trip():
+    p = {"kaynak_takim": 3, "kilitlenen_takim": 5, "otonom_kilitlenme": 1, ps.LOCK_GPS_FIELD: LOCK_GPS,
+         "hedef_merkez_X": 300, "hedef_merkez_Y": 220, "hedef_genislik": 60, "hedef_yukseklik": 40}
+    cols, back = split_lock(p)
+    assert cols[-1] is None and back == p
+
+
+def test_lock_absent_keys_are_not_invented():
+    # otonom_kilitlenme kolona 0, GPS kolona "{}" yazılır; pakette yoklardı → _ABSENT
+    p = {"kaynak_takim": 3, "kilitlenen_takim": 5}
+    cols, back = split_lock(p)
+    assert ps.unpack(cols[-1]) == {ps._ABSENT: ["otonom_kilitlenme", ps.LOCK_GPS_FIELD]}
+    assert back == p
+
+
+def test_blob_tags():
+    assert ps.pack({}) is None and ps.unpack(None) == {}
+    small = {"a": 1}
+    assert ps.pack(small)[0] == ps._TAG_JSON and ps.unpack(ps.pack(small)) == small  # sıkıştırma kazandırmıyor
+    big = {"ek": "telemetri " * 50}
+    assert ps.pack(big)[0] == ps._TAG_ZDICT_V1 and ps.unpack(ps.pack(big)) == big
+    with pytest.raises(ValueError):
+        ps.unpack(b"\x07{}")
+
+
+def test_convert_rows_rebuilds_original_packets(baseline_db):
+    con = sqlite3.connect(baseline_db)
+    con.execute("INSERT INTO telemetry (ts_utc, takim, enlem, boylam, irtifa, hiz, batarya, raw_json) "
+                "VALUES ('2024-06-01T10:00:10Z', 3, 0, 0, 0, 0, 0, 'bozuk {')")
+    originals = {r[0]: r[1] for r in con.execute("SELECT id, raw_json FROM telemetry")}
+    locks = {r[0]: r[1] for r in con.execute("SELECT id, extra_json FROM locks")}
+    stats = ps.convert_rows(con.cursor(), chunk=7)
+    con.commit()
+    assert stats == {"telemetry": 21, "locks": 1, "fallback": 1}
+    cols = {r[1] for r in con.execute("PRAGMA table_info(telemetry)")}
+    assert "raw_json" not in cols or con.execute("SELECT COUNT(raw_json) FROM telemetry").fetchone()[0] == 0
+    for rid, *row in con.execute("SELECT id, %s FROM telemetry" % ps.TELEMETRY_PACKET_SQL):
+        packet = ps.telemetry_packet(tuple(row))
+        raw = originals[rid]
+        if raw == "bozuk {":  # çözülemeyen kayıt kaybolmaz; kolon değerleri yanına gelir
+            assert packet["_ham"] == raw and packet["takim_numarasi"] == 3
+        else:
+            assert packet == json.loads(raw)
+    for rid, *row in con.execute("SELECT id, %s FROM locks" % ps.LOCK_PACKET_SQL):
+        assert ps.lock_packet(tuple(row)) == json.loads(locks[rid])
+    # ikinci çalıştırma zararsız
+    assert ps.convert_rows(con.cursor()) == {"telemetry": 0, "locks": 0, "fallback": 0}
@@ -0,0 +1,62 @@
+import sqlite3
+
+import fake_server as fs
+from db_access import Database
+from telemetry_writer import TelemetryWriter
+
+from conftest import sample_packet
+
+
+def migrate(path):
+    con = sqlite3.connect(path)
+    cur = con.cursor()
+    fs._create_schema(cur)
+    fs._migrate_schema(cur)
+    con.commit()
+    return con
+
+
+def test_baseline_migration_keeps_every_row(baseline_db):
+    con = migrate(baseline_db)
+    assert con.execute("PRAGMA user_version").fetchone()[0] == fs.SCHEMA_VERSION
+    # saniyede 2 paket aynı ts_ms'e düşer; hiçbiri silinmemeli
+    assert con.execute("SELECT COUNT(*) FROM telemetry").fetchone()[0] == 20
+    assert con.execute("SELECT COUNT(DISTINCT ts_ms) FROM telemetry").fetchone()[0] == 10
+    assert con.execute("SELECT COUNT(*) FROM telemetry WHERE ts_ms IS NULL OR toplu IS NOT NULL").fetchone()[0] == 0
+    assert con.execute("SELECT COUNT(*) FROM locks").fetchone()[0] == 1
+    assert con.execute("SELECT ts_ms FROM kamikaze").fetchone()[0] == 1717236004250
+
+
+def test_migration_is_idempotent(baseline_db):
+    migrate(baseline_db).close()
+    con = migrate(baseline_db)
+    assert con.execute("SELECT COUNT(*) FROM telemetry").fetchone()[0] == 20
+
+
+def _row(ts_ms, takim=3):
+    t = sample_packet(takim=takim)
+    v, err = fs.telemetry_validator.check(t)
+    assert not err
+    return fs.telemetry_row(takim, t, v, ts_ms)
+
+
+def test_batch_rows_are_unique_but_live_rows_are_not(tmp_path):
+    path = str(tmp_path / "iha.db")
+    migrate(path).close()
+    db = Database(path, read_pool_size=1)
+    writer = TelemetryWriter(db, flush_ms=10)
+    try:
+        # canlı: aynı ms'de iki paket ikisi de yazılır
+        writer.submit("telemetry", _row(1000))
+        writer.submit("telemetry", _row(1000))
+        # toplu: yeniden gönderilen satır atlanır (canlı satırla aynı anahtar olsa da)
+        writer.submit_many("telemetry_toplu", [_row(1000), _row(2000)])
+        writer.submit_many("telemetry_toplu", [_row(2000), _row(3000)])
+        assert writer.flush()
+    finally:
+        writer.stop()
+    rows = db.query("SELECT ts_ms, toplu FROM telemetry ORDER BY id")
+    db.close()
+    assert [tuple(r) for r in rows] == [(1000, None), (1000, None), (1000, 1), (2000, 1), (3000, 1)]
+    assert writer.written == 5 and writer.ignored == 1 and writer.errors == 0
+
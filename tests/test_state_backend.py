@@ -0,0 +1,91 @@
+import pytest
+
+from state_backend import MemoryState, SqliteState
+from zone_state import ZoneStateMachine
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def stores(request, tmp_path):
+    """İki "worker"ın gördüğü durum: bellekte aynı nesne, SQLite'ta aynı dosyaya iki bağlantı."""
+    if request.param == "memory":
+        s = MemoryState()
+        yield s, s
+        return
+    a, b = SqliteState(str(tmp_path / "state.db")), SqliteState(str(tmp_path / "state.db"))
+    yield a, b
+    a.close()
+    b.close()
+
+
+def test_zone_debounce_across_workers(stores):
+    a, b = stores
+    wa, wb = ZoneStateMachine(debounce=2, store=a), ZoneStateMachine(debounce=2, store=b)
+    assert wa.observe(3, "fence", True, now=1.0) is True  # ilk gözlem yayınlanır
+    assert wb.observe(3, "fence", True, now=1.5) is None
+    # çıkış iki ardışık gözlem ister; gözlemler farklı worker'lara düşse de tek sayaç
+    assert wa.observe(3, "fence", False, now=2.0) is None
+    assert wb.observe(3, "fence", False, now=2.5) is False
+    assert wa.observe(3, "fence", False, now=3.0) is None
+    assert wb.snapshot(now=4.0) == {3: {"fence": False, "fence_sure": 1.5}}
+
+
+def test_zone_glitch_is_suppressed(stores):
+    a, b = stores
+    wa, wb = ZoneStateMachine(debounce=2, store=a), ZoneStateMachine(debounce=2, store=b)
+    wa.observe(5, "hss", False, now=1.0)
+    assert wb.observe(5, "hss", True, now=2.0) is None
+    assert wa.observe(5, "hss", False, now=3.0) is None  # tek paketlik titreme
+    assert wb.observe(5, "hss", True, now=4.0) is None  # sayaç sıfırlanmıştı
+    assert wa.suppressed == 1
+
+
+def test_zone_forget(stores):
+    a, b = stores
+    wa, wb = ZoneStateMachine(store=a), ZoneStateMachine(store=b)
+    wa.observe(7, "fence", True)
+    wa.observe(7, "hss", False)
+    assert wb.teams() == {7}
+    wb.forget(7)
+    assert wa.teams() == set()
+    assert wa.observe(7, "fence", True) is True  # geri dönen takımın ilk durumu yeniden yayınlanır
+
+
+def test_batch_keys_shared_and_expire(stores):
+    a, b = stores
+    assert a.reserve_batch_keys([(3, 100), (3, 200), (3, 100)], 10.0, 30, 1000) == [True, True, False]
+    assert b.reserve_batch_keys([(3, 200), (4, 200)], 11.0, 30, 1000) == [False, True]
+    b.release_batch_keys([(3, 200)])
+    assert a.reserve_batch_keys([(3, 200)], 12.0, 30, 1000) == [True]
+    assert b.reserve_batch_keys([(3, 100)], 41.0, 30, 1000) == [True]  # süresi doldu
+
+
+def test_batch_keys_capped(stores):
+    a, _ = stores
+    a.reserve_batch_keys([(1, i) for i in range(10)], 1.0, 30, 5)
+    a.reserve_batch_keys([(2, 0)], 2.0, 30, 5)  # en eskiler atılır
+    assert a.reserve_batch_keys([(1, 0), (1, 9)], 3.0, 30, 100) == [True, False]
+
+
+def test_token_bucket_shared(stores):
+    a, b = stores
+    assert a.take_token(3, 0.0, rate=2.0, burst=2)
+    assert b.take_token(3, 0.0, rate=2.0, burst=2)
+    assert not a.take_token(3, 0.1, rate=2.0, burst=2)
+    assert b.take_token(3, 0.6, rate=2.0, burst=2)
+
+
+def test_token_bucket_burst_then_rate(stores):
+    a, b = stores
+    # burst 3: iki worker'dan gelen ilk 3 paket geçer, 4. reddedilir
+    assert [s.take_token(3, 100.0, 2, 3) for s in (a, b, a, b)] == [True, True, True, False]
+    assert b.take_token(3, 100.2, 2, 3) is False  # 0.4 token
+    assert a.take_token(3, 100.5, 2, 3) is True  # 1.0 token doldu
+    assert b.take_token(3, 100.5, 2, 3) is False
+    assert a.take_token(4, 100.5, 2, 3) is True  # takımlar ayrı kovada
+
+
+def test_token_bucket_refill_is_capped(stores):
+    a, b = stores
+    a.take_token(3, 0.0, 2, 3)
+    # uzun sessizlikten sonra en fazla burst kadar
+    assert sum(s.take_token(3, 1000.0, 2, 3) for s in (a, b, a, b, a)) == 3
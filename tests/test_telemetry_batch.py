@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import fake_server as fs
+
+from conftest import sample_packet
+
+AUTH = {"Authorization": "Bearer " + fs.TOKEN}
+
+
+@pytest.fixture
+def client(server):
+    return server.app.test_client()
+
+
+def packets(*seconds_ago, takim=3):
+    now = datetime.now(timezone.utc)
+    out = []
+    for s in seconds_ago:
+        t = now - timedelta(seconds=s)
+        out.append(sample_packet(takim=takim, saat=t.hour, dakika=t.minute, saniye=t.second,
+                                 milisaniye=t.microsecond // 1000))
+    return out
+
+
+def post(client, body):
+    r = client.post("/api/telemetri_toplu", json=body, headers=AUTH)
+    assert r.status_code == 200
+    return r.get_json()
+
+
+def stored():
+    return fs.db.query("SELECT COUNT(*) FROM telemetry")[0][0]
+
+
+def test_duplicates_within_one_request(client):
+    body = packets(30, 20, 20)
+    r = post(client, body)
+    assert (r["accepted"], r["duplicate"]) == (2, 1)
+    assert [i["durum"] for i in r["items"]] == ["accepted", "accepted", "duplicate"]
+
+
+def test_resend_before_flush_is_duplicate(client):
+    body = packets(30, 20, 10)
+    assert post(client, body)["accepted"] == 3
+    # yazıcı henüz commit etmemiş olabilir; yine de tekrar yazılmamalı
+    r = post(client, body)
+    assert (r["accepted"], r["duplicate"]) == (0, 3)
+    fs.db_writer.flush()
+    assert stored() == 3
+
+
+def test_resend_after_commit_is_duplicate(client):
+    body = packets(30, 20)
+    r = post(client, body)
+    fs.db_writer.flush()
+    fs.state.release_batch_keys([(3, i["ts_ms"]) for i in r["items"]])  # pencere dışı: tablodan bulunur
+    r = post(client, body + packets(5))
+    assert (r["accepted"], r["duplicate"]) == (1, 2)
+    fs.db_writer.flush()
+    assert stored() == 3
+
+
+def test_invalid_and_too_old_are_rejected(client):
+    bad = dict(packets(10)[0], iha_batarya=500)
+    r = post(client, [bad] + packets(2 * fs.TELEMETRY_BATCH_MAX_AGE_SEC))
+    assert r["rejected"] == 2
+    assert [i["neden"] for i in r["items"]] == ["range:iha_batarya", "range:gps_saati"]
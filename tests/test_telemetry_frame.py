@@ -0,0 +1,60 @@
+import struct
+
+import pytest
+
+import telemetry_frame
+from packet_store import split_telemetry, telemetry_packet, TELEMETRY_BASE
+
+from conftest import sample_packet
+
+LOCKED = dict(hedef_merkez_X=320, hedef_merkez_Y=-40, hedef_genislik=64, hedef_yukseklik=48)
+
+
+def base_values(t):
+    return tuple(t[key] for _, key, _ in TELEMETRY_BASE)
+
+
+def test_round_trip_locked():
+    t = sample_packet(iha_kilitlenme=1, saat=23, dakika=59, saniye=59, milisaniye=999, **LOCKED)
+    assert telemetry_frame.decode(telemetry_frame.encode(t)) == t
+
+
+def test_floats_round_to_three_decimals():
+    t = sample_packet(iha_irtifa=120.123456, iha_hiz=22.0004)
+    d = telemetry_frame.decode(telemetry_frame.encode(t))
+    assert (d["iha_irtifa"], d["iha_hiz"]) == (120.123, 22.0)
+    assert d["iha_enlem"] == t["iha_enlem"]  # double: aynen
+
+
+def test_unlocked_frame_has_no_target_fields():
+    t = sample_packet(iha_kilitlenme=0)
+    d = telemetry_frame.decode(telemetry_frame.encode(t))
+    assert d == t
+    assert not any(k.startswith("hedef_") for k in d)
+
+
+def test_unlocked_frame_stored_like_json():
+    t = sample_packet(iha_kilitlenme=0)
+    d = telemetry_frame.decode(telemetry_frame.encode(t))
+    assert split_telemetry(d, base_values(d)) == split_telemetry(t, base_values(t))
+
+
+def test_decoded_packet_rebuilds_from_columns():
+    d = telemetry_frame.decode(telemetry_frame.encode(sample_packet(iha_kilitlenme=1, **LOCKED)))
+    cols = split_telemetry(d, base_values(d))
+    assert cols[-1] is None  # her alan kolonda, blob yok
+    assert telemetry_packet(base_values(d) + cols) == d
+
+
+def test_size_and_version_errors():
+    frame = telemetry_frame.encode(sample_packet())
+    assert len(frame) == telemetry_frame.SIZE
+    with pytest.raises(ValueError):
+        telemetry_frame.decode(frame[:-1])
+    with pytest.raises(ValueError):
+        telemetry_frame.decode(bytes([telemetry_frame.VERSION + 1]) + frame[1:])
+
+
+def test_out_of_range_does_not_encode():
+    with pytest.raises(struct.error):
+        telemetry_frame.encode(sample_packet(iha_batarya=300))
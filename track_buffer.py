@@ -0,0 +1,121 @@
+"""
+Takım başına sabit kapasiteli, kolon düzenli (NumPy) telemetri halkası.
+
+Her takım için ``(len(COLUMNS), 2 * capacity)`` boyutlu tek bir float64 dizi
+tutulur; her örnek hem ``i`` hem ``i + capacity`` sütununa yazılır (ayna).
+Böylece halkanın içeriği her zaman ``[s, s + n)`` aralığında bitişiktir ve
+pencere sorguları kopyasız dilim (view) döndürür. Zaman kolonu artan sırada
+olduğundan pencere başı ``searchsorted`` ile bulunur.
+
+Bellek sınırı oturum uzunluğundan bağımsızdır: takım başına
+``2 * capacity * len(COLUMNS) * 8`` bayt, en fazla ``max_teams`` takım (en
+uzun süredir paket gelmeyen takım atılır).
+
+Dönen view'lar sonraki ``append``'e kadar geçerlidir; saklanacaksa kopyalanmalı.
+"""
+import collections
+import math
+
+import numpy as np
+
+from downsample import lttb_indices, track_xy
+
+COLUMNS = ("ts_ms", "enlem", "boylam", "irtifa", "hiz", "batarya", "dikilme", "yonelme", "yatis")
+_TS = 0
+
+
+class TrackRing:
+    __slots__ = ("capacity", "_data", "_head", "_n")
+
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self._data = np.full((len(COLUMNS), 2 * self.capacity), np.nan)
+        self._head = 0  # sonraki yazılacak yuva [0, capacity)
+        self._n = 0
+
+    def __len__(self):
+        return self._n
+
+    def append(self, row):
+        """row: COLUMNS sırasıyla değerler (None → NaN)."""
+        col = np.array(row, dtype=np.float64)
+        i = self._head
+        self._data[:, i] = col
+        self._data[:, i + self.capacity] = col
+        self._head = (i + 1) % self.capacity
+        self._n = min(self._n + 1, self.capacity)
+
+    def view(self):
+        """Tüm içerik, eskiden yeniye: (len(COLUMNS), n) view."""
+        s = (self._head - self._n) % self.capacity
+        return self._data[:, s:s + self._n]
+
+    def window(self, since_ms=None, last_n=None):
+        """ts_ms >= since_ms olan ve/veya son last_n örnek: view."""
+        v = self.view()
+        lo = 0
+        if since_ms is not None:
+            lo = int(np.searchsorted(v[_TS], since_ms, side="left"))
+        if last_n is not None:
+            lo = max(lo, v.shape[1] - int(last_n))
+        return v[:, lo:]
+
+    def latest_ms(self):
+        return self._data[_TS, (self._head - 1) % self.capacity] if self._n else None
+
+
+class TrackStore:
+    def __init__(self, capacity=1800, max_teams=64):
+        self.capacity = int(capacity)
+        self.max_teams = int(max_teams)
+        self._rings = collections.OrderedDict()  # takım → TrackRing (en son güncellenen sonda)
+
+    def append(self, takim, ts_ms, lat, lon, alt, speed, battery, pitch=None, yaw=None, roll=None):
+        ring = self._rings.get(takim)
+        if ring is None:
+            ring = self._rings[takim] = TrackRing(self.capacity)
+            while len(self._rings) > self.max_teams:
+                self._rings.popitem(last=False)
+        else:
+            self._rings.move_to_end(takim)
+        ring.append((ts_ms, lat, lon, alt, speed, battery, pitch, yaw, roll))
+
+    def teams(self):
+        return list(self._rings)
+
+    def get(self, takim):
+        return self._rings.get(takim)
+
+    def window(self, takim, seconds=None, now_ms=None, last_n=None):
+        """Takımın son ``seconds`` saniyesi (now_ms'e göre) ve/veya son last_n örneği: view ya da None."""
+        ring = self._rings.get(takim)
+        if ring is None:
+            return None
+        since = None
+        if seconds is not None:
+            ref = now_ms if now_ms is not None else ring.latest_ms()
+            since = ref - float(seconds) * 1000.0
+        return ring.window(since, last_n)
+
+    def nbytes(self):
+        return sum(r._data.nbytes for r in self._rings.values())
+
+    def snapshot(self, takim, seconds=None, now_ms=None, max_points=None):
+        """
+        JSON'a hazır kolon sözlüğü {kolon: [..]}; max_points verilirse iz LTTB ile
+        seyreltilir (dönüşler korunur). Takım yoksa None.
+        """
+        w = self.window(takim, seconds, now_ms)
+        if w is None:
+            return None
+        if max_points and w.shape[1] > int(max_points):
+            x, y = track_xy(w[1], w[2])
+            w = w[:, lttb_indices(x, y, int(max_points))]
+        out = {}
+        for i, name in enumerate(COLUMNS):
+            vals = w[i].tolist()
+            if i == _TS:
+                out[name] = [int(t) for t in vals]
+            else:
+                out[name] = [None if math.isnan(f) else f for f in vals]
+        return out
@@ -0,0 +1,76 @@
+"""
+Sunucu zaman damgaları: tek kaynak, tek biçim.
+
+Olay tablolarında (telemetry / locks / kamikaze) zaman ``ts_ms`` kolonunda
+tamsayı epoch milisaniye (UTC) olarak tutulur; aralık sorguları bu kolon
+üzerinden yapılır. ``ts_utc`` metni sadece okunabilirlik içindir ve her yerde
+aynı biçimdedir: ``YYYY-MM-DDTHH:MM:SS.mmmZ``.
+"""
+import time
+from datetime import datetime, timezone
+
+# ISO metinden epoch ms (eski satırları doldurmak için; SQLite julianday 'Z' ve kesirli saniyeyi anlar)
+TS_MS_FROM_ISO_SQL = "CAST(ROUND((julianday(ts_utc) - 2440587.5) * 86400000.0) AS INTEGER)"
+
+
+def now_ms():
+    return time.time_ns() // 1_000_000
+
+
+def iso_from_ms(ms):
+    ms = int(ms)
+    return datetime.fromtimestamp(ms // 1000, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S") + ".%03dZ" % (ms % 1000)
+
+
+def now_iso():
+    return iso_from_ms(now_ms())
+
+
+def utc_dict_from_ms(ms):
+    """Yarışma saat sözlüğü (sunucusaati / gps_saati biçimi): gun, saat, dakika, saniye, milisaniye."""
+    ms = int(ms)
+    dt = datetime.fromtimestamp(ms // 1000, timezone.utc)
+    return {"gun": dt.day, "saat": dt.hour, "dakika": dt.minute, "saniye": dt.second, "milisaniye": ms % 1000}
+
+
+def parse_ts_ms(value, end=False):
+    """
+    Filtre sınırını epoch ms'e çevir. Kabul edilenler: epoch ms (int / rakam
+    metni), ISO 8601 ('Z' / ofsetli / saat dilimsiz → UTC, 'T' yerine boşluk).
+
+    end=True iken sınır verilen hassasiyetin sonuna genişletilir; böylece
+    '...T10:00:00Z' bitişi eskisi gibi o saniyenin tamamını, sadece tarih ise
+    o günün tamamını kapsar. Geçersiz değer → ValueError.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return int(value)
+    s = str(value).strip()
+    if s.isdigit():
+        return int(s)
+    s = s.replace(" ", "T")
+    dt = datetime.fromisoformat(s[:-1] + "+00:00" if s.endswith(("Z", "z")) else s)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    ms = int(dt.timestamp()) * 1000 + dt.microsecond // 1000
+    if end and "." not in s:
+        ms += 999 if "T" in s else 86400000 - 1
+    return ms
+
+
+DAY_MS = 86400000
+
+
+def ms_from_clock(clock, ref_ms, future_ms=60000):
+    """
+    Günün saatinden (gps_saati sözlüğü: saat, dakika, saniye, milisaniye; UTC)
+    epoch ms. Tarih ``ref_ms``'in gününden alınır; sonuç ``ref_ms + future_ms``
+    sonrasına düşerse (gece yarısı geçişi) bir gün geri çekilir. Yani dönen
+    zaman en fazla future_ms ileride, en çok ~24 saat geridedir.
+    """
+    ms = (ref_ms // DAY_MS * DAY_MS + int(clock["saat"]) * 3600000 + int(clock["dakika"]) * 60000
+          + int(clock["saniye"]) * 1000 + int(clock["milisaniye"]))
+    if ms > ref_ms + future_ms:
+        ms -= DAY_MS
+    return ms
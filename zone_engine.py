@@ -0,0 +1,144 @@
+"""
+Tüm filo için vektörize (NumPy) geofence + HSS üyelik hesabı.
+
+``ZoneEngine.evaluate(lats, lons)`` N uçağın konumunu alır ve tek geçişte
+  - (N x F) fence içi/dışı matrisini,
+  - (N x H) HSS dairesi içi/dışı matrisini
+döndürür. Tek paket HSS kontrolü aynı motoru N=1 ile kullanır; tek paket
+fence kontrolü ise matris kurmak yerine fence motorunun grid indeksine
+(``FenceEngine.contains``: yalnız noktanın hücresindeki adaylar) gider.
+
+Fence'ler: tüm poligon kenarları tek dizide tutulur; önce bbox ön elemesi
+ile sadece aday poligonların kenarları seçilir, sonra ray-cast (N x E)
+yayınlama ile yapılır. Kesişim sayısı poligon başına toplanır (çift-tek
+kuralı; delikler de aynı poligonun halkası olduğu için kendiliğinden düşer).
+
+HSS: her dairenin merkezinde yerel ENU (doğu-kuzey) düzlemine izdüşüm;
+yarıçap testi e² + n² <= r² olarak yapılır.
+
+Derlenmiş diziler fence motorunun ve HSS tablosunun ``version`` değeri
+değişince yeniden üretilir.
+"""
+import math
+
+import numpy as np
+
+_R_EARTH = 6371000.0
+_M_PER_DEG = _R_EARTH * math.pi / 180.0
+
+
+class ZoneEngine:
+    def __init__(self, fence_engine, hss_store):
+        self.fence_engine = fence_engine
+        self.hss_store = hss_store
+        self._fence_version = None
+        self._hss_version = None
+
+        self.fence_ids = []
+        self._edges = None  # (5, E): x1, y1, x2, y2, 1/dy
+        self._edge_poly = None  # (E,) kenarın ait olduğu poligon
+        self._poly_edges = None  # (P,) poligon başına kenar sayısı
+        self._bbox = None  # (P, 4): minLon, minLat, maxLon, maxLat
+        self._poly_fence = None  # (P, F) one-hot: poligon → fence sütunu
+
+        self.hss_ids = []
+        self._hss = None  # (4, H): lat, lon, metre/derece (doğu), r²
+
+    # ---- derleme ----
+    def _compile_fences(self):
+        polygons = self.fence_engine.polygons
+        fence_ids = sorted({p.fence_id for p in polygons})
+        col = {fid: i for i, fid in enumerate(fence_ids)}
+        x1, y1, x2, y2, owner, counts, bbox = [], [], [], [], [], [], []
+        for pi, p in enumerate(polygons):
+            n_edges = 0
+            for xs, ys in [p.outer] + list(p.holes):
+                n = len(xs)
+                for i in range(n):
+                    j = (i + 1) % n
+                    x1.append(xs[i]); y1.append(ys[i])
+                    x2.append(xs[j]); y2.append(ys[j])
+                n_edges += n
+            owner.extend([pi] * n_edges)
+            counts.append(n_edges)
+            bbox.append(p.bbox)
+
+        y1a, y2a = np.array(y1, dtype=float), np.array(y2, dtype=float)
+        dy = y2a - y1a
+        inv_dy = np.divide(1.0, dy, out=np.zeros_like(dy), where=dy != 0)  # dy=0 kenarı zaten kesişmez
+        self._edges = np.vstack([np.array(x1, dtype=float), y1a, np.array(x2, dtype=float), y2a, inv_dy])
+        self._edge_poly = np.array(owner, dtype=np.intp)
+        self._poly_edges = np.array(counts, dtype=np.intp)
+        self._bbox = np.array(bbox, dtype=float).reshape(-1, 4)
+        onehot = np.zeros((len(polygons), len(fence_ids)), dtype=np.int32)
+        for pi, p in enumerate(polygons):
+            onehot[pi, col[p.fence_id]] = 1
+        self._poly_fence = onehot
+        self.fence_ids = fence_ids
+        self._fence_version = self.fence_engine.version
+
+    def _compile_hss(self):
+        items = self.hss_store.items()
+        lat = np.array([float(it["lat"]) for it in items], dtype=float)
+        lon = np.array([float(it["lon"]) for it in items], dtype=float)
+        r = np.array([float(it["radius"]) for it in items], dtype=float)
+        k_east = _M_PER_DEG * np.cos(np.radians(lat))
+        self._hss = np.vstack([lat, lon, k_east, r * r]) if len(items) else np.zeros((4, 0))
+        self.hss_ids = [it["id"] for it in items]
+        self._hss_version = self.hss_store.version
+
+    def _ensure_compiled(self):
+        if self._fence_version != self.fence_engine.version:
+            self._compile_fences()
+        self.hss_store.items()  # HSS tablosu tembel yükleniyorsa sürümü güncellesin
+        if self._hss_version != self.hss_store.version:
+            self._compile_hss()
+
+    # ---- sorgular ----
+    def fence_matrix(self, lats, lons):
+        """(N x F) bool matris; sütunlar ``self.fence_ids`` sırasında."""
+        self._ensure_compiled()
+        lats = np.asarray(lats, dtype=float).reshape(-1)
+        lons = np.asarray(lons, dtype=float).reshape(-1)
+        n, n_f = lats.size, len(self.fence_ids)
+        if n == 0 or n_f == 0:
+            return np.zeros((n, n_f), dtype=bool)
+
+        px, py = lons[:, None], lats[:, None]
+        b = self._bbox
+        in_box = (px >= b[:, 0]) & (px <= b[:, 2]) & (py >= b[:, 1]) & (py <= b[:, 3])  # (N, P)
+        active = in_box.any(axis=0)
+        if not active.any():
+            return np.zeros((n, n_f), dtype=bool)
+
+        x1, y1, x2, y2, inv_dy = self._edges[:, active[self._edge_poly]]
+        cond = (y1 > py) != (y2 > py)
+        x_cross = (x2 - x1) * (py - y1) * inv_dy + x1
+        crossings = (cond & (px < x_cross)).astype(np.int32)  # (N, E_aktif)
+
+        counts = self._poly_edges[active]
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        per_poly = np.add.reduceat(crossings, starts, axis=1)  # (N, P_aktif)
+        inside_poly = ((per_poly & 1) == 1) & in_box[:, active]
+        return (inside_poly.astype(np.int32) @ self._poly_fence[active]) > 0
+
+    def hss_matrix(self, lats, lons):
+        """(N x H) bool matris; sütunlar ``self.hss_ids`` sırasında."""
+        self._ensure_compiled()
+        lats = np.asarray(lats, dtype=float).reshape(-1)
+        lons = np.asarray(lons, dtype=float).reshape(-1)
+        h_lat, h_lon, k_east, r2 = self._hss
+        north = (lats[:, None] - h_lat) * _M_PER_DEG
+        east = (lons[:, None] - h_lon) * k_east
+        return north * north + east * east <= r2
+
+    def evaluate(self, lats, lons):
+        """Tüm uçaklar × tüm bölgeler: (fence_matrix, hss_matrix)."""
+        return self.fence_matrix(lats, lons), self.hss_matrix(lats, lons)
+
+    def inside_any_fence(self, lat, lon):
+        # N=1'de NumPy kurulum maliyeti baskın; grid adayları + ray-cast daha ucuz
+        return self.fence_engine.contains(lat, lon)
+
+    def inside_any_hss(self, lat, lon):
+        return bool(self.hss_matrix((lat,), (lon,)).any())
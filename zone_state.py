@@ -0,0 +1,73 @@
+"""
+Takım başına bölge durum makinesi (geofence / HSS).
+
+Her pakette ok/violation yayını yerine sadece giriş/çıkış geçişlerinde olay
+üretilir. GPS titremesine karşı debounce: yeni durumun kabul edilmesi için
+arka arkaya ``debounce`` gözlem gerekir (1 → debounce yok). Bir takımın ilk
+gözlemi doğrudan kabul edilir ve geçiş olarak döner (panel ilk durumu görsün).
+
+``snapshot()`` o anki durumları ucuzca döndürür; yeni bağlanan panel geçmişi
+yeniden oynatmadan bununla eşitlenir.
+
+Kayıtlar ``store``'da (state_backend) tutulur: bellekte (tek süreç) ya da
+worker'lar arasında ortak SQLite'ta. Böylece bir takımın paketleri farklı
+worker'lara düşse de debounce sayacı tektir. Sayaçlar (transitions /
+suppressed) süreç başınadır.
+"""
+import time
+
+from state_backend import MemoryState
+
+ZONES = ("fence", "hss")
+
+
+class ZoneStateMachine:
+    def __init__(self, debounce=2, store=None):
+        self.debounce = max(1, int(debounce))
+        self.store = store if store is not None else MemoryState()
+        self.transitions = 0
+        self.suppressed = 0  # debounce ile bastırılan geçici değişimler
+
+    def observe(self, takim, zone, inside, now=None):
+        """Gözlemi işle; durum değiştiyse True/False (yeni 'inside'), değişmediyse None döner."""
+        now = time.time() if now is None else now
+        inside = bool(inside)
+        rec = self.store.zone_get(takim, zone)
+        if rec is not None and rec[0] == inside and rec[2] is None:
+            return None  # kararlı durum (paketlerin çoğu): yazma yok
+        return self.store.zone_update(takim, zone, lambda rec: self._step(rec, inside, now))
+
+    def _step(self, rec, inside, now):
+        """kayıt (inside, since, candidate, count) | None → (yeni kayıt, sonuç)"""
+        if rec is None:
+            self.transitions += 1
+            return (inside, now, None, 0), inside
+        was, since, candidate, count = rec
+        if inside == was:
+            if candidate is not None:
+                self.suppressed += 1
+            return (was, since, None, 0), None
+        if candidate != inside:
+            candidate, count = inside, 0
+        count += 1
+        if count < self.debounce:
+            return (was, since, candidate, count), None
+        self.transitions += 1
+        return (inside, now, None, 0), inside
+
+    def forget(self, takim):
+        """Bayatlayan takımın durumunu unut (geri dönünce ilk gözlem yeniden yayınlanır)."""
+        self.store.zone_forget(takim)
+
+    def teams(self):
+        return {t for t, _ in self.store.zone_records()}
+
+    def snapshot(self, now=None):
+        """{takım: {"fence": bool, "fence_sure": sn, "hss": bool, "hss_sure": sn}}"""
+        now = time.time() if now is None else now
+        out = {}
+        for (takim, zone), rec in self.store.zone_records().items():
+            d = out.setdefault(takim, {})
+            d[zone] = rec[0]
+            d[zone + "_sure"] = round(now - rec[1], 1)
+        return out